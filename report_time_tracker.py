@@ -1,22 +1,45 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-import datetime, json, os
+import datetime, threading, queue
+from collections import OrderedDict
+from types import MappingProxyType
 
-TIME_LOG = "time_log.json"
+from time_tracker import tracker, pivot, workspace, activity
+from time_tracker.daytotals import DayTotals, ALL
+from time_tracker.client import rpc_or_local
+from utils import load_tasks, tasks_by_id, load_settings, install_error_handler
+
+PERIOD_CACHE_SIZE = 16
+RENDER_CHUNK = 300  # Treeview rows inserted per after() slice
+CANCEL_CHECK = 2048  # rows processed between cancellation checks
+_log_writes = 0  # bumped on every save from this process
+
+def read_log():
+    """Raw log entries; raises on error (safe to call from a worker thread)."""
+    return tracker.load_time_log(strict=True)
+
+def iter_log():
+    """Raw log entries one at a time: streamed from the file unless the daemon serves them."""
+    yield from rpc_or_local("log.list", tracker.iter_time_log)
 
 def load_time_log():
-    if os.path.exists(TIME_LOG):
-        with open(TIME_LOG, "r", encoding="utf-8") as f:
-            try:
-                return json.load(f)
-            except Exception as e:
-                messagebox.showerror("Ошибка чтения", f"Не удалось загрузить лог: {e}")
-                return []
-    return []
+    try:
+        return read_log()
+    except Exception as e:
+        messagebox.showerror("Ошибка чтения", f"Не удалось загрузить лог: {e}")
+        return []
+
+def log_version():
+    """
+    Changes whenever the log is written: by this process, by another process
+    (file mtime/size) or through the daemon.
+    """
+    return (_log_writes, tracker.log_version())
 
 def save_time_log(data):
-    with open(TIME_LOG, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    global _log_writes
+    _log_writes += 1
+    tracker.save_time_log(data)
 
 def seconds_to_hms(s: int) -> str:
     h = s // 3600
@@ -29,10 +52,14 @@ def seconds_to_hm(s: int) -> str:
     m = (s % 3600) // 60
     return f"{h:02d}:{m:02d}"
 
+class _Cancelled(Exception):
+    pass
+
 class ReportApp:
     def __init__(self, root):
         self.root = root
-        self.root.title("Отчёт — Time Tracker")
+        suffix = "" if workspace.current == workspace.DEFAULT else f" — {workspace.current}"
+        self.root.title("Отчёт — Time Tracker" + suffix)
         self.root.geometry("1000x700")
 
         top = ttk.Frame(root, padding=6)
@@ -53,6 +80,8 @@ class ReportApp:
         self.combo.pack(side="left", padx=6)
         self.combo.bind("<<ComboboxSelected>>", self.on_mode_change)
 
+        self.progress = ttk.Progressbar(top, mode="indeterminate", length=90)
+
         self.lbl_from = ttk.Label(top, text="C:")
         self.ent_from = ttk.Entry(top, width=12)
         self.lbl_to = ttk.Label(top, text="По:")
@@ -61,6 +90,11 @@ class ReportApp:
         self.lbl_from.pack_forget(); self.ent_from.pack_forget()
         self.lbl_to.pack_forget(); self.ent_to.pack_forget()
 
+        ttk.Button(top, text="⚠ Перекрытия", command=self.open_overlap_audit).pack(side="right")
+        ttk.Button(top, text="▦ Сводная", command=self.open_pivot).pack(side="right", padx=6)
+        ttk.Button(top, text="📅 Календарь", command=self.open_heatmap).pack(side="right")
+        ttk.Button(top, text="🗂 Пространства", command=self.open_workspaces).pack(side="right", padx=6)
+
         # main area
         main = ttk.Frame(root)
         main.pack(fill="both", expand=True, padx=6, pady=6)
@@ -111,6 +145,22 @@ class ReportApp:
         self.tree_summary.column("duration", width=120, anchor="center")
         self.tree_summary.pack(fill="x", padx=6, pady=(0, 6))
 
+        # LRU of computed periods: (mode, range, log version) -> result
+        self._period_cache = OrderedDict()
+        self._entries_cache, self._entries_version = [], None
+        self._skipped = 0  # log entries left out by _normalize_entries (malformed)
+        self._tasks = {}   # id -> task (hot and archived), snapshot taken on the Tk thread
+        self.result = None
+        self.pivot_window = None
+        # seconds per day for the heatmap; rebuilt with the entries, patched on own edits
+        self.days = DayTotals()
+        self.heatmap_window = None
+        # background computation: one job at a time, results come back through a queue
+        self._job = None
+        self._results = queue.Queue()
+        self._poll_after = None
+        self._fill_after = None
+
         self.update("День")
 
     def on_mode_change(self, event=None):
@@ -129,34 +179,32 @@ class ReportApp:
             self.lbl_to.pack_forget(); self.ent_to.pack_forget()
             self.update(mode)
 
-    def _normalize_entries(self, raw_log):
+    def _normalize_entries(self, raw_log, cancel=None, skipped=None, tasks=None):
+        # schema-2 log: every entry has ISO start/end and duration_seconds;
+        # one that does not is left out (its index goes to skipped) instead of failing the report.
+        # tasks: id -> task snapshot (the worker gets its own, never the shared archive cache)
+        tasks = self._tasks if tasks is None else tasks
         out = []
         for idx, e in enumerate(raw_log):
-            start_dt, end_dt, dur = None, None, None
-            if e.get("start") and e.get("end"):
-                try:
-                    start_dt = datetime.datetime.fromisoformat(e["start"])
-                    end_dt = datetime.datetime.fromisoformat(e["end"])
-                    dur = int(e.get("duration_seconds", (end_dt - start_dt).total_seconds()))
-                except:
-                    continue
-            elif e.get("timestamp") and e.get("seconds"):
-                try:
-                    ts = datetime.datetime.strptime(e["timestamp"], "%Y-%m-%d %H:%M:%S")
-                    sec = int(e["seconds"])
-                    end_dt = ts
-                    start_dt = ts - datetime.timedelta(seconds=sec)
-                    dur = sec
-                except:
-                    continue
-            if start_dt and end_dt:
+            if cancel is not None and idx % CANCEL_CHECK == 0 and cancel.is_set():
+                raise _Cancelled()
+            try:
+                if not e.get("task_text") and e.get("task_id"):
+                    # older records may only carry task_id; the task may be archived by now
+                    task = tasks.get(e["task_id"])
+                    if task:
+                        e = {**task, **e, "task_text": task.get("text", "—")}
                 out.append({
                     "task_text": e.get("task_text", "—"),
                     "project": e.get("project", "—"),
                     "section": e.get("section", "—"),
-                    "start": start_dt, "end": end_dt,
-                    "duration_seconds": dur, "orig_index": idx
+                    "start": datetime.datetime.fromisoformat(e["start"]),
+                    "end": datetime.datetime.fromisoformat(e["end"]),
+                    "duration_seconds": int(e["duration_seconds"]), "orig_index": idx
                 })
+            except (AttributeError, KeyError, TypeError, ValueError):
+                if skipped is not None:
+                    skipped.append(idx)
         return out
 
     def on_edit_entry(self, event):
@@ -173,12 +221,57 @@ class ReportApp:
         if 0 <= index < len(raw):
             EditEntryWindow(self, index, raw[index])
 
-    def update(self, mode=None):
-        raw = load_time_log()
-        entries = self._normalize_entries(raw)
-        if not mode: mode = self.combo.get()
-        now = datetime.datetime.now()
+    def open_overlap_audit(self):
+        OverlapAuditWindow(self)
+
+    def open_pivot(self):
+        if self.pivot_window and self.pivot_window.winfo_exists():
+            self.pivot_window.lift()
+            return
+        self.pivot_window = PivotWindow(self)
 
+    def open_heatmap(self):
+        if self.heatmap_window and self.heatmap_window.winfo_exists():
+            self.heatmap_window.lift()
+            return
+        self.heatmap_window = HeatmapWindow(self)
+
+    def open_workspaces(self):
+        WorkspacesWindow(self)
+
+    def show_day(self, day):
+        """Jump to the detail rows of one day (custom range day..day)."""
+        self.combo.set("Пользовательский")
+        self.on_mode_change()
+        self.ent_from.delete(0, "end"); self.ent_from.insert(0, day.isoformat())
+        self.ent_to.delete(0, "end"); self.ent_to.insert(0, day.isoformat())
+        self.update("Пользовательский")
+        self.root.lift()
+
+    def entry_changed(self, index, raw):
+        """
+        A log entry was edited from this window: patch the cached entries and
+        the day index in place so the next update() does not re-read the log.
+        """
+        entries = self._entries_cache
+        if self._entries_version is None or not 0 <= index < len(entries):
+            return
+        try:
+            new = self._normalize_entries([raw])[0]
+        except Exception:
+            return
+        new["orig_index"] = index
+        entries = list(entries)
+        self.days.remove(entries[index])
+        self.days.add(new)
+        entries[index] = new
+        self._entries_cache, self._entries_version = entries, log_version()
+        if self.heatmap_window and self.heatmap_window.winfo_exists():
+            self.heatmap_window.redraw()
+
+    def _resolve_range(self, mode):
+        """(start, end, grouping) for a period mode, None if the custom range is invalid."""
+        now = datetime.datetime.now()
         if mode == "День":
             start = datetime.datetime.combine(now.date(), datetime.time.min)
             end = datetime.datetime.combine(now.date(), datetime.time.max)
@@ -201,65 +294,190 @@ class ReportApp:
                 start = datetime.datetime.fromisoformat(self.ent_from.get() + "T00:00:00")
                 end = datetime.datetime.fromisoformat(self.ent_to.get() + "T23:59:59")
             except Exception:
-                messagebox.showerror("Фильтр", "Неверный формат даты (YYYY-MM-DD).")
-                return
+                return None
             grouping = None
-
-        filtered = [e for e in entries if not (e["end"] < start or e["start"] > end)]
-        total_seconds = sum(e["duration_seconds"] for e in filtered)
-
-        self.tree.delete(*self.tree.get_children())
-        for e in filtered:
-            # используем orig_index как iid — потом по нему найдём запись в исходном JSON
-            self.tree.insert("", "end", iid=str(e["orig_index"]), values=(
-                e["task_text"], e["project"], e["section"],
-                e["start"].strftime("%Y-%m-%d %H:%M:%S"),
-                e["end"].strftime("%Y-%m-%d %H:%M:%S"),
-                seconds_to_hms(e["duration_seconds"])
-            ))
-
-        self.lbl_total.config(text=f"Итого: {seconds_to_hms(total_seconds)}")
-
+        return start, end, grouping
+
+    def _compute(self, entries, start, end, grouping, cancel=None):
+        filtered = []
+        for n, e in enumerate(entries):
+            if cancel is not None and n % CANCEL_CHECK == 0 and cancel.is_set():
+                raise _Cancelled()
+            if not (e["end"] < start or e["start"] > end):
+                filtered.append(e)
         proj, task = {}, {}
         for e in filtered:
             proj[e["project"]] = proj.get(e["project"], 0) + e["duration_seconds"]
             task[e["task_text"]] = task.get(e["task_text"], 0) + e["duration_seconds"]
 
+        summary = {}
+        if grouping == "by_day":
+            for e in filtered:
+                d = e["start"].strftime("%Y-%m-%d (%a)")
+                summary[d] = summary.get(d, 0) + e["duration_seconds"]
+        elif grouping == "by_week":
+            for e in filtered:
+                year, week, _ = e["start"].isocalendar()
+                key = f"Неделя {week} ({year})"
+                summary[key] = summary.get(key, 0) + e["duration_seconds"]
+
+        if cancel is not None and cancel.is_set():
+            raise _Cancelled()
+        # shared between the cache, the table and the pivot window: never mutated
+        return MappingProxyType({
+            "rows": tuple(filtered),
+            "total": sum(e["duration_seconds"] for e in filtered),
+            "wall": tracker.union_seconds((e["start"], e["end"], tracker.removed_seconds(e, e["start"], e["end"]))
+                                          for e in filtered),
+            "projects": sorted(proj.items(), key=lambda x: -x[1]),
+            "tasks": sorted(task.items(), key=lambda x: -x[1]),
+            "summary": sorted(summary.items()),
+            "rollup": pivot.rollup(filtered),
+        })
+
+    def update(self, mode=None):
+        if not mode: mode = self.combo.get()
+        rng = self._resolve_range(mode)
+        if rng is None:
+            messagebox.showerror("Фильтр", "Неверный формат даты (YYYY-MM-DD).")
+            return
+        if self._job:
+            self._job.set()  # cancel the computation still in flight
+            self._job = None
+        version = log_version()
+        key = (mode, rng, version)
+        result = self._period_cache.get(key)
+        if result is not None:
+            self._period_cache.move_to_end(key)
+            self._set_busy(False)
+            self._render(result)
+            return
+        job = threading.Event()
+        self._job = job
+        entries = self._entries_cache if self._entries_version == version else None
+        if entries is None:
+            self._tasks = self._load_tasks_snapshot()
+        threading.Thread(target=self._worker, args=(job, key, rng, version, entries, self._tasks),
+                         daemon=True).start()
+        self._set_busy(True)
+        if not self._poll_after:
+            self._poll_after = self.root.after(30, self._poll)
+
+    def _load_tasks_snapshot(self):
+        # task names for entries that only carry task_id; the report works without them
+        try:
+            hot = load_tasks()
+        except Exception:
+            hot = []
+        return tasks_by_id(hot)
+
+    def _worker(self, job, key, rng, version, entries, tasks):
+        # runs off the Tk thread: no widget access here
+        try:
+            days = skipped = None
+            if entries is None:
+                skipped = []
+                entries = self._normalize_entries(iter_log(), job, skipped, tasks)
+                days = DayTotals()
+                days.rebuild(entries)
+            result = self._compute(entries, *rng, cancel=job)
+            self._results.put((job, key, version, entries, days, skipped, result, None))
+        except _Cancelled:
+            pass
+        except Exception as e:
+            self._results.put((job, key, version, None, None, None, None, e))
+
+    def _poll(self):
+        self._poll_after = None
+        while True:
+            try:
+                job, key, version, entries, days, skipped, result, err = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if job is not self._job:
+                continue  # superseded by a newer request
+            self._job = None
+            self._set_busy(False)
+            if err:
+                messagebox.showerror("Ошибка чтения", f"Не удалось загрузить лог: {err}")
+                continue
+            self._entries_cache, self._entries_version = entries, version
+            if skipped is not None:
+                self._skipped = len(skipped)
+            if days is not None:
+                self.days = days
+                if self.heatmap_window and self.heatmap_window.winfo_exists():
+                    self.heatmap_window.redraw()
+            self._period_cache[key] = result
+            while len(self._period_cache) > PERIOD_CACHE_SIZE:
+                self._period_cache.popitem(last=False)
+            self._render(result)
+        if self._job:
+            self._poll_after = self.root.after(30, self._poll)
+
+    def _set_busy(self, busy):
+        if busy:
+            self.progress.pack(side="left", padx=10)
+            self.progress.start(15)
+        else:
+            self.progress.stop()
+            self.progress.pack_forget()
+
+    def _render(self, result):
+        self.result = result
+        if self.pivot_window and self.pivot_window.winfo_exists():
+            self.pivot_window.rebuild()
+        if self._fill_after:
+            self.root.after_cancel(self._fill_after)
+            self._fill_after = None
+        self.tree.delete(*self.tree.get_children())
+        self._fill_rows(result["rows"], 0)
+
+        total_seconds, wall_seconds = result["total"], result["wall"]
+        total_text = f"Итого: {seconds_to_hms(total_seconds)}"
+        if wall_seconds < total_seconds:
+            total_text += f"  (без перекрытий: {seconds_to_hms(wall_seconds)})"
+        if self._skipped:
+            total_text += f"  ⚠ пропущено повреждённых записей: {self._skipped}"
+        self.lbl_total.config(text=total_text)
+
         self.tree_proj.delete(*self.tree_proj.get_children())
-        for p, secs in sorted(proj.items(), key=lambda x: -x[1]):
+        for p, secs in result["projects"]:
             self.tree_proj.insert("", "end", values=(p, seconds_to_hms(secs)))
 
         self.tree_task.delete(*self.tree_task.get_children())
-        for t, secs in sorted(task.items(), key=lambda x: -x[1]):
+        for t, secs in result["tasks"]:
             self.tree_task.insert("", "end", values=(t, seconds_to_hms(secs)))
 
         self.tree_summary.delete(*self.tree_summary.get_children())
+        for label, secs in result["summary"]:
+            self.tree_summary.insert("", "end", values=(label, seconds_to_hms(secs)))
 
-        if grouping == "by_day":
-            days = {}
-            for e in filtered:
-                d = e["start"].strftime("%Y-%m-%d (%a)")
-                days[d] = days.get(d, 0) + e["duration_seconds"]
-            for d, s in sorted(days.items()):
-                self.tree_summary.insert("", "end", values=(d, seconds_to_hms(s)))
-
-        elif grouping == "by_week":
-            weeks = {}
-            for e in filtered:
-                year, week, _ = e["start"].isocalendar()
-                key = f"Неделя {week} ({year})"
-                weeks[key] = weeks.get(key, 0) + e["duration_seconds"]
-            for w, s in sorted(weeks.items()):
-                self.tree_summary.insert("", "end", values=(w, seconds_to_hms(s)))
+    def _fill_rows(self, rows, pos):
+        # large periods are inserted in slices so the window stays responsive
+        self._fill_after = None
+        for e in rows[pos:pos + RENDER_CHUNK]:
+            # используем orig_index как iid — потом по нему найдём запись в исходном JSON
+            self.tree.insert("", "end", iid=str(e["orig_index"]), values=(
+                e["task_text"], e["project"], e["section"],
+                e["start"].strftime("%Y-%m-%d %H:%M:%S"),
+                e["end"].strftime("%Y-%m-%d %H:%M:%S"),
+                seconds_to_hms(e["duration_seconds"])
+            ))
+        if pos + RENDER_CHUNK < len(rows):
+            self._fill_after = self.root.after(1, self._fill_rows, rows, pos + RENDER_CHUNK)
 
 class EditEntryWindow(tk.Toplevel):
+    STRIP_W, STRIP_H = 380, 22
+
     def __init__(self, parent, index, entry):
         super().__init__(parent.root)
         self.parent = parent
         self.index = index
         self.entry = entry
+        self.timeline = activity.Timeline.from_json(entry.get("activity"))
         self.title("Редактирование записи")
-        self.geometry("400x250")
+        self.geometry("400x360" if self.timeline else "400x250")
         self.resizable(False, False)
 
         ttk.Label(self, text="Задача:").pack(anchor="w", padx=10, pady=(10,0))
@@ -284,36 +502,102 @@ class EditEntryWindow(tk.Toplevel):
         self.lbl_dur = ttk.Label(self, text=seconds_to_hm(entry.get("duration_seconds", 0)))
         self.lbl_dur.pack(anchor="w", padx=10, pady=2)
 
+        if self.timeline:
+            # activity strip: green = input seen, gray = idle / asleep; frame = the entry's range
+            ttk.Label(self, text="Активность:").pack(anchor="w", padx=10)
+            self.strip = tk.Canvas(self, width=self.STRIP_W, height=self.STRIP_H + 14,
+                                   highlightthickness=0, background="white")
+            self.strip.pack(padx=10, pady=2)
+            trimf = ttk.Frame(self)
+            trimf.pack(anchor="w", padx=10)
+            self.var_trim = tk.BooleanVar(value=bool(entry.get("idle_trimmed_seconds")))
+            ttk.Checkbutton(trimf, text="Вычесть простои ≥", variable=self.var_trim,
+                            command=self.on_time_change).pack(side="left")
+            self.spin_trim = tk.Spinbox(trimf, from_=1, to=240, width=4, command=self.on_time_change)
+            self.spin_trim.delete(0, "end")
+            self.spin_trim.insert(0, load_settings().get("idle_trim_minutes", 10))
+            self.spin_trim.pack(side="left", padx=4)
+            ttk.Label(trimf, text="мин").pack(side="left")
+            self.draw_strip()
+
         btn_frame = ttk.Frame(self)
         btn_frame.pack(pady=10)
         ttk.Button(btn_frame, text="Сохранить", command=self.save).pack(side="left", padx=5)
         ttk.Button(btn_frame, text="Удалить", command=self.delete).pack(side="left", padx=5)
         ttk.Button(btn_frame, text="Отмена", command=self.destroy).pack(side="left", padx=5)
 
-    def on_time_change(self, event=None):
+    def draw_strip(self):
+        tl, c = self.timeline, self.strip
+        c.delete("all")
+        if not tl.n:
+            return
+        px = self.STRIP_W / tl.n
+        # one rectangle per run of equal slots, not per slot
+        i = 0
+        while i < tl.n:
+            state, j = tl.active(i), i
+            while j < tl.n and tl.active(j) == state:
+                j += 1
+            c.create_rectangle(i * px, 0, j * px, self.STRIP_H, width=0,
+                               fill="#5cb85c" if state else "#d9d9d9")
+            i = j
+        step = datetime.timedelta(seconds=tl.interval)
+        c.create_text(1, self.STRIP_H + 1, anchor="nw", text=tl.t0.strftime("%H:%M"), font=("TkDefaultFont", 7))
+        c.create_text(self.STRIP_W - 1, self.STRIP_H + 1, anchor="ne",
+                      text=(tl.t0 + tl.n * step).strftime("%H:%M"), font=("TkDefaultFont", 7))
+        rng = self._edited_range()
+        if rng:
+            span = tl.n * tl.interval
+            x0 = (rng[0] - tl.t0).total_seconds() / span * self.STRIP_W
+            x1 = (rng[1] - tl.t0).total_seconds() / span * self.STRIP_W
+            c.create_rectangle(max(0, x0), 1, min(self.STRIP_W - 1, x1), self.STRIP_H - 1, outline="#1f5fbf", width=2)
+
+    def _edited_range(self):
         try:
-            start = datetime.datetime.fromisoformat(self.ent_start.get())
-            end = datetime.datetime.fromisoformat(self.ent_end.get())
-            diff = max(0, int((end - start).total_seconds()))
-            self.lbl_dur.config(text=seconds_to_hm(diff))
-        except Exception:
+            return (datetime.datetime.fromisoformat(self.ent_start.get()),
+                    datetime.datetime.fromisoformat(self.ent_end.get()))
+        except ValueError:
+            return None
+
+    def _edited(self, start, end):
+        """Start/end/duration (and trim) the entry would be saved with."""
+        out = {**self.entry, "start": start.isoformat(), "end": end.isoformat(),
+               "duration_seconds": max(0, int((end - start).total_seconds()))}
+        out.pop("idle_trimmed_seconds", None)
+        if self.timeline and self.var_trim.get():
+            try:
+                minutes = int(self.spin_trim.get())
+            except ValueError:
+                minutes = 0
+            activity.trim_idle(out, minutes)
+        return out
+
+    def on_time_change(self, event=None):
+        rng = self._edited_range()
+        if rng:
+            self.lbl_dur.config(text=seconds_to_hm(self._edited(*rng)["duration_seconds"]))
+        else:
             self.lbl_dur.config(text="--:--")
+        if self.timeline:
+            self.draw_strip()
 
     def save(self):
-        try:
-            start = datetime.datetime.fromisoformat(self.ent_start.get())
-            end = datetime.datetime.fromisoformat(self.ent_end.get())
-            duration = max(0, int((end - start).total_seconds()))
-        except Exception:
+        rng = self._edited_range()
+        if not rng:
             messagebox.showerror("Ошибка", "Неверный формат даты (используй ISO: YYYY-MM-DDTHH:MM:SS)")
             return
+        edited = self._edited(*rng)
 
         data = load_time_log()
         if 0 <= self.index < len(data):
-            data[self.index]["start"] = start.isoformat()
-            data[self.index]["end"] = end.isoformat()
-            data[self.index]["duration_seconds"] = duration
+            for key in ("start", "end", "duration_seconds"):
+                data[self.index][key] = edited[key]
+            if edited.get("idle_trimmed_seconds"):
+                data[self.index]["idle_trimmed_seconds"] = edited["idle_trimmed_seconds"]
+            else:
+                data[self.index].pop("idle_trimmed_seconds", None)
             save_time_log(data)
+            self.parent.entry_changed(self.index, data[self.index])
             self.parent.update()
             self.destroy()
             messagebox.showinfo("Сохранено", "Изменения сохранены.")
@@ -329,8 +613,312 @@ class EditEntryWindow(tk.Toplevel):
         self.destroy()
         messagebox.showinfo("Удалено", "Запись удалена.")
 
+class WorkspacesWindow(tk.Toplevel):
+    """Totals of every workspace for the report period, from the per-workspace rollups."""
+
+    def __init__(self, parent):
+        super().__init__(parent.root)
+        self.parent = parent
+        self.title("Все пространства")
+        self.geometry("520x420")
+        self.tree = ttk.Treeview(self, columns=("duration",), show="tree headings")
+        self.tree.heading("#0", text="Пространство / проект")
+        self.tree.heading("duration", text="Время")
+        self.tree.column("#0", width=360)
+        self.tree.column("duration", width=110, anchor="center")
+        self.tree.pack(fill="both", expand=True, padx=6, pady=6)
+        self.lbl = ttk.Label(self, text="")
+        self.lbl.pack(anchor="w", padx=6, pady=(0, 6))
+        self.rebuild()
+
+    def rebuild(self):
+        self.tree.delete(*self.tree.get_children())
+        rng = self.parent._resolve_range(self.parent.combo.get())
+        if rng is None:
+            self.lbl.config(text="Неверный период.")
+            return
+        start, end, _ = rng
+        first = start.date() if start != datetime.datetime.min else None
+        last = end.date() if end != datetime.datetime.max else None
+        damaged = []
+        totals = workspace.cross_totals(first, last, damaged)
+        grand = 0
+        for name, per in totals.items():
+            ws_total = sum(per.values())
+            grand += ws_total
+            label = name + (" (текущее)" if name == workspace.current else "")
+            node = self.tree.insert("", "end", text=label, values=(seconds_to_hms(ws_total),), open=True)
+            for project, secs in sorted(per.items(), key=lambda kv: -kv[1]):
+                self.tree.insert(node, "end", text=project, values=(seconds_to_hms(secs),))
+        text = f"{self.parent.combo.get()}: итого {seconds_to_hms(grand)}"
+        if damaged:
+            text += f"\n⚠ журнал прочитан не полностью (откройте пространство, чтобы восстановить): {', '.join(damaged)}"
+        self.lbl.config(text=text)
+
+
+class PivotWindow(tk.Toplevel):
+    NONE = "—"
+
+    def __init__(self, parent):
+        super().__init__(parent.root)
+        self.parent = parent
+        self.title("Сводная таблица")
+        self.geometry("600x500")
+
+        names = [self.NONE] + list(pivot.DIMENSIONS.values())
+        self.by_name = {v: k for k, v in pivot.DIMENSIONS.items()}
+        top = ttk.Frame(self, padding=6)
+        top.pack(fill="x")
+        self.levels = []
+        for n, default in enumerate(("Проект", "Раздел", self.NONE), 1):
+            ttk.Label(top, text=f"Уровень {n}:").pack(side="left", padx=(6 if n > 1 else 0, 2))
+            cb = ttk.Combobox(top, values=names, width=10, state="readonly")
+            cb.set(default)
+            cb.bind("<<ComboboxSelected>>", lambda e: self.rebuild())
+            cb.pack(side="left")
+            self.levels.append(cb)
+
+        self.tree = ttk.Treeview(self, columns=("duration", "share"), show="tree headings")
+        self.tree.heading("#0", text="Группа")
+        self.tree.heading("duration", text="Время")
+        self.tree.heading("share", text="%")
+        self.tree.column("#0", width=360)
+        self.tree.column("duration", width=100, anchor="center")
+        self.tree.column("share", width=60, anchor="center")
+        self.tree.pack(fill="both", expand=True, padx=6, pady=6)
+
+        self.rebuild()
+
+    def rebuild(self):
+        self.tree.delete(*self.tree.get_children())
+        result = self.parent.result
+        if not result:
+            return
+        dims = []
+        for cb in self.levels:
+            dim = self.by_name.get(cb.get())
+            if dim and dim not in dims:
+                dims.append(dim)
+        total = result["total"] or 1
+        parents = [""]
+        for depth, key, secs in pivot.flatten(pivot.pivot(result["rollup"], dims), dims):
+            del parents[depth + 1:]
+            iid = self.tree.insert(parents[depth], "end", text=key, open=depth == 0,
+                                   values=(seconds_to_hms(secs), f"{100 * secs / total:.1f}"))
+            parents.append(iid)
+        self.tree.insert("", "end", text="Итого", values=(seconds_to_hms(result["total"]), "100.0"))
+
+
+class HeatmapWindow(tk.Toplevel):
+    CELL = 13      # year view: px per day square
+    GAP = 2
+    COLORS = ("#ebedf0", "#c6e48b", "#7bc96f", "#239a3b", "#196127")
+    MONTHS = ("янв", "фев", "мар", "апр", "май", "июн", "июл", "авг", "сен", "окт", "ноя", "дек")
+    MONTH_NAMES = ("Январь", "Февраль", "Март", "Апрель", "Май", "Июнь",
+                   "Июль", "Август", "Сентябрь", "Октябрь", "Ноябрь", "Декабрь")
+    WEEKDAYS = ("Пн", "Вт", "Ср", "Чт", "Пт", "Сб", "Вс")
+    ALL_PROJECTS = "Все проекты"
+
+    def __init__(self, parent):
+        super().__init__(parent.root)
+        self.parent = parent
+        self.title("Календарь")
+        self.geometry("820x300")
+        today = datetime.date.today()
+        self.year, self.month = today.year, today.month
+
+        top = ttk.Frame(self, padding=6)
+        top.pack(fill="x")
+        self.view = ttk.Combobox(top, values=["Год", "Месяц"], width=7, state="readonly")
+        self.view.set("Год")
+        self.view.bind("<<ComboboxSelected>>", lambda e: self.redraw())
+        self.view.pack(side="left")
+        ttk.Button(top, text="◀", width=3, command=lambda: self.shift(-1)).pack(side="left", padx=(8, 0))
+        self.lbl_period = ttk.Label(top, width=16, anchor="center")
+        self.lbl_period.pack(side="left")
+        ttk.Button(top, text="▶", width=3, command=lambda: self.shift(1)).pack(side="left")
+        ttk.Label(top, text="Проект:").pack(side="left", padx=(12, 4))
+        self.project = ttk.Combobox(top, width=22, state="readonly")
+        self.project.set(self.ALL_PROJECTS)
+        self.project.bind("<<ComboboxSelected>>", lambda e: self.redraw())
+        self.project.pack(side="left")
+
+        self.canvas = tk.Canvas(self, background="white", highlightthickness=0)
+        self.canvas.pack(fill="both", expand=True, padx=6)
+        self.canvas.bind("<Motion>", self.on_motion)
+        self.canvas.bind("<Button-1>", self.on_click)
+        self.lbl_info = ttk.Label(self, text="Щёлкните день, чтобы открыть его записи.", foreground="gray")
+        self.lbl_info.pack(anchor="w", padx=6, pady=4)
+        self.cells = {}   # canvas item -> (date, seconds)
+        self.redraw()
+
+    def shift(self, step):
+        if self.view.get() == "Год":
+            self.year += step
+        else:
+            m = self.year * 12 + self.month - 1 + step
+            self.year, self.month = m // 12, m % 12 + 1
+        self.redraw()
+
+    def _color(self, secs, top):
+        if secs <= 0:
+            return self.COLORS[0]
+        level = 1 + min(3, int(4 * secs / (top + 1)))
+        return self.COLORS[level]
+
+    def redraw(self):
+        days = self.parent.days
+        self.project["values"] = [self.ALL_PROJECTS] + days.projects()
+        project = self.project.get()
+        project = ALL if project == self.ALL_PROJECTS else project
+        self.canvas.delete("all")
+        self.cells.clear()
+        if self.view.get() == "Год":
+            self._draw_year(days, project)
+        else:
+            self._draw_month(days, project)
+
+    def _draw_year(self, days, project):
+        first, last = datetime.date(self.year, 1, 1), datetime.date(self.year, 12, 31)
+        self.lbl_period.config(text=str(self.year))
+        secs = days.span(first, last, project)
+        top = max(secs) if secs else 0
+        step = self.CELL + self.GAP
+        x0, y0 = 30, 22
+        for i, label in enumerate(self.WEEKDAYS):
+            if i % 2 == 0:
+                self.canvas.create_text(x0 - 6, y0 + i * step + self.CELL / 2, text=label, anchor="e", font=("TkDefaultFont", 8))
+        offset = first.weekday()
+        for n, value in enumerate(secs):
+            day = first + datetime.timedelta(days=n)
+            col, row = divmod(n + offset, 7)
+            x, y = x0 + col * step, y0 + row * step
+            if day.day == 1:
+                self.canvas.create_text(x, y0 - 10, text=self.MONTHS[day.month - 1], anchor="w", font=("TkDefaultFont", 8))
+            item = self.canvas.create_rectangle(x, y, x + self.CELL, y + self.CELL,
+                                                fill=self._color(value, top), outline="")
+            self.cells[item] = (day, value)
+        total = sum(secs)
+        self.canvas.create_text(x0, y0 + 7 * step + 12, anchor="w",
+                                text=f"За {self.year}: {seconds_to_hms(total)}, дней с записями: {sum(1 for v in secs if v)}")
+
+    def _draw_month(self, days, project):
+        first = datetime.date(self.year, self.month, 1)
+        last = (first.replace(day=28) + datetime.timedelta(days=4)).replace(day=1) - datetime.timedelta(days=1)
+        self.lbl_period.config(text=f"{self.MONTH_NAMES[self.month - 1]} {self.year}")
+        secs = days.span(first, last, project)
+        top = max(secs) if secs else 0
+        w, h, x0, y0 = 100, 34, 20, 22
+        for i, label in enumerate(self.WEEKDAYS):
+            self.canvas.create_text(x0 + i * w + w / 2, y0 - 10, text=label, font=("TkDefaultFont", 8))
+        offset = first.weekday()
+        for n, value in enumerate(secs):
+            day = first + datetime.timedelta(days=n)
+            row, col = divmod(n + offset, 7)
+            x, y = x0 + col * w, y0 + row * h
+            item = self.canvas.create_rectangle(x + 1, y + 1, x + w - 1, y + h - 1,
+                                                fill=self._color(value, top), outline="#d0d0d0")
+            self.cells[item] = (day, value)
+            label = f"{day.day}" + (f"   {seconds_to_hm(value)}" if value else "")
+            self.canvas.create_text(x + 6, y + h / 2, text=label, anchor="w", state="disabled")
+
+    def _cell_at(self, event):
+        for item in self.canvas.find_overlapping(event.x, event.y, event.x, event.y):
+            if item in self.cells:
+                return self.cells[item]
+        return None
+
+    def on_motion(self, event):
+        cell = self._cell_at(event)
+        if cell:
+            day, secs = cell
+            self.lbl_info.config(text=f"{day.strftime('%Y-%m-%d (%a)')}: {seconds_to_hms(secs)}")
+
+    def on_click(self, event):
+        cell = self._cell_at(event)
+        if cell:
+            self.parent.show_day(cell[0])
+
+
+class OverlapAuditWindow(tk.Toplevel):
+    ACTIONS = (("trim", "Обрезать"), ("merge", "Объединить"), ("delete", "Удалить позднюю"))
+
+    def __init__(self, parent):
+        super().__init__(parent.root)
+        self.parent = parent
+        self.title("Перекрытия в логе")
+        self.geometry("900x450")
+
+        self.lbl_info = ttk.Label(self, text="")
+        self.lbl_info.pack(anchor="w", padx=10, pady=(10, 4))
+
+        cols = ("first", "second", "overlap")
+        self.tree = ttk.Treeview(self, columns=cols, show="tree headings", height=15, selectmode="extended")
+        self.tree.heading("#0", text="День")
+        self.tree.column("#0", width=120)
+        for c, h, w in zip(cols, ("Первая запись", "Вторая запись", "Перекрытие"), (330, 330, 100)):
+            self.tree.heading(c, text=h)
+            self.tree.column(c, width=w, anchor="center" if c == "overlap" else "w")
+        self.tree.pack(fill="both", expand=True, padx=10)
+
+        btn_frame = ttk.Frame(self)
+        btn_frame.pack(pady=8)
+        ttk.Label(btn_frame, text="Исправить выбранные (или все):").pack(side="left", padx=5)
+        for action, title in self.ACTIONS:
+            ttk.Button(btn_frame, text=title, command=lambda a=action: self.apply(a)).pack(side="left", padx=5)
+        ttk.Button(btn_frame, text="Закрыть", command=self.destroy).pack(side="left", padx=5)
+
+        self.reload()
+
+    def reload(self):
+        self.data = load_time_log()
+        self.pairs = tracker.find_log_overlaps(self.data)
+        self.tree.delete(*self.tree.get_children())
+
+        def describe(idx):
+            s, en, label = tracker.parse_range(self.data[idx])
+            return f"{s.strftime('%H:%M')}–{en.strftime('%H:%M')} {label}"
+
+        days = {}
+        for n, (i, j, ov_s, ov_e) in enumerate(self.pairs):
+            day = ov_s.strftime("%Y-%m-%d")
+            if day not in days:
+                days[day] = self.tree.insert("", "end", text=day, open=True)
+            self.tree.insert(days[day], "end", iid=f"p{n}", values=(
+                describe(i), describe(j), seconds_to_hm(int((ov_e - ov_s).total_seconds()))))
+
+        covered = [(s, en, tracker.removed_seconds(e, s, en)) for e in self.data
+                   for s, en, _ in [tracker.parse_range(e)] if s and en]
+        total = sum(int(e.get("duration_seconds", 0) or 0) for e in self.data if isinstance(e, dict))
+        wall = tracker.union_seconds(covered)
+        self.lbl_info.config(text=f"Пар с перекрытием: {len(self.pairs)}.  "
+                                  f"Сумма записей: {seconds_to_hms(total)}, без перекрытий: {seconds_to_hms(wall)}")
+
+    def _selected_pairs(self):
+        chosen = set()
+        for iid in self.tree.selection():
+            kids = self.tree.get_children(iid)
+            chosen.update(kids if kids else (iid,))
+        if not chosen:
+            return list(self.pairs)
+        return [self.pairs[int(iid[1:])] for iid in chosen]
+
+    def apply(self, action):
+        pairs = self._selected_pairs()
+        if not pairs:
+            return
+        title = dict(self.ACTIONS)[action]
+        if not messagebox.askyesno("Перекрытия", f"{title}: {len(pairs)} пар(ы)?", parent=self):
+            return
+        data = tracker.repair_overlaps(self.data, pairs, action)
+        save_time_log(data)
+        self.parent.update()
+        self.reload()
+
 if __name__ == "__main__":
+    workspace.activate(workspace.active_name())
     root = tk.Tk()
+    install_error_handler(root)
     app = ReportApp(root)
     root.mainloop()
 
@@ -1,19 +1,35 @@
 # start.py
+import sys
+from time_tracker.startup import StartupProfile
+profile = StartupProfile(enabled="--profile-startup" in sys.argv)
+
 import tkinter as tk
 from tkinter import ttk, messagebox
-import datetime, json, os, uuid, threading, time, subprocess, sys
+import datetime, json, os, uuid, threading, time, subprocess, itertools
 from pathlib import Path
+profile.mark("import tkinter + stdlib")
 
-# local modules
-from time_tracker import tracker
+# local modules (Pillow, the CSV importer and file dialogs load on first use)
+import utils
+from time_tracker import tracker, workspace, activity
 from time_tracker.screenshot_manager import ScreenshotManager
+from time_tracker.retention import RetentionSweeper, retention_policy
+from time_tracker.deadlines import DeadlineIndex
+from time_tracker.totals import TaskTotals
+from time_tracker.watchdog import StallWatchdog
+from time_tracker.suggest import PrefixIndex
+from time_tracker.search import SearchIndex
 from utils import (
     load_tasks, save_tasks,
+    archive_done_tasks, load_archived_tasks, restore_archived_tasks,
     mask_date_entry, mask_time_entry,
     load_settings, save_settings,
-    seconds_to_hms, DEFAULT_SETTINGS,
-    SCREENSHOT_BASE
+    seconds_to_hms, DEFAULT_SETTINGS, attach_autocomplete, install_error_handler
 )
+profile.mark("import app modules")
+
+FIRST_PAINT_ROWS = 60  # rows inserted before the window is shown; the rest follow in slices
+FILL_CHUNK = 300
 
 # Toast (auto-size to show full text)
 class Toast:
@@ -60,10 +76,11 @@ class Toast:
 
 class TodoApp:
     def __init__(self, root):
+        # data paths are whatever utils points at: __main__ activates the saved
+        # workspace, the benchmark points them at its fixture
         self.root = root
-        self.root.title("To-Do Менеджер + Таймер")
-        self.tasks = load_tasks()
-        self.settings = load_settings()
+        self._set_title()
+        self._load_data()
         self.timer_running = False
         self.current_task_id = None
 
@@ -72,8 +89,14 @@ class TodoApp:
         self.current_log_start = None
         self.autosave_thread = None
         self.stop_autosave_flag = threading.Event()
+        # order of running-record writes, so a late autosave hand-over cannot undo a newer one
+        self._write_seq = itertools.count()
+        self._applied_seq = 0
         # autosave interval seconds (5 minutes)
         self.AUTO_SAVE_INTERVAL = 300
+        # per-minute input/idle bitmap of the running session, filled by a sampler thread
+        self.timeline = None
+        self._sampler_stop = None
 
         # Screenshot manager (providing a callback to get current project)
         def _get_project_for_screenshot():
@@ -84,26 +107,36 @@ class TodoApp:
             return "Общее"
 
         self.screenshot_mgr = ScreenshotManager(
-            base_dir=SCREENSHOT_BASE,
+            base_dir=utils.SCREENSHOT_BASE,
             get_project_callback=_get_project_for_screenshot,
             toast_master=self.root,
             autoscreen_enabled=self.settings.get("autoscreen_enabled", True),
-            interval_minutes=int(self.settings.get("autoscreen_interval", 15))
+            interval_minutes=int(self.settings.get("autoscreen_interval", 15)),
+            daily_budget_mb=self.settings.get("screenshot_budget_mb", 0),
+            image_format=self.settings.get("screenshot_format", "jpeg"),
+            active_monitor_only=self.settings.get("screenshot_active_monitor", False)
         )
 
+        # background retention / quota sweeper for screenshots (started after first paint)
+        self.retention = RetentionSweeper(utils.SCREENSHOT_BASE, retention_policy(self.settings))
+        self.screenshot_mgr.on_saved = self.retention.note_added
+
         # Build UI (keeps structure similar to previous file)
         top = ttk.Frame(root, padding=5)
         top.pack(fill="x")
         ttk.Label(top, text="Задача:").pack(side="left")
-        self.entry_text = ttk.Entry(top, width=40); self.entry_text.pack(side="left", padx=5)
+        self.entry_text = ttk.Combobox(top, width=40); self.entry_text.pack(side="left", padx=5)
+        attach_autocomplete(self.entry_text, self.idx_text, inline=False)
 
         ttk.Label(top, text="Проект:").pack(side="left")
         self.entry_project = ttk.Combobox(top, values=self.get_projects(), width=14)
         self.entry_project.pack(side="left", padx=5)
+        attach_autocomplete(self.entry_project, self.idx_project)
 
         ttk.Label(top, text="Раздел:").pack(side="left")
         self.entry_section = ttk.Combobox(top, values=self.get_sections(), width=12)
         self.entry_section.pack(side="left", padx=5)
+        attach_autocomplete(self.entry_section, self.idx_section)
 
         ttk.Label(top, text="Дедлайн:").pack(side="left", padx=(6, 0))
         self.entry_deadline = ttk.Entry(top, width=12); self.entry_deadline.pack(side="left", padx=(2,6))
@@ -126,8 +159,20 @@ class TodoApp:
         self.spin_interval = tk.Spinbox(setf, from_=1, to=120, width=5, command=self.save_current_settings)
         self.spin_interval.delete(0, "end"); self.spin_interval.insert(0, self.settings.get("autoscreen_interval", 15))
         self.spin_interval.pack(side="left")
+        ttk.Label(setf, text="Лимит (МБ/день):").pack(side="left", padx=(10,5))
+        self.spin_budget = tk.Spinbox(setf, from_=0, to=10000, width=6, command=self.save_current_settings)
+        self.spin_budget.delete(0, "end"); self.spin_budget.insert(0, self.settings.get("screenshot_budget_mb", 0))
+        self.spin_budget.pack(side="left")
+        self.var_webp = tk.BooleanVar(value=self.settings.get("screenshot_format", "jpeg") == "webp")
+        ttk.Checkbutton(setf, text="WebP", variable=self.var_webp,
+                        command=self.save_current_settings).pack(side="left", padx=(8,0))
+        self.var_active_monitor = tk.BooleanVar(value=self.settings.get("screenshot_active_monitor", False))
+        ttk.Checkbutton(setf, text="Только активный монитор", variable=self.var_active_monitor,
+                        command=self.save_current_settings).pack(side="left", padx=(8,0))
         ttk.Button(setf, text="📸 Скриншот сейчас", command=self.screenshot_mgr.manual_screenshot).pack(side="left", padx=10)
         ttk.Button(setf, text="📊 Отчёты", command=self.open_reports).pack(side="left")
+        self.lbl_shot_usage = ttk.Label(setf, text="", foreground="gray")
+        self.lbl_shot_usage.pack(side="left", padx=10)
 
         # timer area
         timerf = ttk.Frame(root, padding=5); timerf.pack(fill="x")
@@ -135,19 +180,37 @@ class TodoApp:
         self.timer_indicator = ttk.Label(timerf, text="●", foreground="gray"); self.timer_indicator.pack(side="left")
         self.btn_start = ttk.Button(timerf, text="▶️ Старт", command=self.start_timer); self.btn_start.pack(side="left", padx=5)
         self.btn_stop = ttk.Button(timerf, text="⏹ Стоп", command=self.stop_timer, state="disabled"); self.btn_stop.pack(side="left", padx=5)
+        self.var_idle_trim = tk.BooleanVar(value=self.settings.get("idle_trim", False))
+        ttk.Checkbutton(timerf, text=f"Вычитать простои ≥ {self.settings.get('idle_trim_minutes', 10)} мин",
+                        variable=self.var_idle_trim, command=self.save_current_settings).pack(side="left", padx=8)
 
         # Add manual activity button
         self.btn_add_activity = ttk.Button(timerf, text="Добавить активность", command=self.add_manual_activity)
         self.btn_add_activity.pack(side="left", padx=6)
+        ttk.Button(timerf, text="📥 Импорт", command=self.import_activities).pack(side="left", padx=6)
 
         self.current_task_label = ttk.Label(timerf, text="", foreground="black"); self.current_task_label.pack(side="left", padx=10)
 
+        # search
+        searchf = ttk.Frame(root, padding=(5, 0)); searchf.pack(fill="x")
+        ttk.Label(searchf, text="🔍 Поиск:").pack(side="left")
+        self.var_search = tk.StringVar()
+        self.entry_search = ttk.Entry(searchf, textvariable=self.var_search, width=40); self.entry_search.pack(side="left", padx=5)
+        self.entry_search.bind("<KeyRelease>", self._on_search_key)
+        self.var_fuzzy = tk.BooleanVar(value=False)
+        ttk.Checkbutton(searchf, text="Нечёткий", variable=self.var_fuzzy, command=self._apply_search).pack(side="left", padx=5)
+        self.var_search_log = tk.BooleanVar(value=False)
+        ttk.Checkbutton(searchf, text="Искать в журнале времени", variable=self.var_search_log, command=self._apply_search).pack(side="left", padx=5)
+        self._search_after = None
+
         # tree tasks
-        self.tree = ttk.Treeview(root, columns=("text","date","deadline","project","section","note","done"), show="headings", height=15)
+        self.tree = ttk.Treeview(root, columns=("text","date","deadline","project","section","note","spent","today","week","done"),
+                                 show="headings", height=15, selectmode="extended")
         self.tree.pack(fill="both", expand=True, padx=5, pady=5)
         column_spec = [
             ("text","Задача",520), ("date","Дата",70), ("deadline","Дедлайн",90),
-            ("project","Проект",140), ("section","Раздел",120), ("note","Заметка",160), ("done","✓",40)
+            ("project","Проект",140), ("section","Раздел",120), ("note","Заметка",160),
+            ("spent","Всего",70), ("today","Сегодня",70), ("week","Неделя",70), ("done","✓",40)
         ]
         for col,name,width in column_spec:
             self.tree.heading(col, text=name)
@@ -159,21 +222,197 @@ class TodoApp:
         bottom = ttk.Frame(root, padding=5); bottom.pack(fill="x")
         ttk.Button(bottom, text="✅ Готово", command=self.mark_done).pack(side="left", padx=5)
         ttk.Button(bottom, text="🗑️ Удалить", command=self.delete_task).pack(side="left", padx=5)
+        ttk.Button(bottom, text="📦 Изменить выбранные", command=self.bulk_edit).pack(side="left", padx=5)
+        ttk.Button(bottom, text="🗄 Архив", command=self.open_archive).pack(side="left", padx=5)
         ttk.Button(bottom, text="🚪 Выход", command=root.quit).pack(side="right", padx=5)
 
-        # initialize screenshot manager (archive check runs inside)
-        self.screenshot_mgr.start_autoscreen_if_needed()
+        profile.mark("build UI")
+
+        # deadline index: one root.after() wake-up for the next overdue/reminder transition
+        self.deadlines = DeadlineIndex(reminder_hours=self.settings.get("deadline_reminder_hours", 0))
+        self.deadlines.rebuild(self.tasks)
+        self._deadline_after = None
+
+        # tracked time per task, kept up to date from our own log writes;
+        # the log is read after first paint (first _sync_totals: version None -> rebuild)
+        self.totals = TaskTotals()
+        self._totals_version = None
+        self._live_saved = 0  # seconds of the running session already counted in totals
+
+        self.watchdog = None  # UI stall watchdog, started after first paint
+        menubar = tk.Menu(root)
+        self.ws_menu = tk.Menu(menubar, tearoff=False, postcommand=self._fill_workspace_menu)
+        menubar.add_cascade(label="Пространство", menu=self.ws_menu)
+        debug_menu = tk.Menu(menubar, tearoff=False)
+        debug_menu.add_command(label="Зависания интерфейса...", command=self.show_stalls)
+        menubar.add_cascade(label="Отладка", menu=debug_menu)
+        root.config(menu=menubar)
+
+        # first screenful now; the rest and everything that reads the log once the window is up
+        self._fill_after = None
+        self._startup_done = False
+        self._rows = set()  # iids in the tree, mirrored here: membership checks without a Tcl call
+        self.refresh(limit=FIRST_PAINT_ROWS)
+        profile.mark("first rows")
+        self.root.after_idle(self._after_first_paint)
+
+    def _set_title(self):
+        suffix = "" if workspace.current == workspace.DEFAULT else f" — {workspace.current}"
+        self.root.title("To-Do Менеджер + Таймер" + suffix)
+
+    def _load_data(self):
+        # tasks, settings and indexes of the active workspace
+        self.tasks = load_tasks()
+        self.settings = load_settings()
+        profile.mark("load tasks + settings")
+        # keep tasks.json small: old completed tasks go to the archive
+        self.tasks, changed = archive_done_tasks(self.tasks, self.settings.get("archive_done_after_days", 0))
+        if changed:
+            save_tasks(self.tasks)
+        # type-ahead indexes, maintained incrementally on every task change
+        self.idx_project, self.idx_section, self.idx_text = PrefixIndex(), PrefixIndex(), PrefixIndex()
+        self.search = SearchIndex()       # text / note / project / section of tasks
+        self.search_log = SearchIndex()   # task_text words from the time log, by task_id
+        for idx, key in ((self.idx_project, "project"), (self.idx_section, "section"), (self.idx_text, "text")):
+            idx.add_many((t.get(key, ""), t.get("date")) for t in self.tasks)
+        self.search.add_tasks(self.tasks)
+        profile.mark("archive + indexes")
 
+    # workspaces: only the active one is loaded, switching happens in place
+    def _fill_workspace_menu(self):
+        self.ws_menu.delete(0, "end")
+        self._ws_var = tk.StringVar(value=workspace.current)
+        for name in workspace.list_workspaces():
+            self.ws_menu.add_radiobutton(label=name, value=name, variable=self._ws_var,
+                                         command=lambda n=name: self.switch_workspace(n))
+        self.ws_menu.add_separator()
+        self.ws_menu.add_command(label="Новое пространство...", command=self.new_workspace)
+
+    def new_workspace(self):
+        from tkinter import simpledialog
+        name = simpledialog.askstring("Новое пространство", "Название:", parent=self.root)
+        if not name:
+            return
+        try:
+            name = workspace.create(name)
+        except ValueError as e:
+            messagebox.showerror("Пространство", str(e)); return
+        self.switch_workspace(name)
+
+    def switch_workspace(self, name):
+        if name == workspace.current:
+            return
+        if self.timer_running:
+            self.stop_timer()
+        self.retention.stop()
+        workspace.activate(name, remember=True)
+        self._set_title()
+        self._load_data()
+        self.entry_text['values'] = ()
+        self.var_search.set("")
+
+        # screenshots: same manager, new root; new sweeper for the new tree
+        self.screenshot_mgr.set_base_dir(utils.SCREENSHOT_BASE)
+        self.retention = RetentionSweeper(utils.SCREENSHOT_BASE, retention_policy(self.settings))
+        self.screenshot_mgr.on_saved = self.retention.note_added
+        self.retention.start()
+        self.var_autoscreen.set(self.settings.get("autoscreen_enabled", True))
+        self.spin_interval.delete(0, "end"); self.spin_interval.insert(0, self.settings.get("autoscreen_interval", 15))
+        self.spin_budget.delete(0, "end"); self.spin_budget.insert(0, self.settings.get("screenshot_budget_mb", 0))
+        self.var_webp.set(self.settings.get("screenshot_format", "jpeg") == "webp")
+        self.var_active_monitor.set(self.settings.get("screenshot_active_monitor", False))
+        self.var_idle_trim.set(self.settings.get("idle_trim", False))
+        self.screenshot_mgr.update_settings(
+            self.settings.get("autoscreen_enabled", True), int(self.settings.get("autoscreen_interval", 15)),
+            daily_budget_mb=self.settings.get("screenshot_budget_mb", 0),
+            image_format=self.settings.get("screenshot_format", "jpeg"),
+            active_monitor_only=self.settings.get("screenshot_active_monitor", False))
+
+        self.deadlines = DeadlineIndex(reminder_hours=self.settings.get("deadline_reminder_hours", 0))
+        self.deadlines.rebuild(self.tasks)
+        self._schedule_deadline_wakeup()
+        self.totals = TaskTotals()
+        self._totals_version = None
+        self.tree.delete(*self._rows)
+        self._rows.clear()
         self.refresh()
+        self._sync_totals()  # reads the new log (version None -> rebuild)
+        Toast(self.root, f"Пространство: {name}")
+
+    # startup, after the window is shown
+    def _after_first_paint(self):
+        profile.first_paint()
+        self._fill_rest(self._visible_tasks(), FIRST_PAINT_ROWS)
+
+    def _fill_rest(self, visible, pos):
+        self._fill_after = None
+        today = datetime.date.today()
+        for t in visible[pos:pos + FILL_CHUNK]:
+            if t["id"] not in self._rows:
+                self._insert_row("end", t, today)
+        if pos + FILL_CHUNK < len(visible):
+            self._fill_after = self.root.after(1, self._fill_rest, visible, pos + FILL_CHUNK)
+        else:
+            profile.mark("remaining rows")
+            self.root.after(1, self._finish_startup)
+
+    def _finish_startup(self):
+        if self._startup_done:
+            return
+        self._startup_done = True
+        self._sync_totals()  # reads the log: totals, log search index, time columns
+        profile.mark("time log + totals")
         self.update_timer()
+        self._schedule_deadline_wakeup()
+        self.retention.start()
+        self.screenshot_mgr.start_autoscreen_if_needed()
+        if self.settings.get("stall_watchdog", False):
+            self.watchdog = StallWatchdog(self.root, threshold_ms=int(self.settings.get("stall_threshold_ms", 250)))
+            self.watchdog.start()
+        profile.mark("background services")
+        profile.report()
 
     # helpers
     def get_sections(self):
-        vals = sorted({t.get("section","") for t in self.tasks if t.get("section")})
-        return vals or ["Общее"]
+        return self.idx_section.complete("", limit=None) or ["Общее"]
     def get_projects(self):
-        vals = sorted({t.get("project","") for t in self.tasks if t.get("project")})
-        return vals or ["Общее"]
+        return self.idx_project.complete("", limit=None) or ["Общее"]
+
+    def _index_task(self, t, remove=False):
+        for idx, key in ((self.idx_project, "project"), (self.idx_section, "section"), (self.idx_text, "text")):
+            if remove:
+                idx.remove(t.get(key, ""))
+            else:
+                idx.add(t.get(key, ""), t.get("date"))
+        if remove:
+            self.search.remove(t["id"])
+        else:
+            self.search.add_task(t)
+
+    def _index_log(self, log):
+        texts = {}
+        for e in log:
+            if e.get("task_id") and e.get("task_text"):
+                texts.setdefault(e["task_id"], set()).add(e["task_text"])
+        self.search_log = SearchIndex()
+        self.search_log.add_many(texts.items())
+
+    def _search_ids(self):
+        q = self.var_search.get()
+        ids = self.search.query(q, fuzzy=self.var_fuzzy.get())
+        if ids is not None and self.var_search_log.get():
+            ids |= self.search_log.query(q, fuzzy=self.var_fuzzy.get()) or set()
+        return ids
+
+    def _on_search_key(self, event=None):
+        # debounce: filter once typing pauses
+        if self._search_after:
+            self.root.after_cancel(self._search_after)
+        self._search_after = self.root.after(120, self._apply_search)
+
+    def _apply_search(self):
+        self._search_after = None
+        self.refresh(values_changed=False)
 
     def add_task(self):
         text = self.entry_text.get().strip()
@@ -192,6 +431,8 @@ class TodoApp:
         }
         self.tasks.append(t)
         save_tasks(self.tasks)
+        self._index_task(t)
+        self.deadlines.update(t); self._schedule_deadline_wakeup()
         self.entry_text.delete(0, tk.END)
         try:
             self.entry_project.set(""); self.entry_section.set("")
@@ -199,51 +440,251 @@ class TodoApp:
         self.entry_deadline.delete(0, tk.END); self.entry_note.delete(0, tk.END)
         self.refresh()
 
-    def refresh(self):
-        try:
-            self.entry_project['values'] = self.get_projects()
-            self.entry_section['values'] = self.get_sections()
-        except: pass
-
+    def _visible_tasks(self):
         hide_done = getattr(self, "var_hide_done", tk.BooleanVar(value=True)).get()
+        match = self._search_ids()
+        return [t for t in self.tasks
+                if not (hide_done and t.get("done")) and (match is None or t["id"] in match)]
+
+    def refresh(self, values_changed=True, limit=None):
+        """
+        Diff the tree against the visible task list: rows that left the filter are
+        deleted, new ones inserted in place. values_changed=False (search typing)
+        leaves rows that stay visible untouched. limit: only the first rows (startup).
+        """
+        if self._fill_after:  # a full refresh supersedes the startup fill
+            self.root.after_cancel(self._fill_after)
+            self._fill_after = None
+            self.root.after(1, self._finish_startup)
+        if values_changed:
+            try:
+                self.entry_project['values'] = self.get_projects()
+                self.entry_section['values'] = self.get_sections()
+            except: pass
+
+        today = datetime.date.today()
+        visible = self._visible_tasks()
+        wanted = {t["id"] for t in visible}
+        gone = self._rows - wanted
+        if gone:
+            self.tree.delete(*gone)
+            self._rows -= gone
+        for pos, t in enumerate(visible[:limit] if limit else visible):
+            if t["id"] not in self._rows:
+                self._insert_row(pos, t, today)
+            elif values_changed:
+                self.tree.item(t["id"], values=self._row_values(t, today), tags=self._row_tags(t, today))
+
+    def _insert_row(self, pos, t, today):
+        self.tree.insert("", pos, iid=t["id"], values=self._row_values(t, today), tags=self._row_tags(t, today))
+        self._rows.add(t["id"])
+
+    def _row_values(self, t, today=None):
+        return (t["text"], t.get("date",""), t.get("deadline",""),
+                t.get("project",""), t.get("section",""), t.get("note",""),
+                *self._task_time_values(t["id"], today),
+                "✅" if t.get("done") else "")
+
+    def _row_tags(self, t, today=None):
+        tags = []
+        if t.get("done"): tags.append("done")
+        elif self.deadlines.is_overdue(t["id"], today): tags.append("overdue")
+        if t["id"] == self.current_task_id: tags.append("current")
+        return tags
+
+    def _update_rows(self, changed):
+        # incremental UI update for a batch: only the touched rows
+        hide_done = self.var_hide_done.get()
         today = datetime.date.today()
-        for i in self.tree.get_children():
-            self.tree.delete(i)
-        for t in self.tasks:
-            if hide_done and t.get("done"): continue
-            tags = []
-            if t.get("done"): tags.append("done")
+        for t in changed:
+            tid = t["id"]
+            if hide_done and t.get("done"):
+                if tid in self._rows:
+                    self.tree.delete(tid); self._rows.discard(tid)
+            elif tid in self._rows:
+                self.tree.item(tid, values=self._row_values(t, today), tags=self._row_tags(t, today))
             else:
-                dl = t.get("deadline","")
-                if dl:
-                    try:
-                        d = datetime.datetime.strptime(dl, "%d.%m.%Y").date()
-                        if d < today: tags.append("overdue")
-                    except: pass
-            self.tree.insert("", "end", iid=t["id"],
-                values=(t["text"], t.get("date",""), t.get("deadline",""),
-                        t.get("project",""), t.get("section",""), t.get("note",""),
-                        "✅" if t.get("done") else ""), tags=tags)
+                self._insert_row("end", t, today)
+
+    def _selected_tasks(self):
+        ids = set(self.tree.selection())
+        return [t for t in self.tasks if t["id"] in ids]
+
+    def open_archive(self):
+        win = tk.Toplevel(self.root); win.title("Архив"); win.geometry("900x450")
+        cols = ("text", "project", "section", "date", "done_at")
+        tree = ttk.Treeview(win, columns=cols, show="headings", selectmode="extended")
+        for col, name, width in (("text", "Задача", 420), ("project", "Проект", 140), ("section", "Раздел", 120),
+                                 ("date", "Дата", 80), ("done_at", "Готово", 80)):
+            tree.heading(col, text=name); tree.column(col, width=width, anchor="w")
+        tree.pack(fill="both", expand=True, padx=5, pady=5)
+        lbl = ttk.Label(win, text="Загрузка..."); lbl.pack(side="left", padx=8)
+
+        # archive is read only now, rows are inserted in chunks to keep the window responsive
+        archived = load_archived_tasks()
+        def fill(pos=0, chunk=500):
+            for t in archived[pos:pos + chunk]:
+                if not tree.exists(t["id"]):
+                    tree.insert("", "end", iid=t["id"], values=(
+                        t.get("text", ""), t.get("project", ""), t.get("section", ""),
+                        t.get("date", ""), t.get("done_at", "")))
+            if pos + chunk < len(archived):
+                win.after(1, fill, pos + chunk)
+            else:
+                lbl.config(text=f"Задач в архиве: {len(archived)}")
+        fill()
+
+        def restore():
+            sel = tree.selection()
+            if not sel: return
+            back = restore_archived_tasks(sel)
+            for t in back:
+                t["done"] = False; t.pop("done_at", None)
+            self.tasks.extend(back)
+            save_tasks(self.tasks)
+            for t in back:
+                self.deadlines.update(t)
+                self._index_task(t)
+            self._schedule_deadline_wakeup()
+            tree.delete(*sel)
+            self.refresh()
+        ttk.Button(win, text="↩ Вернуть в работу", command=restore).pack(side="right", padx=8, pady=6)
+
+    # tracked time columns
+    def _task_time_values(self, tid, today=None):
+        total, day, week = self.totals.get(tid, today)
+        if self.timer_running and tid == self.current_task_id:
+            live = max(0, int(time.time() - self.timer_start) - self._live_saved)
+            total += live; day += live; week += live
+        return tuple(seconds_to_hms(x) if x else "" for x in (total, day, week))
+
+    def _log_written(self, entry):
+        # called on the Tk thread after every own write to the log
+        self.totals.upsert(entry)
+        if entry.get("task_id") and entry.get("task_text"):
+            self.search_log.extend(entry["task_id"], entry["task_text"])
+        if self.timer_running and entry.get("start") == self.current_log_start:
+            self._live_saved = int(entry.get("duration_seconds", 0))
+        self._totals_version = tracker.log_version()
+
+    def _sync_totals(self):
+        # the report (another process) may have edited the log: cheap version check, rebuild on change
+        try:
+            version = tracker.log_version()
+        except Exception:
+            return  # daemon not answering: keep what we have, retry next tick
+        if version != self._totals_version:
+            self._totals_version = version
+            try:
+                log = tracker.load_time_log(strict=True)
+            except Exception:
+                return  # keep the current totals until the log changes again
+            self.totals.rebuild(log)
+            self._index_log(log)
+            self.refresh()
+            self.highlight_current_task()
+
+    # deadline transitions: one pending after(), only affected rows re-tagged
+    def _schedule_deadline_wakeup(self):
+        if self._deadline_after:
+            self.root.after_cancel(self._deadline_after)
+        delay = (self.deadlines.next_wakeup() - datetime.datetime.now()).total_seconds()
+        # +1s so the transition moment is already in the past when we wake up
+        self._deadline_after = self.root.after(int(max(0, delay) * 1000) + 1000, self._on_deadline_wakeup)
+
+    def _on_deadline_wakeup(self):
+        self._deadline_after = None
+        for tid, kind in self.deadlines.pop_due():
+            task = next((t for t in self.tasks if t["id"] == tid), None)
+            if not task:
+                continue
+            if kind == "overdue" and tid in self._rows:
+                tags = list(self.tree.item(tid, "tags"))
+                if "overdue" not in tags:
+                    tags.append("overdue")
+                    self.tree.item(tid, tags=tags)
+            elif kind == "remind":
+                Toast(self.root, f"Скоро дедлайн ({task.get('deadline','')}): {task.get('text','')}", duration=8000)
+        self._schedule_deadline_wakeup()
 
     def mark_done(self):
-        sel = self.tree.selection()
-        if not sel: return
-        tid = sel[0]
-        for t in self.tasks:
-            if t["id"] == tid:
-                t["done"] = not t.get("done", False)
-                break
+        # whole selection: if everything is already done -> undo, else mark all done
+        chosen = self._selected_tasks()
+        if not chosen: return
+        done = not all(t.get("done") for t in chosen)
+        today_s = datetime.date.today().strftime("%d.%m.%Y")
+        for t in chosen:
+            t["done"] = done
+            if done:
+                t.setdefault("done_at", today_s)
+            else:
+                t.pop("done_at", None)
+            self.deadlines.update(t)
         save_tasks(self.tasks)
-        self.refresh()
+        self._schedule_deadline_wakeup()
+        self._update_rows(chosen)
 
     def delete_task(self):
-        sel = self.tree.selection()
-        if not sel: return
-        if not messagebox.askyesno("Удалить", "Удалить выбранную задачу?"): return
-        tid = sel[0]
-        self.tasks = [t for t in self.tasks if t["id"] != tid]
+        chosen = self._selected_tasks()
+        if not chosen: return
+        question = "Удалить выбранную задачу?" if len(chosen) == 1 else f"Удалить выбранные задачи ({len(chosen)})?"
+        if not messagebox.askyesno("Удалить", question): return
+        ids = {t["id"] for t in chosen}
+        self.tasks = [t for t in self.tasks if t["id"] not in ids]
         save_tasks(self.tasks)
-        self.refresh()
+        for t in chosen:
+            self._index_task(t, remove=True)
+        for tid in ids:
+            self.deadlines.remove(tid)
+        self.tree.delete(*(ids & self._rows))
+        self._rows -= ids
+
+    def bulk_edit(self):
+        chosen = self._selected_tasks()
+        if not chosen: return
+        win = tk.Toplevel(self.root); win.title(f"Изменить задачи ({len(chosen)})"); win.geometry("420x200")
+        ttk.Label(win, text="Пустое поле — не менять.", foreground="gray").pack(anchor="w", padx=10, pady=(8,0))
+        def row(label):
+            f = ttk.Frame(win, padding=4); f.pack(fill="x", padx=6)
+            ttk.Label(f, text=label, width=12).pack(side="left")
+            return f
+        e_project = ttk.Combobox(row("Проект:"), values=self.get_projects()); e_project.pack(side="left", fill="x", expand=True)
+        e_section = ttk.Combobox(row("Раздел:"), values=self.get_sections()); e_section.pack(side="left", fill="x", expand=True)
+        attach_autocomplete(e_project, self.idx_project); attach_autocomplete(e_section, self.idx_section)
+        f_dl = row("Дедлайн:")
+        e_deadline = ttk.Entry(f_dl, width=12); e_deadline.pack(side="left"); mask_date_entry(e_deadline)
+        var_clear_dl = tk.BooleanVar(value=False)
+        ttk.Checkbutton(f_dl, text="убрать", variable=var_clear_dl).pack(side="left", padx=8)
+
+        def apply():
+            project, section, deadline = e_project.get().strip(), e_section.get().strip(), e_deadline.get().strip()
+            if deadline:
+                try:
+                    datetime.datetime.strptime(deadline, "%d.%m.%Y")
+                except ValueError:
+                    Toast(self.root, "Неверный формат даты.", duration=3000); return
+            if var_clear_dl.get():
+                deadline = ""
+            elif not deadline:
+                deadline = None
+            for t in chosen:
+                self._index_task(t, remove=True)
+                if project: t["project"] = project
+                if section: t["section"] = section
+                if deadline is not None:
+                    t["deadline"] = deadline
+                    self.deadlines.update(t)
+                self._index_task(t)
+            save_tasks(self.tasks)
+            self._schedule_deadline_wakeup()
+            self.entry_project['values'] = self.get_projects()
+            self.entry_section['values'] = self.get_sections()
+            self._update_rows(chosen)
+            win.destroy()
+
+        btns = ttk.Frame(win, padding=6); btns.pack(fill="x")
+        ttk.Button(btns, text="💾 Применить", command=apply).pack(side="left", padx=6)
+        ttk.Button(btns, text="❌ Отмена", command=win.destroy).pack(side="left")
 
     def open_edit(self):
         sel = self.tree.selection()
@@ -261,6 +702,7 @@ class TodoApp:
         make_row_label(f2, "Проект:"); e_project = ttk.Combobox(f2, values=self.get_projects()); e_project.pack(side="left", fill="x", expand=True); e_project.set(task.get("project",""))
         f3 = ttk.Frame(win, padding=4); f3.pack(fill="x", padx=6, pady=(6,0))
         make_row_label(f3, "Раздел:"); e_section = ttk.Combobox(f3, values=self.get_sections()); e_section.pack(side="left", fill="x", expand=True); e_section.set(task.get("section",""))
+        attach_autocomplete(e_project, self.idx_project); attach_autocomplete(e_section, self.idx_section)
 
         f4 = ttk.Frame(win, padding=4); f4.pack(fill="x", padx=6, pady=(6,0))
         make_row_label(f4, "Дедлайн:"); e_deadline = ttk.Entry(f4); e_deadline.pack(side="left", fill="x", expand=True); e_deadline.insert(0, task.get("deadline","")); mask_date_entry(e_deadline)
@@ -269,9 +711,13 @@ class TodoApp:
         make_row_label(f5, "Заметка:"); e_note = ttk.Entry(f5); e_note.pack(side="left", fill="x", expand=True); e_note.insert(0, task.get("note",""))
 
         def save_edit():
+            self._index_task(task, remove=True)
             task["text"] = e_text.get().strip(); task["project"] = e_project.get().strip(); task["section"] = e_section.get().strip()
             task["deadline"] = e_deadline.get().strip(); task["note"] = e_note.get().strip()
-            save_tasks(self.tasks); self.refresh(); win.destroy()
+            self._index_task(task)
+            save_tasks(self.tasks)
+            self.deadlines.update(task); self._schedule_deadline_wakeup()
+            self.refresh(); win.destroy()
 
         btns = ttk.Frame(win, padding=6); btns.pack(fill="x")
         ttk.Button(btns, text="💾 Сохранить", command=save_edit).pack(side="left", padx=6)
@@ -303,20 +749,18 @@ class TodoApp:
             "end": datetime.datetime.fromtimestamp(self.timer_start).isoformat(),
             "duration_seconds": 0
         }
+        # idle queries can block (xprintidle has a 2 s timeout): keep them off the Tk thread
+        self.timeline = activity.Timeline(datetime.datetime.fromtimestamp(self.timer_start))
+        self._sampler_stop = threading.Event()
+        threading.Thread(target=activity.sample_loop, args=(self.timeline, self._sampler_stop), daemon=True).start()
         # store start iso to reliably find this record later
         self.current_log_start = entry["start"]
+        self._live_saved = 0
         try:
-            data = tracker.load_time_log()
-            data.append(entry)
-            # write file directly (tracker.append_time_log would also append but we want single write)
-            with open(tracker.TIME_LOG, "w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-        except Exception:
-            # best-effort: attempt to append via tracker.append_time_log
-            try:
-                tracker.append_time_log(entry)
-            except Exception:
-                pass
+            tracker.append_time_log(entry)
+            self._log_written(entry)
+        except Exception as e:
+            Toast(self.root, f"Ошибка записи: {e}", duration=4000)
 
         # start autosave thread (daemon)
         self.stop_autosave_flag.clear()
@@ -337,51 +781,65 @@ class TodoApp:
                 # swallow errors silently
                 pass
 
-    def _update_current_log_entry(self, allow_append=False):
+    def _finish_record(self, rec, now, trim_minutes):
+        # end/duration of the running record, its timeline, optional idle trimming;
+        # runs on the autosave thread too: the timeline is read as a locked snapshot
+        rec["end"] = now.isoformat()
+        rec["duration_seconds"] = int(now.timestamp() - self.timer_start)
+        timeline = self.timeline
+        act = timeline.snapshot(now) if timeline else None
+        if act:  # no idle source: no timeline at all
+            rec["activity"] = act
+            if trim_minutes:
+                activity.trim_idle(rec, trim_minutes)
+
+    def _update_current_log_entry(self, allow_append=False, trim_minutes=0):
         """
         Update the current activity record's 'end' and 'duration_seconds'.
         If allow_append==True and matching record not found, append a final record.
+        Returns the saved record (None if nothing was written).
         """
         if not self.current_task_id or not self.current_log_start:
-            return
+            return None
+        rec = {"task_id": self.current_task_id, "start": self.current_log_start}
+        self._finish_record(rec, datetime.datetime.now(), trim_minutes)
+        fields = {k: v for k, v in rec.items() if k != "task_id"}
+        defaults = None
+        if allow_append:
+            # fallback: append a final record if the start record is gone
+            task = next((t for t in self.tasks if t["id"] == self.current_task_id), {})
+            defaults = {"task_text": task.get("text", ""), "project": task.get("project", ""),
+                        "section": task.get("section", "")}
         try:
-            data = tracker.load_time_log()
-            found = False
-            for rec in data:
-                # match by task_id + start timestamp (exact string)
-                if rec.get("task_id") == self.current_task_id and rec.get("start") == self.current_log_start:
-                    now = datetime.datetime.now()
-                    duration = int(now.timestamp() - self.timer_start)
-                    rec["end"] = now.isoformat()
-                    rec["duration_seconds"] = duration
-                    found = True
-                    break
-            if found:
-                with open(tracker.TIME_LOG, "w", encoding="utf-8") as f:
-                    json.dump(data, f, ensure_ascii=False, indent=2)
-            else:
-                if allow_append:
-                    # fallback: append a final record
-                    now = datetime.datetime.now()
-                    duration = int(now.timestamp() - self.timer_start)
-                    fallback = {
-                        "task_id": self.current_task_id,
-                        "task_text": next((t.get("text","") for t in self.tasks if t["id"]==self.current_task_id), ""),
-                        "project": next((t.get("project","") for t in self.tasks if t["id"]==self.current_task_id), ""),
-                        "section": next((t.get("section","") for t in self.tasks if t["id"]==self.current_task_id), ""),
-                        "start": self.current_log_start,
-                        "end": now.isoformat(),
-                        "duration_seconds": duration
-                    }
-                    data.append(fallback)
-                    with open(tracker.TIME_LOG, "w", encoding="utf-8") as f:
-                        json.dump(data, f, ensure_ascii=False, indent=2)
+            # matched by task_id + start timestamp (exact string); only this record is sent
+            saved = tracker.update_time_log_entry(self.current_task_id, self.current_log_start, fields, defaults)
         except Exception:
             # silent ignore to avoid disturbing the UI
-            pass
+            return None
+        if saved:
+            # totals / search index belong to the Tk thread; autosave hands the entry over
+            seq = next(self._write_seq)
+            if threading.current_thread() is threading.main_thread():
+                self._saved_on_main(saved, self.current_log_start, seq)
+            else:
+                self.root.after(0, self._saved_on_main, saved, self.current_log_start, seq)
+        return saved
+
+    def _saved_on_main(self, saved, start, seq):
+        if seq < self._applied_seq:
+            return  # an autosave that queued up behind the final write of the session
+        self._applied_seq = seq
+        if saved.get("start") != start:
+            self.totals.discard(saved.get("task_id"), start)  # trimmed: start moved
+        self._log_written(saved)
 
     def stop_timer(self):
         if not self.timer_running: return
+        if self._sampler_stop:
+            self._sampler_stop.set()
+            self._sampler_stop = None
+        if self.timeline and self.timeline.sampled:
+            self.timeline.mark(datetime.datetime.now(), 0)  # the stop click is input
         self.timer_running = False
         self.btn_start.config(state="normal"); self.btn_stop.config(state="disabled")
         end_time = time.time(); elapsed = end_time - self.timer_start
@@ -389,8 +847,10 @@ class TodoApp:
         # stop autosave loop
         self.stop_autosave_flag.set()
         # final update: allow append if record not found
+        trim = self.settings.get("idle_trim_minutes", 10) if self.settings.get("idle_trim") else 0
+        rec = None
         try:
-            self._update_current_log_entry(allow_append=True)
+            rec = self._update_current_log_entry(allow_append=True, trim_minutes=trim)
         except Exception:
             # if update failed entirely, fallback to append exactly as before
             try:
@@ -405,12 +865,17 @@ class TodoApp:
                     "duration_seconds": int(elapsed)
                 }
                 tracker.append_time_log(entry)
+                self._log_written(entry)
             except Exception:
                 pass
 
         self.screenshot_mgr.stop_autoscreen()
-        Toast(self.root, f"Таймер остановлен ({seconds_to_hms(elapsed)})")
+        msg = f"Таймер остановлен ({seconds_to_hms(elapsed)})"
+        if rec and rec.get("idle_trimmed_seconds"):
+            msg += f"\nВычтены простои: {seconds_to_hms(rec['idle_trimmed_seconds'])}"
+        Toast(self.root, msg)
         # clear state and UI highlight
+        self.timeline = None
         self.remove_highlight()
         self.current_task_id = None
         self.current_log_start = None
@@ -418,7 +883,7 @@ class TodoApp:
 
     def highlight_current_task(self):
         self.remove_highlight()
-        if self.current_task_id and self.tree.exists(self.current_task_id):
+        if self.current_task_id in self._rows:
             tags = list(self.tree.item(self.current_task_id, "tags"))
             if "current" not in tags: tags.append("current")
             self.tree.item(self.current_task_id, tags=tags)
@@ -435,19 +900,45 @@ class TodoApp:
             elapsed = int(time.time() - self.timer_start)
             self.timer_label.config(text=seconds_to_hms(elapsed))
             self.timer_indicator.config(foreground="green" if elapsed % 2 == 0 else "gray")
+            if self.current_task_id in self._rows:
+                for col, val in zip(("spent", "today", "week"), self._task_time_values(self.current_task_id)):
+                    self.tree.set(self.current_task_id, col, val)
         else:
             self.timer_indicator.config(foreground="gray")
+        self.update_screenshot_usage()
+        self._sync_totals()
         self.root.after(1000, self.update_timer)
 
+    def update_screenshot_usage(self):
+        # in-memory counters only, no file access
+        used, count, avg = self.screenshot_mgr.usage_stats()
+        text = f"Сегодня: {used / 1048576:.1f} МБ, {count} шт." + (f" (~{avg // 1024} КБ)" if count else "")
+        budget = self.settings.get("screenshot_budget_mb", 0)
+        if budget:
+            text += f" из {budget} МБ"
+        if self.lbl_shot_usage.cget("text") != text:
+            self.lbl_shot_usage.config(text=text)
+
     def save_current_settings(self):
         self.settings["autoscreen_enabled"] = self.var_autoscreen.get()
         try:
             self.settings["autoscreen_interval"] = int(self.spin_interval.get())
         except Exception:
             self.settings["autoscreen_interval"] = DEFAULT_SETTINGS["autoscreen_interval"]
+        try:
+            self.settings["screenshot_budget_mb"] = max(0, int(self.spin_budget.get()))
+        except Exception:
+            self.settings["screenshot_budget_mb"] = DEFAULT_SETTINGS["screenshot_budget_mb"]
+        self.settings["screenshot_format"] = "webp" if self.var_webp.get() else "jpeg"
+        self.settings["screenshot_active_monitor"] = self.var_active_monitor.get()
+        self.settings["idle_trim"] = self.var_idle_trim.get()
         save_settings(self.settings)
         # notify screenshot manager of new settings
-        self.screenshot_mgr.update_settings(self.settings["autoscreen_enabled"], self.settings["autoscreen_interval"])
+        self.screenshot_mgr.update_settings(
+            self.settings["autoscreen_enabled"], self.settings["autoscreen_interval"],
+            daily_budget_mb=self.settings["screenshot_budget_mb"],
+            image_format=self.settings["screenshot_format"],
+            active_monitor_only=self.settings["screenshot_active_monitor"])
 
     # Manual activity dialog with overlap check and forbid future times
     def add_manual_activity(self):
@@ -515,6 +1006,8 @@ class TodoApp:
             }
             try:
                 tracker.append_time_log(entry)
+                self._log_written(entry)
+                self.refresh()
                 Toast(self.root, "Активность добавлена.", duration=2500)
                 win.destroy()
             except Exception as e:
@@ -524,16 +1017,62 @@ class TodoApp:
         ttk.Button(btns, text="💾 Сохранить", command=on_save).pack(side="left", padx=6)
         ttk.Button(btns, text="Отмена", command=win.destroy).pack(side="left")
 
+    # Bulk import: one sweep over log + batch, one write
+    def import_activities(self):
+        from tkinter import filedialog
+        from time_tracker import importer
+        path = filedialog.askopenfilename(
+            title="Импорт активностей",
+            filetypes=[("CSV / JSONL", "*.csv *.jsonl *.ndjson *.json"), ("Все файлы", "*.*")])
+        if not path: return
+        try:
+            accepted, conflicts, errors = importer.import_file(path, self.tasks)
+        except Exception as e:
+            Toast(self.root, f"Ошибка импорта: {e}", duration=4000); return
+        for entry in accepted:
+            self._log_written(entry)
+        if accepted:
+            self.refresh()
+        msg_lines = [f"Добавлено: {len(accepted)}"]
+        if conflicts:
+            msg_lines.append(f"Пропущены из-за перекрытий ({len(conflicts)}):")
+            for entry, overlaps in conflicts[:10]:
+                s_ex, e_ex, txt = overlaps[0]
+                msg_lines.append(f"• {entry['start'][:16].replace('T', ' ')} ({entry['task_text']}) ✕ "
+                                 f"{s_ex.strftime('%H:%M')}—{e_ex.strftime('%H:%M')} ({txt})")
+            if len(conflicts) > 10:
+                msg_lines.append("...и другие")
+        if errors:
+            msg_lines.append(f"Ошибок в строках: {len(errors)} (" + ", ".join(str(n) for n, _ in errors[:10]) + ")")
+        Toast(self.root, "\n".join(msg_lines), duration=6000)
+
+    def show_stalls(self):
+        win = tk.Toplevel(self.root); win.title("Зависания интерфейса"); win.geometry("900x350")
+        tree = ttk.Treeview(win, columns=("where", "count", "total", "max"), show="headings")
+        for col, name, width in (("where", "Где", 560), ("count", "Раз", 60), ("total", "Всего, мс", 100), ("max", "Макс, мс", 100)):
+            tree.heading(col, text=name); tree.column(col, width=width, anchor="w" if col == "where" else "center")
+        tree.pack(fill="both", expand=True, padx=5, pady=5)
+        if not self.watchdog:
+            ttk.Label(win, text="Сторож выключен (включается параметром stall_watchdog в settings.json).").pack(pady=4)
+            return
+        for where, count, total_ms, max_ms in self.watchdog.summary():
+            tree.insert("", "end", values=(where, count, f"{total_ms:.0f}", f"{max_ms:.0f}"))
+        ttk.Label(win, text=f"Подробные стеки: {self.watchdog.log_path}").pack(pady=4)
+
     def open_reports(self):
         try:
             report_path = os.path.join(os.path.dirname(__file__), "report_time_tracker.py")
-            subprocess.Popen([sys.executable, report_path])
+            env = {**os.environ, "TODO_PLUS_WORKSPACE": workspace.current}
+            subprocess.Popen([sys.executable, report_path], env=env)
         except Exception as e:
             messagebox.showerror("Ошибка", str(e))
 
 
 if __name__ == "__main__":
+    workspace.activate(workspace.active_name())
     root = tk.Tk()
+    install_error_handler(root)
+    profile.mark("Tk()")
     app = TodoApp(root)
     root.mainloop()
 
@@ -0,0 +1,23 @@
+import os, sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import utils
+from time_tracker import client, workspace
+
+
+@pytest.fixture(autouse=True)
+def data_dir(tmp_path):
+    """
+    Point every data file at a temp directory and away from a running daemon.
+    """
+    saved = (utils.FILE, utils.TIME_LOG, utils.SETTINGS_FILE, utils.ARCHIVE_FILE, utils.SCREENSHOT_BASE)
+    socket = client.SOCKET_PATH
+    workspace.point_to(workspace.paths_in(str(tmp_path)))
+    client.set_socket_path(str(tmp_path / "no-daemon.sock"))
+    yield tmp_path
+    utils.FILE, utils.TIME_LOG, utils.SETTINGS_FILE, utils.ARCHIVE_FILE, utils.SCREENSHOT_BASE = saved
+    utils._archive_cache.clear()
+    client.set_socket_path(socket)
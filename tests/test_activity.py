@@ -0,0 +1,55 @@
+import datetime, threading
+
+from time_tracker import activity
+from time_tracker.activity import Timeline, trim_idle
+
+T0 = datetime.datetime(2025, 10, 1, 9, 0)
+
+
+def minute(n):
+    return T0 + datetime.timedelta(minutes=n)
+
+
+def session(active_minutes, total):
+    tl = Timeline(T0)
+    for m in active_minutes:
+        tl.mark(minute(m) + datetime.timedelta(seconds=5), 0)
+    return {"start": T0.isoformat(), "end": minute(total).isoformat(), "duration_seconds": total * 60,
+            "activity": tl.snapshot(minute(total))}
+
+
+def test_trim_moves_edges_and_cuts_inner_idle():
+    e = session([0, 1, 2, 3, 4, 20, 21, 22], 40)  # idle 5..19 inside, 23..39 at the end
+    assert trim_idle(e, 10) == (15 + 17) * 60
+    assert e["start"] == T0.isoformat() and e["end"] == minute(23).isoformat()
+    assert e["duration_seconds"] == 8 * 60 and e["idle_trimmed_seconds"] == 32 * 60
+
+
+def test_short_idle_and_no_timeline_are_left_alone():
+    e = session([0, 1, 2, 8, 9], 10)
+    assert trim_idle(e, 10) == 0
+    assert trim_idle({"start": T0.isoformat(), "end": minute(5).isoformat(), "duration_seconds": 300}, 1) == 0
+
+
+def test_snapshot_round_trip_and_unsampled_timeline():
+    assert Timeline(T0).snapshot(minute(3)) is None
+    tl = Timeline.from_json(session([0, 2], 4)["activity"])
+    assert tl.n == 5 and [tl.active(i) for i in range(5)] == [True, False, True, False, False]
+
+
+def test_sample_loop_marks_until_stopped(monkeypatch):
+    monkeypatch.setattr(activity, "idle_seconds", lambda: 0)
+    tl, stop = Timeline(datetime.datetime.now(), interval=0.01), threading.Event()
+    t = threading.Thread(target=activity.sample_loop, args=(tl, stop))
+    t.start()
+    threading.Event().wait(0.05)
+    stop.set()
+    t.join(1)
+    assert not t.is_alive() and tl.sampled
+
+
+def test_sample_loop_returns_without_idle_source(monkeypatch):
+    monkeypatch.setattr(activity, "idle_seconds", lambda: None)
+    tl = Timeline(T0)
+    activity.sample_loop(tl, threading.Event())
+    assert not tl.sampled
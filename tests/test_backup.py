@@ -0,0 +1,57 @@
+import io, os, random
+
+from time_tracker import backup
+from time_tracker.backup import BackupRepo, iter_chunks
+
+
+def payload(n, seed=1):
+    return random.Random(seed).randbytes(n)
+
+
+def test_chunks_rejoin_and_respect_size_limits():
+    data = payload(300_000)
+    chunks = list(iter_chunks(io.BytesIO(data)))
+    assert b"".join(chunks) == data
+    assert all(len(c) <= backup.MAX_CHUNK for c in chunks)
+    assert all(len(c) >= backup.MIN_CHUNK for c in chunks[:-1])
+
+
+def test_append_only_adds_chunks_at_the_end():
+    data = payload(200_000)
+    before = list(iter_chunks(io.BytesIO(data)))
+    after = list(iter_chunks(io.BytesIO(data + payload(5_000, seed=2))))
+    assert after[:len(before) - 1] == before[:-1]
+
+
+def test_create_and_restore_round_trip(tmp_path):
+    src = tmp_path / "src"
+    (src / "shots").mkdir(parents=True)
+    log, shot = src / "time_log.json", src / "shots" / "a.jpg"
+    log.write_bytes(payload(150_000))
+    shot.write_bytes(payload(1_500_000, seed=3))
+    files = [("time_log.json", str(log)), ("shots/a.jpg", str(shot))]
+    repo = BackupRepo(str(tmp_path / "repo"))
+
+    first = repo.create(files)
+    assert len(first["files"]["shots/a.jpg"]["chunks"]) == 2  # fixed 1 MB blocks
+    again = repo.create(files)
+    assert again["stats"]["unchanged_files"] == 2 and again["stats"]["new_chunks"] == 0
+
+    with open(log, "ab") as f:
+        f.write(b"tail")
+    third = repo.create(files)
+    assert third["stats"]["new_chunks"] <= 2
+    assert repo.snapshots() == [first["id"], again["id"], third["id"]]
+
+    out = tmp_path / "out"
+    assert repo.restore(first["id"], str(out)) == 2
+    assert (out / "time_log.json").read_bytes() == payload(150_000)
+    assert (out / "shots" / "a.jpg").read_bytes() == shot.read_bytes()
+    repo.restore(third["id"], str(out))
+    assert (out / "time_log.json").read_bytes() == log.read_bytes()
+    assert os.stat(out / "time_log.json").st_mtime_ns == os.stat(log).st_mtime_ns
+
+
+def test_snapshots_order_numeric_suffixes():
+    ids = ["20251001-100000-10", "20251001-100000", "20251001-100000-2"]
+    assert sorted(ids, key=backup._snap_key) == ["20251001-100000", "20251001-100000-2", "20251001-100000-10"]
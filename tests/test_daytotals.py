@@ -0,0 +1,25 @@
+import datetime
+
+from time_tracker.daytotals import DayTotals, day_shares, ALL
+
+
+def e(start, end, dur, project="P"):
+    return {"start": datetime.datetime.fromisoformat(start), "end": datetime.datetime.fromisoformat(end),
+            "duration_seconds": dur, "project": project}
+
+
+def test_session_across_midnight_is_split_by_wall_time():
+    shares = day_shares(datetime.datetime(2025, 10, 1, 23), datetime.datetime(2025, 10, 2, 2), 3 * 1800)
+    assert [secs for _, secs in shares] == [1800, 3600]
+
+
+def test_add_remove_and_span():
+    days = DayTotals()
+    a, b = e("2025-10-01T09:00", "2025-10-01T10:00", 3600), e("2025-09-28T23:00", "2025-09-29T01:00", 7200, "Q")
+    days.rebuild([a, b])
+    d = datetime.date
+    assert days.span(d(2025, 9, 28), d(2025, 10, 2)) == [3600, 3600, 0, 3600, 0]
+    assert days.get(d(2025, 9, 29), "Q") == 3600 and days.get(d(2025, 10, 1), "Q") == 0
+    days.remove(a)
+    assert days.get(d(2025, 10, 1)) == 0 and days.get(d(2025, 10, 1), ALL) == 0
+    assert days.projects() == ["P", "Q"]
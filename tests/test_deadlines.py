@@ -0,0 +1,25 @@
+import datetime
+
+from time_tracker.deadlines import DeadlineIndex
+
+NOW = datetime.datetime(2025, 10, 1, 12, 0)
+
+
+def test_overdue_and_reminder_events_in_order():
+    idx = DeadlineIndex(reminder_hours=6)
+    idx.rebuild([{"id": "a", "deadline": "01.10.2025"}, {"id": "b", "deadline": "05.10.2025"},
+                 {"id": "c", "deadline": "30.09.2025"}, {"id": "d", "deadline": "bad"},
+                 {"id": "e", "deadline": "01.10.2025", "done": True}], NOW)
+    assert idx.is_overdue("c", NOW.date()) and not idx.is_overdue("a", NOW.date())
+    assert idx.next_wakeup(NOW) == datetime.datetime(2025, 10, 1, 18, 0)
+    assert idx.pop_due(datetime.datetime(2025, 10, 2, 0, 0)) == [("a", "remind"), ("a", "overdue")]
+    assert idx.next_wakeup(datetime.datetime(2025, 10, 2, 0, 0)) == datetime.datetime(2025, 10, 3, 0, 0)
+
+
+def test_edited_or_removed_tasks_drop_stale_events():
+    idx = DeadlineIndex()
+    idx.rebuild([{"id": "a", "deadline": "01.10.2025"}], NOW)
+    idx.update({"id": "a", "deadline": "03.10.2025"}, NOW)
+    assert idx.pop_due(datetime.datetime(2025, 10, 2, 0, 0)) == []
+    idx.remove("a")
+    assert idx.pop_due(datetime.datetime(2025, 10, 4, 0, 0)) == []
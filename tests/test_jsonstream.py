@@ -0,0 +1,81 @@
+import io, json
+
+import pytest
+
+from time_tracker import tracker
+from time_tracker.jsonstream import iter_json_array, iter_log_entries, SchemaError
+
+ENTRIES = [{"task_id": str(i), "start": f"2025-10-01T0{i}:00:00", "end": f"2025-10-01T0{i}:30:00",
+            "duration_seconds": 1800, "note": "{ [ \"quoted\" ] }"} for i in range(1, 5)]
+
+
+def log_text(entries=ENTRIES):
+    return json.dumps({"schema": 2, "entries": entries}, ensure_ascii=False, indent=2)
+
+
+def read(text, chunk_size=7, **kw):
+    damage = []
+    out = list(iter_log_entries(io.StringIO(text), chunk_size, on_damage=damage.append, schema=2,
+                                required=tracker.ENTRY_KEYS, **kw))
+    return out, damage
+
+
+def test_streams_entries_across_small_chunks():
+    header = {}
+    out = list(iter_log_entries(io.StringIO(log_text()), 5, header=header))
+    assert out == ENTRIES and header == {"schema": 2}
+    assert list(iter_json_array(io.StringIO(json.dumps(ENTRIES)), 3)) == ENTRIES
+
+
+def test_strict_reader_raises_on_damage_and_unknown_schema():
+    with pytest.raises(ValueError):
+        list(iter_log_entries(io.StringIO(log_text()[:-40])))
+    with pytest.raises(SchemaError):
+        list(iter_log_entries(io.StringIO(json.dumps({"schema": 9, "entries": []})), schema=2))
+
+
+@pytest.mark.parametrize("chunk", [3, 7, 1 << 16])  # boundaries must not matter
+def test_salvage_keeps_complete_entries_of_a_cut_file(chunk):
+    text = log_text()
+    cut = text[:text.index('"task_id": "4"') + 20]
+    out, damage = read(cut, chunk)
+    assert out == ENTRIES[:3] and damage
+
+
+@pytest.mark.parametrize("chunk", [3, 7, 1 << 16])  # boundaries must not matter
+def test_salvage_skips_a_broken_element_and_resyncs(chunk):
+    text = log_text().replace('"duration_seconds": 1800', '"duration_seconds": 18 00', 1)
+    out, damage = read(text, chunk)
+    assert out == ENTRIES[1:] and len(damage) == 1
+
+
+def test_salvage_drops_an_element_without_required_keys():
+    broken = [ENTRIES[0], {"task_id": "x"}, ENTRIES[1]]
+    out, damage = read(log_text(broken))
+    assert out == [ENTRIES[0], ENTRIES[1]] and len(damage) == 1
+
+
+@pytest.mark.parametrize("chunk", [3, 7, 1 << 16])  # boundaries must not matter
+def test_salvage_skips_junk_between_elements(chunk):
+    text = log_text(ENTRIES[:3]).replace("},\n    {", "}, garbage ]]\n    {", 1)
+    out, damage = read(text, chunk)
+    assert out == ENTRIES[:3] and damage
+
+
+def test_read_time_log_quarantines_and_rewrites(data_dir):
+    log = data_dir / "time_log.json"
+    text = log_text()
+    log.write_text(text[:text.index('"task_id": "3"')], encoding="utf-8")
+    assert tracker.read_time_log() == ENTRIES[:2]
+    assert json.loads(log.read_text(encoding="utf-8"))["entries"] == ENTRIES[:2]
+    assert [p.name for p in data_dir.glob("time_log.json.corrupt-*")]
+
+
+def test_scan_time_log_never_writes(data_dir):
+    log = data_dir / "time_log.json"
+    text = log_text()[:-60]
+    log.write_text(text, encoding="utf-8")
+    damage = []
+    assert list(tracker.scan_time_log(str(log), damage.append)) == ENTRIES[:3]
+    assert damage and log.read_text(encoding="utf-8") == text
+    assert not list(data_dir.glob("*.corrupt-*"))
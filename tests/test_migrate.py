@@ -0,0 +1,37 @@
+import json
+
+from time_tracker import tracker
+from time_tracker.migrate import is_legacy, migrate_time_log, LOG_SCHEMA
+
+
+def test_legacy_log_is_migrated_once_with_backup(data_dir):
+    log = data_dir / "time_log.json"
+    (data_dir / "tasks.json").write_text(json.dumps([{"id": "t1", "text": "Отчёт"}]), encoding="utf-8")
+    legacy = [
+        {"task_text": "Отчёт", "timestamp": "2025-10-01 10:00:00", "seconds": 1800},
+        {"task_id": "t2", "start": "2025-10-01T11:00:00", "duration_seconds": 600},
+        {"task_id": "t3", "start": "not a date"},
+    ]
+    log.write_text(json.dumps(legacy, ensure_ascii=False), encoding="utf-8")
+    assert is_legacy(str(log))
+
+    assert migrate_time_log(str(log)) == (2, 1)
+    assert not is_legacy(str(log))
+    assert json.loads((data_dir / "time_log.v1.bak").read_text(encoding="utf-8")) == legacy
+    assert json.loads((data_dir / "time_log.rejected.json").read_text(encoding="utf-8")) == [legacy[2]]
+
+    doc = json.loads(log.read_text(encoding="utf-8"))
+    assert doc["schema"] == LOG_SCHEMA
+    first, second = doc["entries"]
+    assert (first["task_id"], first["start"], first["end"]) == ("t1", "2025-10-01T09:30:00", "2025-10-01T10:00:00")
+    assert second["end"] == "2025-10-01T11:10:00"
+    assert tracker.read_time_log(str(log)) == doc["entries"]
+
+
+def test_read_time_log_migrates_transparently(data_dir):
+    log = data_dir / "time_log.json"
+    log.write_text(json.dumps([{"task_id": "a", "start": "2025-10-01T09:00:00",
+                                "end": "2025-10-01T09:15:00"}]), encoding="utf-8")
+    entries = tracker.read_time_log()
+    assert entries[0]["duration_seconds"] == 900
+    assert not is_legacy(str(log))
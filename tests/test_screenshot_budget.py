@@ -0,0 +1,21 @@
+from time_tracker import screenshot_manager
+from time_tracker.screenshot_manager import ScreenshotManager
+
+
+def test_auto_capture_stops_at_the_daily_budget(tmp_path, monkeypatch):
+    monkeypatch.setattr(screenshot_manager, "_pil", (None, None))  # never reached: cut off first
+    notes = []
+    mgr = ScreenshotManager(str(tmp_path), daily_budget_mb=1, interval_minutes=15)
+    mgr._toast = lambda text, duration=0: notes.append(text)
+    assert not mgr._budget_exhausted()
+    mgr._record_usage(1024 * 1024)
+    assert mgr._budget_exhausted()
+    assert mgr.take_screenshot(auto=True) is None
+    assert mgr.take_screenshot(auto=True) is None
+    assert len(notes) == 1  # one notice a day
+
+
+def test_no_budget_never_cuts_off(tmp_path):
+    mgr = ScreenshotManager(str(tmp_path), daily_budget_mb=0)
+    mgr._record_usage(50 * 1024 * 1024)
+    assert mgr._target_bytes() is None and not mgr._budget_exhausted()
@@ -0,0 +1,35 @@
+from time_tracker.search import SearchIndex
+
+TASKS = [
+    {"id": "1", "text": "Отчёт по бюджету", "note": "квартал", "project": "Финансы", "section": ""},
+    {"id": "2", "text": "Бюджет на рекламу", "note": "", "project": "Маркетинг", "section": "Весна"},
+    {"id": "3", "text": "Созвон с командой", "note": "", "project": "Финансы", "section": ""},
+]
+
+
+def test_prefix_and_conjunctive_query():
+    idx = SearchIndex()
+    idx.add_tasks(TASKS)
+    assert idx.query("бюдж") == {"1", "2"}
+    assert idx.query("бюдж фин") == {"1"}
+    assert idx.query("отчет") == {"1"}  # ё folded to е
+    assert idx.query("  ") is None
+
+
+def test_fuzzy_accepts_one_edit():
+    idx = SearchIndex()
+    idx.add_tasks(TASKS)
+    assert idx.query("комнад") == set()
+    assert idx.query("комнад", fuzzy=True) == {"3"}
+
+
+def test_bulk_build_matches_incremental_and_updates():
+    bulk, inc = SearchIndex(), SearchIndex()
+    bulk.add_tasks(TASKS)
+    for t in TASKS:
+        inc.add_task(t)
+    assert bulk._vocab == inc._vocab and bulk._postings == inc._postings
+    bulk.add("2", "Реклама")
+    bulk.remove("1")
+    assert bulk.query("бюдж") == set()
+    assert "бюджету" not in bulk._vocab and bulk._vocab == sorted(bulk._vocab)
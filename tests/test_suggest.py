@@ -0,0 +1,25 @@
+import datetime
+
+from time_tracker.suggest import PrefixIndex
+
+
+def test_word_prefixes_and_ranking():
+    idx = PrefixIndex()
+    today = datetime.date.today().toordinal()
+    idx.add_many([("Братья КБК", today), ("Кабинет", today - 400), ("Кабинет", today - 400), ("Дом", today)])
+    assert idx.complete("кбк") == ["Братья КБК"]
+    assert idx.complete("к") == ["Братья КБК", "Кабинет"]  # recent beats frequent-but-old
+    assert idx.complete("") == ["Братья КБК", "Дом", "Кабинет"]
+
+
+def test_bulk_matches_incremental_and_remove_counts_uses():
+    names = [("Проект А", "01.10.2025"), ("Проект Б", None), ("Проект А", "02.10.2025")]
+    bulk, inc = PrefixIndex(), PrefixIndex()
+    bulk.add_many(names)
+    for name, when in names:
+        inc.add(name, when)
+    assert bulk._keys == inc._keys and bulk._stats == inc._stats
+    bulk.remove("Проект А")
+    assert "Проект А" in bulk.complete("про")
+    bulk.remove("Проект А")
+    assert bulk.complete("про") == ["Проект Б"] and len(bulk) == 1
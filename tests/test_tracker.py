@@ -0,0 +1,72 @@
+import datetime
+
+from time_tracker import tracker
+from time_tracker.importer import normalize_batch
+
+
+def dt(hm, day=1):
+    return datetime.datetime(2025, 10, day, *map(int, hm.split(":")))
+
+
+def entry(start, end, duration=None, **extra):
+    s, en = dt(start), dt(end)
+    return {"start": s.isoformat(), "end": en.isoformat(),
+            "duration_seconds": int((en - s).total_seconds()) if duration is None else duration, **extra}
+
+
+def test_sweep_overlaps_yields_every_intersecting_pair():
+    ivs = [(dt("09:00"), dt("10:00"), "a"), (dt("09:30"), dt("11:00"), "b"),
+           (dt("10:00"), dt("10:30"), "c"), (dt("12:00"), dt("13:00"), "d")]
+    pairs = {(a[2], b[2]) for a, b in tracker.sweep_overlaps(ivs)}
+    assert pairs == {("a", "b"), ("b", "c")}  # a ends where c starts: no overlap
+
+
+def test_merge_batch_rejects_clashes_with_log_and_within_batch():
+    log = [entry("09:00", "10:00", task_text="old")]
+    batch = [entry("09:30", "09:45"), entry("10:00", "11:00"), entry("10:30", "11:30")]
+    accepted, conflicts = tracker.merge_batch(log, batch)
+    assert accepted == [batch[1]]
+    assert [c[0] for c in conflicts] == [batch[0], batch[2]]
+    assert conflicts[0][1][0][2] == "old"
+
+
+def test_normalize_batch_reports_bad_rows_instead_of_raising():
+    rows = [{"start": 5, "end": "2025-10-01T10:00:00"},
+            {"start": "2025-10-01T08:00:00+00:00", "end": "2025-10-01T09:00:00+00:00"},
+            {"date": "01.10.2025", "start": "09:00", "end": "08:00"},
+            "not a row"]
+    entries, errors = normalize_batch(rows)
+    assert [n for n, _ in errors] == [1, 3, 4]
+    assert len(entries) == 1 and entries[0]["duration_seconds"] == 3600
+    assert datetime.datetime.fromisoformat(entries[0]["start"]).tzinfo is None
+
+
+def test_repair_overlaps_merge_chains_and_keeps_removed_time():
+    # b had 30 min taken off (trimmed idle); c is only reached once a grows
+    a, b, c = entry("09:00", "10:00"), entry("09:30", "11:00", 3600), entry("10:30", "12:00")
+    out = tracker.repair_overlaps([a, b, c], tracker.find_log_overlaps([a, b, c]), "merge")
+    assert len(out) == 1
+    assert (out[0]["start"], out[0]["end"]) == (dt("09:00").isoformat(), dt("12:00").isoformat())
+    assert out[0]["duration_seconds"] == 3 * 3600 - 1800
+
+
+def test_repair_overlaps_trim_keeps_only_the_share_of_removed_time():
+    a, b = entry("09:00", "10:00"), entry("09:00", "11:00", 3600)  # b: 1 h of 2 removed
+    out = tracker.repair_overlaps([a, b], tracker.find_log_overlaps([a, b]), "trim")
+    assert out[1]["start"] == dt("10:00").isoformat()
+    assert out[1]["duration_seconds"] == 1800
+
+
+def test_repair_overlaps_delete_and_covered_trim():
+    a, b = entry("09:00", "11:00"), entry("09:30", "10:00")
+    pairs = tracker.find_log_overlaps([a, b])
+    assert tracker.repair_overlaps([dict(a), dict(b)], pairs, "delete") == [a]
+    assert tracker.repair_overlaps([dict(a), dict(b)], pairs, "trim") == [a]
+
+
+def test_union_seconds_counts_overlap_once_and_excludes_removed_time():
+    assert tracker.union_seconds([(dt("09:00"), dt("10:00")), (dt("09:30"), dt("10:30")),
+                                  (None, None)]) == 5400
+    e = entry("09:00", "11:00", 3600)
+    s, en, _ = tracker.parse_range(e)
+    assert tracker.union_seconds(iter([(s, en, tracker.removed_seconds(e, s, en))])) == 3600
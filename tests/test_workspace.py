@@ -0,0 +1,42 @@
+import datetime, json
+
+import pytest
+
+import utils
+from time_tracker import workspace
+
+
+@pytest.fixture
+def spaces(tmp_path, monkeypatch):
+    monkeypatch.setattr(utils, "APP_DIR", str(tmp_path))
+    monkeypatch.setattr(workspace, "ROOT", str(tmp_path / "workspaces"))
+    workspace.create("other")
+    return tmp_path
+
+
+def write_log(path, entries):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"schema": 2, "entries": entries}, f)
+
+
+def test_cross_totals_split_at_midnight_and_filter_days(spaces):
+    write_log(workspace.paths("default")["log"], [
+        {"start": "2025-10-01T23:00:00", "end": "2025-10-02T01:00:00", "duration_seconds": 7200, "project": "A"}])
+    write_log(workspace.paths("other")["log"], [
+        {"start": "2025-10-02T09:00:00", "end": "2025-10-02T10:00:00", "duration_seconds": 3600}])
+    day = datetime.date(2025, 10, 2)
+    assert workspace.cross_totals(day, day) == {"default": {"A": 3600}, "other": {"—": 3600}}
+    assert workspace.cross_totals() == {"default": {"A": 7200}, "other": {"—": 3600}}
+
+
+def test_other_workspace_logs_are_never_rewritten(spaces):
+    log = workspace.paths("other")["log"]
+    legacy = json.dumps([{"start": "2025-10-02T09:00:00", "end": "2025-10-02T10:00:00"}])
+    with open(log, "w", encoding="utf-8") as f:
+        f.write(legacy)
+    damaged = []
+    assert workspace.cross_totals(damaged=damaged) == {}
+    assert damaged == ["other"]
+    with open(log, encoding="utf-8") as f:
+        assert f.read() == legacy
+    assert workspace.rollup("other") == ({}, True)  # from the cache, still reported
@@ -0,0 +1,206 @@
+# time_tracker/activity.py
+"""
+Activity timeline of a timer session:
+- idle_seconds() asks X11 how long there was no keyboard/mouse input:
+  `xprintidle` if installed, else the XScreenSaver extension through ctypes;
+  None when neither works (Wayland, no $DISPLAY) - sampling is then skipped
+- sample_loop(timeline, stop) takes one sample per slot on its own thread, so a
+  slow query never blocks the Tk loop
+- Timeline keeps one bit per sample slot (1 = input seen, 0 = idle or not
+  sampled: a suspended machine leaves its slots at 0); stored on the log entry
+  as {"t0", "interval", "n", "bits": base64} - 8 hours of minutes is ~80 chars.
+  Written by the sampler, read by the autosave thread: access goes through a lock
+- trim_idle(entry, min_minutes) drops idle runs of at least min_minutes:
+  leading/trailing ones move start/end, inner ones come off duration_seconds
+"""
+
+import base64, datetime, os, shutil, subprocess, threading
+
+SAMPLE_SECONDS = 60
+
+_xss = None   # (libXss, display, root window, info) once opened, False if unavailable
+_xss_lock = threading.Lock()  # one display connection: a stopping sampler may overlap a new one
+
+
+def _xss_idle():
+    global _xss
+    if _xss is None:
+        _xss = False
+        import ctypes, ctypes.util  # only when xprintidle is missing
+
+        class _XScreenSaverInfo(ctypes.Structure):
+            _fields_ = [("window", ctypes.c_ulong), ("state", ctypes.c_int), ("kind", ctypes.c_int),
+                        ("til_or_since", ctypes.c_ulong), ("idle", ctypes.c_ulong),
+                        ("eventMask", ctypes.c_ulong)]
+
+        x11_name, xss_name = ctypes.util.find_library("X11"), ctypes.util.find_library("Xss")
+        if x11_name and xss_name and os.environ.get("DISPLAY"):
+            try:
+                x11, xss = ctypes.cdll.LoadLibrary(x11_name), ctypes.cdll.LoadLibrary(xss_name)
+                x11.XOpenDisplay.restype = ctypes.c_void_p
+                x11.XDefaultRootWindow.argtypes = [ctypes.c_void_p]
+                x11.XDefaultRootWindow.restype = ctypes.c_ulong
+                xss.XScreenSaverAllocInfo.restype = ctypes.POINTER(_XScreenSaverInfo)
+                xss.XScreenSaverQueryInfo.argtypes = [ctypes.c_void_p, ctypes.c_ulong,
+                                                      ctypes.POINTER(_XScreenSaverInfo)]
+                display = x11.XOpenDisplay(None)
+                if display:
+                    _xss = (xss, display, x11.XDefaultRootWindow(display), xss.XScreenSaverAllocInfo())
+            except (OSError, AttributeError):
+                _xss = False
+    if not _xss:
+        return None
+    xss, display, root, info = _xss
+    if not xss.XScreenSaverQueryInfo(display, root, info):
+        return None
+    return info.contents.idle / 1000
+
+
+def idle_seconds():
+    """
+    Seconds since the last user input, None if it cannot be determined.
+    """
+    if shutil.which("xprintidle"):
+        try:
+            out = subprocess.run(["xprintidle"], capture_output=True, text=True, timeout=2)
+            if out.returncode == 0:
+                return int(out.stdout.strip()) / 1000
+        except (OSError, ValueError, subprocess.TimeoutExpired):
+            pass
+    with _xss_lock:
+        return _xss_idle()
+
+
+def sample_loop(timeline, stop):
+    """
+    Mark one idle sample per slot of timeline until stop (threading.Event) is set.
+    Returns at once if there is no idle source: the timeline stays unsampled.
+    """
+    while True:
+        idle = idle_seconds()
+        if idle is not None:
+            timeline.mark(datetime.datetime.now(), idle)
+        elif not timeline.sampled:
+            return
+        if stop.wait(timeline.interval):
+            return
+
+
+class Timeline:
+    def __init__(self, t0, interval=SAMPLE_SECONDS, bits=None, n=0):
+        self.t0 = t0                  # datetime of slot 0
+        self.interval = interval
+        self.bits = bits if bits is not None else bytearray()
+        self.n = n                    # slots covered so far
+        self.sampled = bool(n)        # False until the first mark(): no idle source yet
+        self._lock = threading.Lock()
+
+    def slot(self, when):
+        return max(0, int((when - self.t0).total_seconds() // self.interval))
+
+    def mark(self, when, idle):
+        """
+        Record a sample taken at when with idle seconds of no input.
+        """
+        i = self.slot(when)
+        with self._lock:
+            self._grow(i + 1)
+            self.sampled = True
+            if idle < self.interval:
+                self.bits[i >> 3] |= 1 << (i & 7)
+
+    def _grow(self, n):
+        self.n = max(self.n, n)
+        need = (self.n + 7) // 8
+        if len(self.bits) < need:
+            self.bits.extend(bytes(need - len(self.bits)))
+
+    def extend_to(self, when):
+        # slots up to when exist even if never sampled (sleep, no idle source)
+        with self._lock:
+            self._grow(self.slot(when) + 1)
+
+    def snapshot(self, until):
+        """
+        to_json() of the timeline extended to until, None if nothing was sampled.
+        """
+        with self._lock:
+            if not self.sampled:
+                return None
+            self._grow(self.slot(until) + 1)
+            return self._json()
+
+    def active(self, i):
+        return bool(self.bits[i >> 3] >> (i & 7) & 1) if i < self.n else False
+
+    def idle_runs(self, min_slots=1):
+        """
+        (first, stop) slot ranges of at least min_slots idle slots in a row.
+        """
+        runs, first = [], None
+        for i in range(self.n + 1):
+            if i < self.n and not self.active(i):
+                if first is None:
+                    first = i
+            elif first is not None:
+                if i - first >= min_slots:
+                    runs.append((first, i))
+                first = None
+        return runs
+
+    def to_json(self):
+        with self._lock:
+            return self._json()
+
+    def _json(self):
+        return {"t0": self.t0.isoformat(), "interval": self.interval, "n": self.n,
+                "bits": base64.b64encode(bytes(self.bits)).decode("ascii")}
+
+    @classmethod
+    def from_json(cls, d):
+        """
+        Timeline of a log entry's "activity" field, None if missing or malformed.
+        """
+        try:
+            return cls(datetime.datetime.fromisoformat(d["t0"]), int(d["interval"]),
+                       bytearray(base64.b64decode(d["bits"])), int(d["n"]))
+        except (TypeError, KeyError, ValueError):
+            return None
+
+
+def trim_idle(entry, min_minutes):
+    """
+    Remove idle runs of at least min_minutes from a finished entry in place;
+    returns the seconds removed (also kept in entry["idle_trimmed_seconds"]).
+    """
+    tl = Timeline.from_json(entry.get("activity"))
+    if tl is None or min_minutes <= 0:
+        return 0
+    start = datetime.datetime.fromisoformat(entry["start"])
+    end = datetime.datetime.fromisoformat(entry["end"])
+    step = datetime.timedelta(seconds=tl.interval)
+    runs = tl.idle_runs(max(1, int(min_minutes * 60 // tl.interval)))
+    if not runs:
+        return 0
+    cut = 0.0
+    new_start, new_end = start, end
+    for first, stop in runs:
+        lo, hi = max(start, tl.t0 + first * step), min(end, tl.t0 + stop * step)
+        if hi <= lo:
+            continue
+        if lo <= start:
+            new_start = hi
+        elif hi >= end:
+            new_end = lo
+        else:
+            cut += (hi - lo).total_seconds()
+    if new_end <= new_start:
+        return 0  # idle all along: leave it to the user
+    old = int(entry.get("duration_seconds") or 0)
+    duration = max(0, int((new_end - new_start).total_seconds() - cut))
+    if duration >= old:
+        return 0
+    entry["start"], entry["end"] = new_start.isoformat(), new_end.isoformat()
+    entry["duration_seconds"] = duration
+    entry["idle_trimmed_seconds"] = int(entry.get("idle_trimmed_seconds") or 0) + old - duration
+    return old - duration
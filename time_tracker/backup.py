@@ -0,0 +1,232 @@
+# time_tracker/backup.py
+"""
+Incremental, deduplicated backup of the data files and screenshots:
+- every workspace is included (see time_tracker/workspace.py)
+- files are cut into content-defined chunks (gear rolling hash, 2-64 KB, ~8 KB
+  average), so an append to time_log.json only produces new chunks at the end;
+  already compressed files (screenshots, zip archives) never change in place and
+  are stored in fixed 1 MB blocks without the per-byte hash
+- chunks are stored once under <repo>/chunks/<sha256[:2]>/<sha256>, zlib-compressed
+- every run writes a manifest <repo>/snapshots/<id>.json: path -> size, mtime, chunk list
+- files whose size and mtime match the previous snapshot reuse its chunk list unread
+- restore rebuilds any snapshot into a directory, checking every chunk hash
+
+    python -m time_tracker.backup create [--repo backups]
+    python -m time_tracker.backup list [--repo backups]
+    python -m time_tracker.backup restore <id> [--to DIR] [--repo backups]
+
+Works offline against a local path only.
+"""
+
+import os, sys, json, zlib, hashlib, datetime
+
+import utils
+from time_tracker import workspace
+
+MIN_CHUNK = 2 * 1024
+AVG_MASK = (1 << 13) - 1      # cut when the low 13 bits are zero: ~8 KB average
+MAX_CHUNK = 64 * 1024
+READ_SIZE = 1 << 20
+COMPRESSED = (".jpg", ".jpeg", ".png", ".webp", ".zip", ".gz")  # stored as fixed blocks
+_MASK64 = (1 << 64) - 1
+# fixed pseudo-random gear table: chunk boundaries must not change between runs
+GEAR = [int.from_bytes(hashlib.sha256(bytes([i])).digest()[:8], "little") for i in range(256)]
+
+
+def iter_chunks(f):
+    """
+    Yield content-defined chunks (bytes) of a binary file.
+    """
+    gear = GEAR
+    buf = b""
+    while True:
+        data = f.read(READ_SIZE)
+        buf += data
+        start = 0
+        while len(buf) - start >= (MAX_CHUNK if data else 1):
+            end = min(len(buf), start + MAX_CHUNK)
+            h = 0
+            cut = end
+            for i in range(start + MIN_CHUNK, end):
+                h = ((h << 1) + gear[buf[i]]) & _MASK64
+                if not h & AVG_MASK:
+                    cut = i + 1
+                    break
+            yield buf[start:cut]
+            start = cut
+        buf = buf[start:]
+        if not data:
+            return
+
+
+def iter_blocks(f):
+    """
+    Yield fixed READ_SIZE blocks of a binary file.
+    """
+    while True:
+        data = f.read(READ_SIZE)
+        if not data:
+            return
+        yield data
+
+
+def _snap_key(snap_id):
+    # "YYYYmmdd-HHMMSS" or "YYYYmmdd-HHMMSS-N": order by time, then N as a number
+    day, hms, *n = snap_id.split("-")
+    return day, hms, int(n[0]) if n else 1
+
+
+def data_files():
+    """
+    (path relative to the app directory, absolute path) of everything that is
+    backed up: the data files and screenshots of every workspace.
+    """
+    found = [workspace.STATE_FILE]
+    for name in workspace.list_workspaces():
+        p = workspace.paths(name)
+        found += [p[k] for k in ("tasks", "log", "settings", "archive")]
+        for dirpath, _, files in os.walk(p["screenshots"]):
+            found += [os.path.join(dirpath, f) for f in files]
+    return sorted((os.path.relpath(full, utils.APP_DIR).replace(os.sep, "/"), full)
+                  for full in found if os.path.isfile(full))
+
+
+class BackupRepo:
+    def __init__(self, path="backups"):
+        self.path = os.path.abspath(path)
+        self.chunk_dir = os.path.join(self.path, "chunks")
+        self.snap_dir = os.path.join(self.path, "snapshots")
+
+    def _chunk_path(self, digest):
+        return os.path.join(self.chunk_dir, digest[:2], digest)
+
+    def _put_chunk(self, data):
+        """
+        Store a chunk unless present; returns (digest, stored_bytes).
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._chunk_path(digest)
+        if os.path.exists(path):
+            return digest, 0
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        packed = zlib.compress(data, 6)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(packed)
+        os.replace(tmp, path)
+        return digest, len(packed)
+
+    def _get_chunk(self, digest):
+        with open(self._chunk_path(digest), "rb") as f:
+            data = zlib.decompress(f.read())
+        if hashlib.sha256(data).hexdigest() != digest:
+            raise ValueError(f"chunk {digest} is corrupt")
+        return data
+
+    def snapshots(self):
+        """
+        Snapshot ids, oldest first.
+        """
+        if not os.path.isdir(self.snap_dir):
+            return []
+        return sorted((n[:-5] for n in os.listdir(self.snap_dir) if n.endswith(".json")), key=_snap_key)
+
+    def manifest(self, snap_id):
+        with open(os.path.join(self.snap_dir, snap_id + ".json"), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def create(self, files=None):
+        """
+        Back up files (default: data_files()); returns the new manifest.
+        """
+        files = data_files() if files is None else files
+        snaps = self.snapshots()
+        prev = self.manifest(snaps[-1])["files"] if snaps else {}
+        entries, new_chunks, new_bytes, reused = {}, 0, 0, 0
+        for rel, full in files:
+            try:
+                st = os.stat(full)
+            except OSError:
+                continue  # removed while we were walking
+            old = prev.get(rel)
+            if old and old["size"] == st.st_size and old["mtime_ns"] == st.st_mtime_ns:
+                entries[rel] = old
+                reused += 1
+                continue
+            chunks = []
+            split = iter_blocks if full.lower().endswith(COMPRESSED) else iter_chunks
+            with open(full, "rb") as f:
+                for data in split(f):
+                    digest, stored = self._put_chunk(data)
+                    chunks.append(digest)
+                    if stored:
+                        new_chunks += 1
+                        new_bytes += stored
+            entries[rel] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "chunks": chunks}
+        now = datetime.datetime.now()
+        snap_id = now.strftime("%Y%m%d-%H%M%S")
+        n = 1
+        while snap_id in snaps:
+            n += 1
+            snap_id = f"{now.strftime('%Y%m%d-%H%M%S')}-{n}"
+        manifest = {"id": snap_id, "created": now.isoformat(timespec="seconds"), "files": entries,
+                    "stats": {"files": len(entries), "bytes": sum(e["size"] for e in entries.values()),
+                              "unchanged_files": reused, "new_chunks": new_chunks, "new_bytes": new_bytes}}
+        os.makedirs(self.snap_dir, exist_ok=True)
+        # the manifest goes last: an interrupted run leaves only unreferenced chunks
+        tmp = os.path.join(self.snap_dir, snap_id + ".json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        os.replace(tmp, os.path.join(self.snap_dir, snap_id + ".json"))
+        return manifest
+
+    def restore(self, snap_id, target):
+        """
+        Write every file of a snapshot under target; returns the file count.
+        """
+        files = self.manifest(snap_id)["files"]
+        for rel, entry in files.items():
+            dest = os.path.join(target, *rel.split("/"))
+            os.makedirs(os.path.dirname(dest) or ".", exist_ok=True)
+            tmp = dest + ".tmp"
+            with open(tmp, "wb") as f:
+                for digest in entry["chunks"]:
+                    f.write(self._get_chunk(digest))
+            os.replace(tmp, dest)
+            os.utime(dest, ns=(entry["mtime_ns"], entry["mtime_ns"]))
+        return len(files)
+
+
+def _mb(n):
+    return f"{n / 1048576:.1f} МБ"
+
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Резервные копии данных и скриншотов")
+    ap.add_argument("--repo", default="backups", help="каталог резервных копий")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("create", help="создать снимок")
+    sub.add_parser("list", help="список снимков")
+    p_restore = sub.add_parser("restore", help="восстановить снимок")
+    p_restore.add_argument("id")
+    p_restore.add_argument("--to", help="куда восстановить (по умолчанию restore-<id>)")
+    args = ap.parse_args()
+
+    repo = BackupRepo(args.repo)
+    if args.cmd == "create":
+        st = repo.create()["stats"]
+        print(f"Файлов: {st['files']} ({_mb(st['bytes'])}), без изменений: {st['unchanged_files']}, "
+              f"новых блоков: {st['new_chunks']} ({_mb(st['new_bytes'])})")
+    elif args.cmd == "list":
+        for snap_id in repo.snapshots():
+            st = repo.manifest(snap_id)["stats"]
+            print(f"{snap_id}  файлов: {st['files']:6d}  {_mb(st['bytes']):>10}  записано: {_mb(st['new_bytes'])}")
+    else:
+        if args.id not in repo.snapshots():
+            print(f"Нет снимка {args.id}", file=sys.stderr)
+            sys.exit(1)
+        target = args.to or f"restore-{args.id}"
+        n = repo.restore(args.id, target)
+        print(f"Восстановлено файлов: {n} в {os.path.abspath(target)}")
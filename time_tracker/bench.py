@@ -0,0 +1,327 @@
+# time_tracker/bench.py
+"""
+Headless UI latency benchmark:
+- starts a private Xvfb display (or uses --display) and a scratch data directory
+- generates tasks.json / time_log.json of the requested size
+- drives TodoApp and ReportApp through the same methods / events the widgets use:
+  add task, mark done, edit, start / stop timer, manual activity,
+  report period switch, double-click edit of a report row
+- latency = wall time from the call until the Tk event queue is idle
+  (and, for the report, until the worker result is rendered)
+- prints per-action percentiles as JSON
+
+    python -m time_tracker.bench [--tasks 2000] [--entries 50000] [--repeat 20] [--out bench.json]
+
+Needs the Xvfb binary unless --display points to a running X server.
+"""
+
+import os, sys, json, time, random, shutil, argparse, tempfile, subprocess, datetime, uuid
+
+APP_DIR = os.path.normpath(os.path.join(os.path.dirname(__file__), ".."))
+PROJECTS = ["Общее", "Клиент А", "Клиент Б", "Внутреннее", "Обучение", "Братья КБК"]
+SECTIONS = ["", "Дизайн", "Разработка", "Тесты", "Созвоны"]
+WORDS = ["отчёт", "макет", "правки", "релиз", "созвон", "документация", "баг", "ревью", "счёт", "план"]
+REPORT_MODES = ["День", "Неделя", "Месяц", "Текущая неделя", "Текущий месяц", "За всё время"]
+
+
+def generate_dataset(path, n_tasks, n_entries, seed=1):
+    """
+    Write tasks.json, time_log.json (schema 2) and settings.json into path.
+    Log entries are back to back, newest ending an hour ago.
+    """
+    from time_tracker.migrate import LOG_SCHEMA
+
+    rnd = random.Random(seed)
+    today = datetime.date.today()
+    tasks = []
+    for _ in range(n_tasks):
+        created = today - datetime.timedelta(days=rnd.randint(0, 365))
+        done = rnd.random() < 0.3
+        t = {
+            "id": str(uuid.UUID(int=rnd.getrandbits(128))),
+            "text": " ".join(rnd.sample(WORDS, 3)).capitalize(),
+            "project": rnd.choice(PROJECTS),
+            "section": rnd.choice(SECTIONS),
+            "date": created.strftime("%d.%m.%Y"),
+            "deadline": (created + datetime.timedelta(days=rnd.randint(1, 60))).strftime("%d.%m.%Y") if rnd.random() < 0.4 else "",
+            "note": rnd.choice(["", "", "уточнить", "срочно"]),
+            "done": done
+        }
+        if done:
+            t["done_at"] = today.strftime("%d.%m.%Y")  # recent: stays out of the archive
+        tasks.append(t)
+
+    end = datetime.datetime.now().replace(microsecond=0) - datetime.timedelta(hours=1)
+    entries = []
+    for _ in range(n_entries):
+        t = rnd.choice(tasks)
+        dur = rnd.randint(5, 120) * 60
+        start = end - datetime.timedelta(seconds=dur)
+        entries.append({"task_id": t["id"], "task_text": t["text"], "project": t["project"],
+                        "section": t["section"], "start": start.isoformat(), "end": end.isoformat(),
+                        "duration_seconds": dur})
+        end = start - datetime.timedelta(minutes=rnd.randint(0, 90))
+    entries.reverse()
+
+    settings = {"autoscreen_enabled": False, "archive_done_after_days": 0, "stall_watchdog": False}
+    with open(os.path.join(path, "tasks.json"), "w", encoding="utf-8") as f:
+        json.dump(tasks, f, ensure_ascii=False, indent=2)
+    with open(os.path.join(path, "time_log.json"), "w", encoding="utf-8") as f:
+        json.dump({"schema": LOG_SCHEMA, "entries": entries}, f, ensure_ascii=False, indent=2)
+    with open(os.path.join(path, "settings.json"), "w", encoding="utf-8") as f:
+        json.dump(settings, f, ensure_ascii=False, indent=2)
+
+
+def start_xvfb():
+    """
+    (process, display) of a fresh Xvfb server.
+    """
+    exe = shutil.which("Xvfb")
+    if not exe:
+        raise RuntimeError("Xvfb не найден (apt install xvfb) — или укажите --display")
+    for n in range(90, 140):
+        if os.path.exists(f"/tmp/.X11-unix/X{n}") or os.path.exists(f"/tmp/.X{n}-lock"):
+            continue
+        proc = subprocess.Popen([exe, f":{n}", "-screen", "0", "1280x800x24", "-nolisten", "tcp"],
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            if os.path.exists(f"/tmp/.X11-unix/X{n}"):
+                return proc, f":{n}"
+            if proc.poll() is not None:
+                break
+            time.sleep(0.05)
+        proc.kill()
+    raise RuntimeError("не удалось запустить Xvfb")
+
+
+class Recorder:
+    def __init__(self, root):
+        self.root = root
+        self.samples = {}
+
+    def settle(self, busy=None, timeout=30.0):
+        """
+        Process events until nothing is ready and busy() (if given) is false.
+        """
+        import _tkinter
+        flags = _tkinter.ALL_EVENTS | _tkinter.DONT_WAIT
+        deadline = time.perf_counter() + timeout
+        while time.perf_counter() < deadline:
+            self.root.update_idletasks()
+            while self.root.tk.dooneevent(flags):
+                pass
+            if busy is None or not busy():
+                return
+            time.sleep(0.001)
+        raise TimeoutError("UI did not settle")
+
+    def measure(self, name, action, busy=None):
+        self.settle(busy)
+        t0 = time.perf_counter()
+        action()
+        self.settle(busy)
+        self.samples.setdefault(name, []).append((time.perf_counter() - t0) * 1000)
+
+
+def _percentile(sorted_ms, q):
+    if not sorted_ms:
+        return None
+    k = (len(sorted_ms) - 1) * q
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_ms) - 1)
+    return sorted_ms[lo] + (sorted_ms[hi] - sorted_ms[lo]) * (k - lo)
+
+
+def summarize(samples):
+    out = {}
+    for name, values in samples.items():
+        v = sorted(values)
+        out[name] = {"n": len(v), "mean": round(sum(v) / len(v), 2),
+                     **{f"p{int(q * 100)}": round(_percentile(v, q), 2) for q in (0.5, 0.9, 0.95, 0.99)},
+                     "max": round(v[-1], 2)}
+    return out
+
+
+def _newest_toplevel(root):
+    import tkinter as tk
+    tops = [w for w in root.winfo_children() if isinstance(w, tk.Toplevel)]
+    return tops[-1] if tops else None
+
+
+def _press(win, text):
+    # invoke the button labelled text anywhere inside win
+    from tkinter import ttk
+    stack = [win]
+    while stack:
+        w = stack.pop()
+        if isinstance(w, ttk.Button) and w.cget("text") == text:
+            w.invoke()
+            return
+        stack.extend(w.winfo_children())
+    raise LookupError(text)
+
+
+def _entries(win):
+    from tkinter import ttk
+    out, stack = [], [win]
+    while stack:
+        w = stack.pop(0)
+        if isinstance(w, ttk.Entry) and not isinstance(w, ttk.Combobox):
+            out.append(w)
+        stack.extend(w.winfo_children())
+    return out
+
+
+def bench_todo(repeat, rnd):
+    import tkinter as tk
+    from start import TodoApp
+
+    root = tk.Tk()
+    rec = Recorder(root)
+    t0 = time.perf_counter()
+    app = TodoApp(root)
+    rec.settle()
+    rec.samples["todo_startup"] = [(time.perf_counter() - t0) * 1000]
+
+    def select_random():
+        rows = app.tree.get_children()
+        iid = rnd.choice(rows)
+        app.tree.selection_set(iid); app.tree.see(iid)
+        return iid
+
+    base = datetime.date.today() - datetime.timedelta(days=800)
+    for i in range(repeat):
+        def add():
+            app.entry_text.set(f"Бенчмарк {i} " + rnd.choice(WORDS))
+            app.add_task()
+        rec.measure("add_task", add)
+
+        select_random(); rec.settle()
+        rec.measure("mark_done", app.mark_done)
+
+        select_random(); rec.settle()
+        def edit():
+            app.open_edit()
+            rec.settle()
+            win = _newest_toplevel(root)
+            e_text = _entries(win)[0]
+            e_text.insert("end", " *")
+            _press(win, "💾 Сохранить")
+        rec.measure("edit_task", edit)
+
+        select_random(); rec.settle()
+        rec.measure("timer_start", app.start_timer)
+        rec.measure("timer_stop", app.stop_timer)
+
+        select_random(); rec.settle()
+        def manual():
+            app.add_manual_activity()
+            rec.settle()
+            win = _newest_toplevel(root)
+            e_date, e_start, e_end = _entries(win)[:3]
+            for e, val in ((e_date, (base - datetime.timedelta(days=i)).strftime("%d.%m.%Y")),
+                           (e_start, "10:00"), (e_end, "10:15")):
+                e.delete(0, "end"); e.insert(0, val)
+            _press(win, "💾 Сохранить")
+        rec.measure("manual_activity", manual)
+
+    if app.timer_running:
+        app.stop_timer()
+    root.destroy()
+    return rec.samples
+
+
+def bench_report(repeat, rnd):
+    import tkinter as tk
+    from report_time_tracker import ReportApp, EditEntryWindow
+
+    root = tk.Tk()
+    rec = Recorder(root)
+
+    def busy():
+        return app._job is not None or app._fill_after is not None
+
+    t0 = time.perf_counter()
+    app = ReportApp(root)
+    rec.settle(busy)
+    rec.samples["report_startup"] = [(time.perf_counter() - t0) * 1000]
+
+    for _ in range(repeat):
+        for mode in REPORT_MODES:
+            def switch(mode=mode):
+                app.combo.set(mode)
+                app.combo.event_generate("<<ComboboxSelected>>")
+            rec.measure(f"report_{mode}", switch, busy)
+
+        rows = app.tree.get_children()
+        if not rows:
+            continue
+        iid = rnd.choice(rows[:200])
+        app.tree.see(iid); rec.settle()
+        bbox = app.tree.bbox(iid)
+        if not bbox:
+            continue
+        def dbl():
+            app.tree.event_generate("<Double-1>", x=bbox[0] + 5, y=bbox[1] + bbox[3] // 2)
+        rec.measure("report_double_click_edit", dbl)
+        win = _newest_toplevel(root)
+        if isinstance(win, EditEntryWindow):
+            win.destroy()
+
+    root.destroy()
+    return rec.samples
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Задержки интерфейса TodoApp / ReportApp под Xvfb")
+    ap.add_argument("--tasks", type=int, default=2000)
+    ap.add_argument("--entries", type=int, default=50000)
+    ap.add_argument("--repeat", type=int, default=20)
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--display", help="существующий X-дисплей вместо Xvfb")
+    ap.add_argument("--keep", action="store_true", help="не удалять рабочий каталог")
+    ap.add_argument("--out", help="файл для JSON (по умолчанию stdout)")
+    args = ap.parse_args(argv)
+
+    out_path = os.path.abspath(args.out) if args.out else None
+    workdir = tempfile.mkdtemp(prefix="todo-bench-")
+    # never talk to a running daemon: the benchmark works on its own files
+    os.environ["TODO_PLUS_SOCKET"] = os.path.join(workdir, "no-daemon.sock")
+    xvfb = None
+    if args.display:
+        os.environ["DISPLAY"] = args.display
+    else:
+        xvfb, os.environ["DISPLAY"] = start_xvfb()
+    try:
+        if APP_DIR not in sys.path:
+            sys.path.insert(0, APP_DIR)
+        generate_dataset(workdir, args.tasks, args.entries, args.seed)
+        os.chdir(workdir)
+        from time_tracker import workspace
+        workspace.point_to(workspace.paths_in(workdir))
+
+        rnd = random.Random(args.seed)
+        samples = bench_todo(args.repeat, rnd)
+        samples.update(bench_report(args.repeat, rnd))
+        report = {
+            "dataset": {"tasks": args.tasks, "entries": args.entries, "repeat": args.repeat},
+            "python": sys.version.split()[0],
+            "latency_ms": summarize(samples),
+        }
+        text = json.dumps(report, ensure_ascii=False, indent=2)
+        if out_path:
+            with open(out_path, "w", encoding="utf-8") as f:
+                f.write(text + "\n")
+        else:
+            print(text)
+    finally:
+        os.chdir(APP_DIR)
+        if xvfb:
+            xvfb.terminate()
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+# time_tracker/client.py
+"""
+Client for the optional local daemon (time_tracker/daemon.py):
+- DaemonClient(path).call(method, **params) -> result (JSON-RPC 2.0, one JSON per line)
+- DaemonClient.subscribe(callback) -> change notifications on a background thread
+- get_client() -> shared client if the daemon is running, else None
+- set_socket_path(path) -> switch to another daemon (one per workspace)
+- rpc_or_local(method, local, **params) -> the daemon's answer while it runs, else
+  local(); used by every loader / writer in utils and tracker
+
+While the socket exists the daemon owns the files: a call that fails on the way
+raises DaemonUnavailable instead of writing the file behind the daemon's back.
+"""
+
+import os, json, socket, threading, itertools
+
+SOCKET_PATH = os.environ.get("TODO_PLUS_SOCKET") or os.path.join(
+    os.path.expanduser("~"), ".cache", "todo-plus", "daemon.sock")
+
+
+class DaemonError(Exception):
+    pass
+
+
+class DaemonUnavailable(DaemonError):
+    """The daemon socket exists but the daemon did not answer."""
+
+
+class DaemonClient:
+    def __init__(self, path=SOCKET_PATH, timeout=5.0):
+        self.path = path
+        self.timeout = timeout
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._sock = None
+        self._file = None
+        self._connect()
+
+    def _connect(self):
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.settimeout(self.timeout)
+        self._sock.connect(self.path)
+        self._file = self._sock.makefile("rwb")
+
+    def close(self):
+        try:
+            if self._file:
+                self._file.close()
+            if self._sock:
+                self._sock.close()
+        except OSError:
+            pass
+        self._sock = self._file = None
+
+    def call(self, method, **params):
+        req = {"jsonrpc": "2.0", "id": next(self._ids), "method": method, "params": params}
+        with self._lock:
+            if self._file is None:
+                self._connect()
+            try:
+                self._file.write(json.dumps(req, ensure_ascii=False).encode("utf-8") + b"\n")
+                self._file.flush()
+                line = self._file.readline()
+            except OSError:
+                self.close()
+                raise
+        if not line:
+            self.close()
+            raise ConnectionError("daemon closed the connection")
+        resp = json.loads(line)
+        if "error" in resp:
+            raise DaemonError(resp["error"].get("message", "error"))
+        return resp.get("result")
+
+    def subscribe(self, callback):
+        """
+        Open a separate connection and call callback(params) for every change
+        notification ({"what": "tasks" | "log" | "settings"}).
+        Runs on a daemon thread; returns the thread.
+        """
+        def run():
+            try:
+                sub = DaemonClient(self.path, timeout=None)
+                sub._file.write(json.dumps({"jsonrpc": "2.0", "id": 0, "method": "subscribe",
+                                            "params": {}}).encode("utf-8") + b"\n")
+                sub._file.flush()
+                for line in sub._file:
+                    msg = json.loads(line)
+                    if msg.get("method") == "changed":
+                        try:
+                            callback(msg.get("params", {}))
+                        except Exception as e:
+                            print("Subscriber error:", e)
+            except (OSError, ValueError):
+                pass
+        t = threading.Thread(target=run, daemon=True)
+        t.start()
+        return t
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def set_socket_path(path):
+    """
+    Use the daemon at path from now on; drops the shared connection.
+    """
+    global SOCKET_PATH, _shared
+    with _shared_lock:
+        SOCKET_PATH = path
+        if _shared is not None:
+            _shared.close()
+        _shared = None
+
+
+def _shared_client():
+    # raises OSError if the daemon cannot be reached
+    global _shared
+    with _shared_lock:
+        if _shared is None or _shared._file is None:
+            _shared = None
+            _shared = DaemonClient(SOCKET_PATH)
+        return _shared
+
+
+def get_client():
+    """
+    Shared client if the daemon socket exists and answers, else None.
+    """
+    if not os.path.exists(SOCKET_PATH):
+        return None
+    try:
+        return _shared_client()
+    except OSError:
+        return None
+
+
+def rpc_or_local(method, local, **params):
+    """
+    Result of method on the daemon if it runs, else of local() on the files.
+    A socket file nobody listens on (the daemon died) counts as no daemon; any
+    other failure raises DaemonUnavailable - never a fallback write.
+    """
+    if not os.path.exists(SOCKET_PATH):
+        return local()
+    try:
+        client = _shared_client()
+    except (ConnectionRefusedError, FileNotFoundError):
+        return local()
+    except OSError as e:
+        raise DaemonUnavailable(f"демон не отвечает: {e}") from e
+    try:
+        return client.call(method, **params)
+    except OSError as e:
+        raise DaemonUnavailable(f"демон не отвечает: {e}") from e
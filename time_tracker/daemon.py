@@ -0,0 +1,277 @@
+# time_tracker/daemon.py
+"""
+Optional local daemon that owns all data:
+- tasks, time log and settings are loaded once and kept in memory
+- a single writer task persists changed files (debounced, atomic replace)
+- JSON-RPC 2.0 over a Unix domain socket, one JSON object per line
+- the timer itself stays in the app; the daemon only stores its record (log.update)
+
+Methods:
+  tasks.list(project=None, section=None, done=None)   tasks.replace(tasks)
+  tasks.add(task) / tasks.update(id, fields) / tasks.delete(ids)
+  log.list(start=None, end=None)   log.append(entry)   log.replace(entries)   log.version()
+  log.update(task_id, start, fields, defaults=None)   # one record, e.g. the running session
+  log.aggregate(start=None, end=None, by="project")   # project|section|task|day
+  settings.get()   settings.set(values)
+  subscribe()  -> notifications {"method": "changed", "params": {"what": ...}}
+
+Run from the app directory:  python -m time_tracker.daemon [--workspace NAME] [--socket PATH]
+"""
+
+import asyncio, datetime, json, os, signal, sys
+
+from time_tracker import tracker
+from time_tracker.client import SOCKET_PATH
+
+import utils
+
+WRITE_DELAY = 0.5  # seconds, coalesces bursts of changes into one write
+
+
+def _read_json(path, default):
+    if os.path.exists(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"Cannot read {path}: {e}", file=sys.stderr)
+    return default
+
+
+def _write_json(path, payload):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(payload)
+    os.replace(tmp, path)
+
+
+class RpcError(Exception):
+    pass
+
+
+class DataDaemon:
+    def __init__(self, socket_path=SOCKET_PATH):
+        self.socket_path = socket_path
+        self.paths = {
+            "tasks": utils.FILE,
+            "log": utils.TIME_LOG,
+            "settings": utils.SETTINGS_FILE,
+        }
+        self.tasks = utils.read_tasks_file(self.paths["tasks"])
+        self.log = tracker.read_time_log(self.paths["log"])
+        self.settings = {**utils.DEFAULT_SETTINGS, **_read_json(self.paths["settings"], {})}
+        self.log_version = 0
+        self._started = datetime.datetime.now().timestamp()
+        self._dirty = set()
+        self._wake = None
+        self._subscribers = set()
+
+    # --- persistence: the only place that writes files ---
+    def _changed(self, what):
+        if what == "log":
+            self.log_version += 1
+        if what in self.paths:
+            self._dirty.add(what)
+            self._wake.set()
+        msg = (json.dumps({"jsonrpc": "2.0", "method": "changed", "params": {"what": what}}) + "\n").encode()
+        for w in list(self._subscribers):
+            try:
+                w.write(msg)
+            except Exception:
+                self._subscribers.discard(w)
+
+    def _payload(self, what):
+        obj = {"tasks": self.tasks, "log": {"schema": tracker.LOG_SCHEMA, "entries": self.log},
+               "settings": self.settings}[what]
+        return json.dumps(obj, ensure_ascii=False, indent=2)
+
+    async def _writer(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._wake.wait()
+            await asyncio.sleep(WRITE_DELAY)
+            self._wake.clear()
+            await self._flush(loop)
+
+    async def _flush(self, loop):
+        dirty, self._dirty = self._dirty, set()
+        for what in dirty:
+            # serialize on the loop (consistent snapshot), write off the loop
+            payload = self._payload(what)
+            try:
+                await loop.run_in_executor(None, _write_json, self.paths[what], payload)
+            except OSError as e:
+                print(f"Write error {what}: {e}", file=sys.stderr)
+                self._dirty.add(what)
+
+    # --- helpers ---
+    @staticmethod
+    def _dt(value):
+        return datetime.datetime.fromisoformat(value) if value else None
+
+    def _in_range(self, start, end):
+        start, end = self._dt(start), self._dt(end)
+        for e in self.log:
+            s, en, _ = tracker.parse_range(e)
+            if not s:
+                continue
+            if (start and en < start) or (end and s > end):
+                continue
+            yield e, s, en
+
+    # --- RPC methods ---
+    def rpc_tasks_list(self, project=None, section=None, done=None):
+        return [t for t in self.tasks
+                if (project is None or t.get("project") == project)
+                and (section is None or t.get("section") == section)
+                and (done is None or bool(t.get("done")) == done)]
+
+    def rpc_tasks_replace(self, tasks):
+        self.tasks = list(tasks)
+        self._changed("tasks")
+        return len(self.tasks)
+
+    def rpc_tasks_add(self, task):
+        if not task.get("id"):
+            raise RpcError("task.id required")
+        self.tasks.append(task)
+        self._changed("tasks")
+        return task
+
+    def rpc_tasks_update(self, id, fields):
+        for t in self.tasks:
+            if t["id"] == id:
+                t.update(fields)
+                self._changed("tasks")
+                return t
+        raise RpcError(f"no task {id}")
+
+    def rpc_tasks_delete(self, ids):
+        ids = set(ids)
+        before = len(self.tasks)
+        self.tasks = [t for t in self.tasks if t["id"] not in ids]
+        self._changed("tasks")
+        return before - len(self.tasks)
+
+    def rpc_log_list(self, start=None, end=None):
+        if start is None and end is None:
+            return self.log
+        return [e for e, _, _ in self._in_range(start, end)]
+
+    def rpc_log_version(self):
+        return [self._started, self.log_version]
+
+    def rpc_log_append(self, entry):
+        self.log.append(entry)
+        self._changed("log")
+        return len(self.log) - 1
+
+    def rpc_log_update(self, task_id, start, fields, defaults=None):
+        rec = tracker.find_entry(self.log, task_id, start)
+        if rec is None:
+            if defaults is None:
+                return None
+            rec = {"task_id": task_id, "start": start, **defaults}
+            self.log.append(rec)
+        rec.update(fields)
+        self._changed("log")
+        return rec
+
+    def rpc_log_replace(self, entries):
+        self.log = list(entries)
+        self._changed("log")
+        return len(self.log)
+
+    def rpc_log_aggregate(self, start=None, end=None, by="project"):
+        out = {}
+        for e, s, en in self._in_range(start, end):
+            if by == "day":
+                key = s.date().isoformat()
+            elif by == "task":
+                key = e.get("task_text") or e.get("task_id") or "?"
+            elif by in ("project", "section"):
+                key = e.get(by) or "—"
+            else:
+                raise RpcError(f"unknown group: {by}")
+            dur = e.get("duration_seconds")
+            if dur is None:
+                dur = int((en - s).total_seconds())
+            out[key] = out.get(key, 0) + int(dur)
+        return out
+
+    def rpc_settings_get(self):
+        return self.settings
+
+    def rpc_settings_set(self, values):
+        self.settings.update(values)
+        self._changed("settings")
+        return self.settings
+
+    # --- transport ---
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                resp = self._dispatch(line, writer)
+                if resp is not None:
+                    writer.write((json.dumps(resp, ensure_ascii=False) + "\n").encode("utf-8"))
+                    await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._subscribers.discard(writer)
+            writer.close()
+
+    def _dispatch(self, line, writer):
+        req_id = None
+        try:
+            req = json.loads(line)
+            if not isinstance(req, dict):
+                return {"jsonrpc": "2.0", "id": None, "error": {"code": -32600, "message": "invalid request"}}
+            req_id = req.get("id")
+            method = req.get("method", "")
+            if method == "subscribe":
+                self._subscribers.add(writer)
+                return None
+            fn = getattr(self, "rpc_" + method.replace(".", "_"), None)
+            if fn is None:
+                return {"jsonrpc": "2.0", "id": req_id, "error": {"code": -32601, "message": f"unknown method {method}"}}
+            result = fn(**(req.get("params") or {}))
+            return {"jsonrpc": "2.0", "id": req_id, "result": result}
+        except (RpcError, AttributeError, TypeError, ValueError, KeyError) as e:
+            return {"jsonrpc": "2.0", "id": req_id, "error": {"code": -32000, "message": str(e)}}
+
+    async def serve(self):
+        self._wake = asyncio.Event()
+        os.makedirs(os.path.dirname(self.socket_path), exist_ok=True)
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+        server = await asyncio.start_unix_server(self._handle, path=self.socket_path)
+        os.chmod(self.socket_path, 0o600)
+        loop = asyncio.get_running_loop()
+        stop = asyncio.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+        writer = asyncio.create_task(self._writer())
+        print(f"Daemon listening on {self.socket_path}")
+        try:
+            async with server:
+                await stop.wait()
+        finally:
+            writer.cancel()
+            await self._flush(loop)
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="To Do Plus data daemon")
+    ap.add_argument("--workspace", help="serve this workspace (default: the active one)")
+    ap.add_argument("--socket", help="socket path (default: the workspace's)")
+    args = ap.parse_args()
+    from time_tracker import workspace, client
+    workspace.activate(args.workspace or workspace.active_name())
+    asyncio.run(DataDaemon(args.socket or client.SOCKET_PATH).serve())
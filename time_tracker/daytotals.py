@@ -0,0 +1,115 @@
+# time_tracker/daytotals.py
+"""
+Tracked seconds per calendar day for the report heatmap:
+- one flat array('l') per project plus one for all projects, indexed by
+  date ordinal - base; built in one pass over the normalized report entries
+- add(e) / remove(e) adjust a single entry in place (edits from the report)
+- span(first, last, project) is a slice: panning across years reads no log
+- an entry crossing midnight is split between days in proportion to its wall time
+"""
+
+import datetime
+from array import array
+
+ALL = None  # project key of the overall totals
+
+
+def day_shares(s, en, dur):
+    """
+    [(date ordinal, seconds), ...]: dur seconds of the session s..en split
+    between the days it touches in proportion to its wall time on each.
+    """
+    d0, d1 = s.date(), en.date()
+    if d1 <= d0 or en <= s:
+        return [(d0.toordinal(), dur)]
+    wall = (en - s).total_seconds()
+    out, left, cur = [], dur, s
+    while cur.date() < d1:
+        nxt = datetime.datetime.combine(cur.date() + datetime.timedelta(days=1), datetime.time.min)
+        part = int(round(dur * (nxt - cur).total_seconds() / wall))
+        out.append((cur.date().toordinal(), part))
+        left -= part
+        cur = nxt
+    out.append((d1.toordinal(), left))
+    return out
+
+
+class DayTotals:
+    def __init__(self):
+        self.base = None          # date ordinal of index 0
+        self._days = {ALL: array("l")}   # project -> seconds per day
+
+    def rebuild(self, entries):
+        """
+        entries: normalized report entries (datetime start/end, duration_seconds, project).
+        """
+        self.base = None
+        self._days = {ALL: array("l")}
+        for e in entries:
+            self.add(e)
+
+    def _grow(self, lo, hi):
+        # make ordinals lo..hi addressable in every array
+        if self.base is None:
+            self.base = lo
+        if lo < self.base:
+            pad = self.base - lo
+            for key, arr in self._days.items():
+                self._days[key] = array("l", [0]) * pad + arr
+            self.base = lo
+        need = hi - self.base + 1
+        for arr in self._days.values():
+            if len(arr) < need:
+                arr.extend(array("l", [0]) * (need - len(arr)))
+
+    def _apply(self, e, sign):
+        shares = day_shares(e["start"], e["end"], int(e["duration_seconds"] or 0))
+        self._grow(shares[0][0], shares[-1][0])
+        project = e.get("project") or "—"
+        if project not in self._days:
+            self._days[project] = array("l", [0]) * len(self._days[ALL])
+        for key in (ALL, project):
+            arr = self._days[key]
+            for day, secs in shares:
+                arr[day - self.base] += sign * secs
+
+    def add(self, e):
+        self._apply(e, 1)
+
+    def remove(self, e):
+        self._apply(e, -1)
+
+    def projects(self):
+        return sorted(k for k in self._days if k is not ALL)
+
+    def get(self, day, project=ALL):
+        arr = self._days.get(project)
+        if arr is None or self.base is None:
+            return 0
+        i = day.toordinal() - self.base
+        return arr[i] if 0 <= i < len(arr) else 0
+
+    def span(self, first, last, project=ALL):
+        """
+        Seconds for every day first..last (dates, inclusive).
+        """
+        n = last.toordinal() - first.toordinal() + 1
+        arr = self._days.get(project)
+        if arr is None or self.base is None:
+            return [0] * n
+        lo = first.toordinal() - self.base
+        out = [0] * n
+        a, b = max(0, lo), min(len(arr), lo + n)
+        if a < b:
+            out[a - lo:b - lo] = arr[a:b]
+        return out
+
+    def years(self):
+        """
+        (first_year, last_year) with data, None if empty.
+        """
+        if self.base is None or not len(self._days[ALL]):
+            return None
+        first = datetime.date.fromordinal(self.base).year
+        last = datetime.date.fromordinal(self.base + len(self._days[ALL]) - 1).year
+        return first, last
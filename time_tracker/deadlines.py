@@ -0,0 +1,96 @@
+# time_tracker/deadlines.py
+"""
+Deadline index for open tasks:
+- deadlines ("DD.MM.YYYY") are parsed once per task change, not on every refresh
+- a min-heap of upcoming transitions: "overdue" (the day after the deadline starts)
+  and optional "remind" (N hours before the end of the deadline day)
+- the caller schedules one wake-up at next_wakeup() and re-tags only pop_due() tasks
+"""
+
+import datetime, heapq
+
+
+def parse_deadline(value):
+    if not value:
+        return None
+    try:
+        return datetime.datetime.strptime(value, "%d.%m.%Y").date()
+    except ValueError:
+        return None
+
+
+class DeadlineIndex:
+    def __init__(self, reminder_hours=0):
+        self.reminder_hours = reminder_hours
+        self._deadline = {}   # task_id -> (date, version)
+        self._heap = []       # (when, version, task_id, kind)
+        self._version = 0
+
+    def rebuild(self, tasks, now=None):
+        self._deadline.clear()
+        self._heap = []
+        for t in tasks:
+            self.update(t, now, _push_heapify=False)
+        heapq.heapify(self._heap)
+
+    def update(self, task, now=None, _push_heapify=True):
+        """
+        Re-index one task after add / edit / done toggle.
+        """
+        tid = task["id"]
+        d = None if task.get("done") else parse_deadline(task.get("deadline", ""))
+        if d is None:
+            self._deadline.pop(tid, None)
+            return
+        self._version += 1
+        ver = self._version
+        self._deadline[tid] = (d, ver)
+        now = now or datetime.datetime.now()
+        day_after = datetime.datetime.combine(d + datetime.timedelta(days=1), datetime.time.min)
+        events = [(day_after, "overdue")]
+        if self.reminder_hours:
+            remind_at = day_after - datetime.timedelta(hours=self.reminder_hours)
+            if remind_at > now:
+                events.append((remind_at, "remind"))
+        for when, kind in events:
+            if when > now:
+                item = (when, ver, tid, kind)
+                if _push_heapify:
+                    heapq.heappush(self._heap, item)
+                else:
+                    self._heap.append(item)
+
+    def remove(self, task_id):
+        self._deadline.pop(task_id, None)
+
+    def is_overdue(self, task_id, today=None):
+        rec = self._deadline.get(task_id)
+        return bool(rec) and rec[0] < (today or datetime.date.today())
+
+    def _live(self, item):
+        rec = self._deadline.get(item[2])
+        return rec is not None and rec[1] == item[1]
+
+    def next_wakeup(self, now=None):
+        """
+        Earliest of the next live heap event and the next midnight.
+        """
+        now = now or datetime.datetime.now()
+        while self._heap and not self._live(self._heap[0]):
+            heapq.heappop(self._heap)
+        midnight = datetime.datetime.combine(now.date() + datetime.timedelta(days=1), datetime.time.min)
+        if self._heap and self._heap[0][0] < midnight:
+            return self._heap[0][0]
+        return midnight
+
+    def pop_due(self, now=None):
+        """
+        [(task_id, kind), ...] for every live event at or before now.
+        """
+        now = now or datetime.datetime.now()
+        out = []
+        while self._heap and self._heap[0][0] <= now:
+            item = heapq.heappop(self._heap)
+            if self._live(item):
+                out.append((item[2], item[3]))
+        return out
@@ -0,0 +1,127 @@
+# time_tracker/importer.py
+"""
+Bulk import of activities from CSV or JSONL:
+- read_batch(path) -> list of raw rows
+- normalize_batch(rows, tasks) -> (entries, errors)
+- import_file(path, tasks) -> (accepted, conflicts, errors), single write to the log
+
+Accepted columns / keys (same names as in time_log.json):
+  task_id, task_text, project, section, start, end, duration_seconds
+'start'/'end' may be ISO ('2025-10-13T09:00:00') or 'DD.MM.YYYY HH:MM';
+alternatively a separate 'date' (DD.MM.YYYY) with 'start'/'end' as HH:MM.
+An ISO value with a UTC offset is converted to local time (the log is naive local).
+"""
+
+import csv, json, os, sys, datetime
+
+from time_tracker import tracker
+from utils import load_tasks, load_archived_tasks
+
+
+def read_batch(path):
+    ext = os.path.splitext(path)[1].lower()
+    rows = []
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        if ext in (".jsonl", ".ndjson"):
+            for line in f:
+                line = line.strip()
+                if line:
+                    rows.append(json.loads(line))
+        elif ext == ".json":
+            rows = json.load(f)
+        else:
+            sample = f.read(2048); f.seek(0)
+            try:
+                dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+            except csv.Error:
+                dialect = csv.excel
+            rows = [dict(r) for r in csv.DictReader(f, dialect=dialect)]
+    return rows
+
+
+def _parse_dt(value, date_s=""):
+    # None for anything unparsable, non-strings included (JSONL rows carry any type)
+    if not isinstance(value, str):
+        return None
+    value = value.strip()
+    if isinstance(date_s, str) and date_s and len(value) <= 5:
+        value = f"{date_s.strip()} {value}"
+    try:
+        dt = datetime.datetime.fromisoformat(value)
+        return dt.astimezone().replace(tzinfo=None) if dt.tzinfo else dt
+    except ValueError:
+        pass
+    for fmt in ("%d.%m.%Y %H:%M", "%d.%m.%Y %H:%M:%S", "%Y-%m-%d %H:%M"):
+        try:
+            return datetime.datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def normalize_batch(rows, tasks=None):
+    """
+    Turn raw rows into time log entries. Missing task fields are filled from
+    tasks (by task_id, archived ones included, then by exact text).
+    Returns (entries, errors) where errors is a list of (row_number, message).
+    """
+    by_id = {t["id"]: t for t in load_archived_tasks()}
+    by_id.update({t["id"]: t for t in (tasks or [])})
+    by_text = {t.get("text", ""): t for t in (tasks or [])}
+    now = datetime.datetime.now()
+    entries, errors = [], []
+    for n, r in enumerate(rows, 1):
+        if not isinstance(r, dict):
+            errors.append((n, "не объект")); continue
+        start_dt = _parse_dt(r.get("start"), r.get("date", ""))
+        end_dt = _parse_dt(r.get("end"), r.get("date", ""))
+        if not start_dt or not end_dt:
+            errors.append((n, "неверный формат даты/времени")); continue
+        if end_dt <= start_dt:
+            errors.append((n, "окончание раньше начала")); continue
+        if end_dt > now:
+            errors.append((n, "время в будущем")); continue
+        task = by_id.get(r.get("task_id")) or by_text.get(r.get("task_text", ""))
+        entries.append({
+            "task_id": r.get("task_id") or (task["id"] if task else ""),
+            "task_text": r.get("task_text") or (task.get("text", "") if task else ""),
+            "project": r.get("project") or (task.get("project", "") if task else ""),
+            "section": r.get("section") or (task.get("section", "") if task else ""),
+            "start": start_dt.isoformat(),
+            "end": end_dt.isoformat(),
+            "duration_seconds": int((end_dt - start_dt).total_seconds())
+        })
+    return entries, errors
+
+
+def import_file(path, tasks=None, dry_run=False):
+    """
+    Parse the file, check it against the whole log with one sweep and
+    commit all accepted entries in one write.
+    """
+    entries, errors = normalize_batch(read_batch(path), tasks)
+    existing = tracker.load_time_log(strict=True)
+    accepted, conflicts = tracker.merge_batch(existing, entries)
+    if accepted and not dry_run:
+        existing.extend(accepted)
+        tracker.save_time_log(existing)
+    return accepted, conflicts, errors
+
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Импорт активностей из CSV/JSONL в time_log.json")
+    ap.add_argument("path")
+    ap.add_argument("--dry-run", action="store_true", help="только проверить, ничего не записывать")
+    args = ap.parse_args()
+
+    accepted, conflicts, errors = import_file(args.path, load_tasks(), dry_run=args.dry_run)
+    print(f"Добавлено: {len(accepted)}, конфликтов: {len(conflicts)}, ошибок: {len(errors)}")
+    for entry, overlaps in conflicts:
+        print(f"  конфликт: {entry['start']} — {entry['end']} ({entry['task_text']})")
+        for s_ex, e_ex, txt in overlaps:
+            print(f"    • {s_ex.strftime('%Y-%m-%d %H:%M')} — {e_ex.strftime('%H:%M')} ({txt})")
+    for n, msg in errors:
+        print(f"  строка {n}: {msg}")
+    sys.exit(1 if conflicts or errors else 0)
@@ -0,0 +1,289 @@
+# time_tracker/jsonstream.py
+"""
+Streaming, corruption-tolerant readers for the JSON data files:
+- iter_json_array(f) -> elements of a top-level array, one at a time
+- iter_log_entries(f) -> entries of the {"schema": N, "entries": [...]} wrapper
+- with on_damage=callback an element that cannot be decoded is skipped: the
+  reader resyncs at the next top-level element (where the broken one's brackets
+  balance, or the next line opening an element at the array's indentation) and
+  passes the skipped text to the callback; a file cut short by a crash ends the
+  stream instead of raising
+- with required=keys, a salvaged element that is not an object with those keys
+  is treated as damage too, so a stray fragment is never written back
+- load_salvaged(path, reader, rewrite) -> every readable record; damaged text is
+  moved to <path>.corrupt-<time> and the file is rewritten from what was read,
+  so the next write never drops history
+Memory stays bounded by the chunk size plus the largest single record.
+"""
+
+import json, os, sys, shutil, datetime
+
+
+class SchemaError(ValueError):
+    pass
+
+
+class _Reader:
+    def __init__(self, f, chunk_size):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.dec = json.JSONDecoder()
+        self.buf, self.pos, self.eof = "", 0, False
+
+    def fill(self):
+        data = self.f.read(self.chunk_size)
+        if not data:
+            self.eof = True
+        # keep a whitespace-only start of the current line: line_indent() looks back to it
+        keep = self.buf.rfind("\n", 0, self.pos)
+        if keep < 0 or self.buf[keep + 1:self.pos].strip(" \t"):
+            keep = self.pos
+        self.buf = self.buf[keep:] + data
+        self.pos -= keep
+
+    def peek(self):
+        """
+        Next non-whitespace char, "" at the end of the file.
+        """
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if self.eof:
+                return ""
+            self.fill()
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                obj, end = self.dec.raw_decode(self.buf, self.pos)
+                # a number at the buffer edge may be cut; make sure it is terminated
+                if end == len(self.buf) and not self.eof:
+                    raise ValueError
+                self.pos = end
+                return obj
+            except ValueError:
+                if self.eof:
+                    raise
+                self.fill()
+
+    def line_indent(self):
+        """
+        Whitespace between the start of the current line and pos, None if the
+        line start is no longer in the buffer or the line has other text.
+        """
+        i = self.buf.rfind("\n", 0, self.pos)
+        if i < 0:
+            return None
+        lead = self.buf[i + 1:self.pos]
+        return lead if not lead.strip(" \t") else None
+
+    def skip_element(self, indent):
+        """
+        Drop a damaged element starting at pos: up to where its brackets balance
+        (strings respected), or up to the next line that opens an element at
+        indent. Returns (dropped text, True if stopped after a balanced element).
+        """
+        out, depth, in_str, esc = [], 0, False, False
+        mark = None if indent is None else "\n" + indent + "{"
+        ahead = len(mark) if mark else 1
+        i = self.pos
+        while True:
+            if i + ahead > len(self.buf) and not self.eof:
+                out.append(self.buf[self.pos:i])
+                self.pos = i
+                self.fill()
+                i = self.pos
+                continue
+            if i >= len(self.buf):
+                out.append(self.buf[self.pos:])
+                self.pos = len(self.buf)
+                return "".join(out), False
+            c = self.buf[i]
+            if c == "\n" and mark and i > self.pos and self.buf.startswith(mark, i):
+                out.append(self.buf[self.pos:i])
+                self.pos = i
+                return "".join(out), False
+            if in_str:
+                if esc:
+                    esc = False
+                elif c == "\\":
+                    esc = True
+                elif c == '"' or c == "\n":  # a string never spans lines in our files
+                    in_str = False
+            elif c == '"':
+                in_str = True
+            elif c in "{[":
+                depth += 1
+            elif c in "}]" and depth:  # a stray closer in junk is junk, not the end of the array
+                depth -= 1
+                if depth == 0:
+                    out.append(self.buf[self.pos:i + 1])
+                    self.pos = i + 1
+                    return "".join(out), True
+            i += 1
+
+    def skip_to(self, ch):
+        """
+        Drop the current char and everything up to the next ch (or the end);
+        return the dropped text.
+        """
+        out = [self.buf[self.pos:self.pos + 1]]
+        self.pos += 1
+        while True:
+            i = self.buf.find(ch, self.pos)
+            if i >= 0:
+                out.append(self.buf[self.pos:i])
+                self.pos = i
+                return "".join(out)
+            out.append(self.buf[self.pos:])
+            self.pos = len(self.buf)
+            if self.eof:
+                return "".join(out)
+            self.fill()
+
+
+def _elements(r, on_damage, required=None):
+    # r is positioned right after "["
+    first = True
+    indent = None  # leading whitespace of element lines in an indented file
+    while True:
+        ch = r.peek()
+        if ch == "]":
+            r.pos += 1
+            return
+        if ch == "":
+            if on_damage is None:
+                raise ValueError("unexpected end of array")
+            return  # cut after a complete element: nothing lost
+        if not first:
+            if ch == ",":
+                r.pos += 1
+                ch = r.peek()
+                if ch == "]" and on_damage is not None:
+                    continue  # stray trailing comma
+            elif on_damage is None:
+                raise ValueError(f"expected ',' at offset {r.pos}")
+            elif ch != "{":
+                # junk between elements: on to the next element start
+                on_damage(r.skip_element(indent)[0] if indent is not None else r.skip_to("{"))
+                first = True
+                continue
+        first = False
+        if ch == "":
+            if on_damage is None:
+                raise ValueError("unexpected end of array")
+            return
+        if indent is None and on_damage is not None:
+            indent = r.line_indent()
+        try:
+            obj = r.value()
+        except ValueError:
+            if on_damage is None:
+                raise
+            text, balanced = r.skip_element(indent)
+            on_damage(text)
+            first = not balanced  # after a balanced element a "," is due
+            continue
+        if required and on_damage is not None and not (
+                isinstance(obj, dict) and all(k in obj for k in required)):
+            on_damage(json.dumps(obj, ensure_ascii=False))
+            continue
+        yield obj
+
+
+def iter_json_array(f, chunk_size=1 << 16, on_damage=None, required=None):
+    """
+    Yield the elements of a top-level JSON array from a text file one at a time.
+    """
+    r = _Reader(f, chunk_size)
+    ch = r.peek()
+    if ch != "[":
+        if ch == "" and on_damage is not None:
+            return  # empty file
+        raise ValueError("not a JSON array")
+    r.pos += 1
+    yield from _elements(r, on_damage, required)
+
+
+def iter_log_entries(f, chunk_size=1 << 16, on_damage=None, schema=None, header=None, required=None):
+    """
+    Yield the entries of a {"schema": N, "entries": [...]} document one at a
+    time. Other top-level keys go to header (a dict) if given; with schema set,
+    a document of another schema raises SchemaError before any entry is read.
+    """
+    r = _Reader(f, chunk_size)
+    head = {} if header is None else header
+    ch = r.peek()
+    if ch != "{":
+        if ch == "" and on_damage is not None:
+            return
+        raise ValueError("not a JSON object")
+    r.pos += 1
+    while True:
+        ch = r.peek()
+        if ch == "}":
+            return
+        if ch == ",":
+            r.pos += 1
+            continue
+        if ch == "":
+            if on_damage is None:
+                raise ValueError("unexpected end of document")
+            return
+        key = r.value()
+        if r.peek() != ":":
+            raise ValueError(f"expected ':' at offset {r.pos}")
+        r.pos += 1
+        if key != "entries":
+            head[key] = r.value()
+            continue
+        if schema is not None and head.get("schema") != schema:
+            raise SchemaError(f"unsupported time log schema: {head.get('schema')}")
+        if r.peek() != "[":
+            raise ValueError("'entries' is not an array")
+        r.pos += 1
+        yield from _elements(r, on_damage, required)
+
+
+def quarantine(path, damage):
+    """
+    Save unreadable text next to path; damage is a list of skipped pieces,
+    None in it means the whole file. Returns the side file path.
+    """
+    side = base = f"{path}.corrupt-{datetime.datetime.now().strftime('%Y%m%d-%H%M%S')}"
+    n = 1
+    while os.path.exists(side):
+        n += 1
+        side = f"{base}-{n}"
+    if None in damage:
+        shutil.copyfile(path, side)
+    else:
+        with open(side, "w", encoding="utf-8") as f:
+            f.write("\n".join(damage))
+    return side
+
+
+def load_salvaged(path, reader, rewrite):
+    """
+    All readable records of path. reader(f, on_damage) yields them; if anything
+    was skipped the damaged text is quarantined and rewrite(records) replaces
+    the file with the salvaged data. SchemaError and OSError propagate.
+    """
+    records, damage = [], []
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for rec in reader(f, damage.append):
+                records.append(rec)
+    except SchemaError:
+        raise
+    except ValueError:  # broken document header or undecodable bytes
+        damage.append(None)
+    if damage:
+        side = quarantine(path, damage)
+        print(f"{path}: damaged, {len(records)} records salvaged, unreadable part saved to {side}",
+              file=sys.stderr)
+        rewrite(records)
+    return records
@@ -0,0 +1,131 @@
+# time_tracker/migrate.py
+"""
+One-time migration of time_log.json to the versioned format:
+
+    {"schema": 2, "entries": [ {...}, ... ]}
+
+Every entry of schema 2 has ISO 'start', 'end' and integer 'duration_seconds'.
+Legacy {timestamp, seconds} records are converted (timestamp is the end time),
+missing durations / ends are backfilled and task_id is filled by task text.
+Records that cannot be parsed are moved to time_log.rejected.json; text that is
+not even valid JSON (a torn write) is skipped and stays in the .v1.bak copy.
+The legacy array is read incrementally and entries are written one by one.
+
+Run by tracker.read_time_log() automatically, or:  python -m time_tracker.migrate [path]
+"""
+
+import json, os, datetime
+
+from time_tracker.jsonstream import iter_json_array
+
+LOG_SCHEMA = 2
+
+
+def is_legacy(path):
+    """
+    True if the file is a bare JSON array (schema 1).
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        while True:
+            ch = f.read(1)
+            if not ch or not ch.isspace():
+                return ch == "["
+
+
+def normalize_entry(e, task_by_text=None):
+    """
+    Schema-2 entry for a legacy / incomplete record, or None if it cannot be parsed.
+    """
+    if not isinstance(e, dict):
+        return None
+    e = dict(e)
+    try:
+        if e.get("start"):
+            start = datetime.datetime.fromisoformat(e["start"])
+            if e.get("end"):
+                end = datetime.datetime.fromisoformat(e["end"])
+            elif e.get("duration_seconds") is not None:
+                end = start + datetime.timedelta(seconds=int(e["duration_seconds"]))
+            else:
+                return None
+        elif e.get("timestamp") and e.get("seconds") is not None:
+            end = datetime.datetime.strptime(e["timestamp"], "%Y-%m-%d %H:%M:%S")
+            start = end - datetime.timedelta(seconds=int(e["seconds"]))
+        else:
+            return None
+    except (TypeError, ValueError):
+        return None
+    e.pop("timestamp", None); e.pop("seconds", None)
+    e["start"] = start.isoformat()
+    e["end"] = end.isoformat()
+    try:
+        e["duration_seconds"] = int(e["duration_seconds"])
+    except (KeyError, TypeError, ValueError):
+        e["duration_seconds"] = max(0, int((end - start).total_seconds()))
+    if not e.get("task_id") and task_by_text and e.get("task_text") in task_by_text:
+        e["task_id"] = task_by_text[e["task_text"]]
+    return e
+
+
+def _task_by_text(tasks_file):
+    # read files directly: this may run inside the daemon before it serves
+    out = {}
+    paths = [tasks_file, os.path.join(os.path.dirname(tasks_file), "tasks_archive.jsonl")]
+    try:
+        with open(paths[0], "r", encoding="utf-8") as f:
+            for t in json.load(f):
+                out.setdefault(t.get("text"), t.get("id"))
+    except Exception:
+        pass
+    try:
+        with open(paths[1], "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    t = json.loads(line)
+                    out.setdefault(t.get("text"), t.get("id"))
+                except ValueError:
+                    continue
+    except OSError:
+        pass
+    return out
+
+
+def migrate_time_log(path, tasks_file=None):
+    """
+    Rewrite a legacy (plain array) log as schema 2. Keeps the original as
+    <name>.v1.bak. Returns (migrated, rejected) counts; rejected includes
+    undecodable spans of a damaged file.
+    """
+    tasks_file = tasks_file or os.path.join(os.path.dirname(os.path.abspath(path)), "tasks.json")
+    by_text = _task_by_text(tasks_file)
+    base = os.path.splitext(path)[0]
+    tmp = path + ".tmp"
+    migrated, rejected, damaged = 0, [], []
+    with open(path, "r", encoding="utf-8") as src, open(tmp, "w", encoding="utf-8") as dst:
+        dst.write('{\n  "schema": %d,\n  "entries": [' % LOG_SCHEMA)
+        for raw in iter_json_array(src, on_damage=damaged.append):
+            e = normalize_entry(raw, by_text)
+            if e is None:
+                rejected.append(raw)
+                continue
+            dst.write(("\n" if not migrated else ",\n") + json.dumps(e, ensure_ascii=False, indent=2))
+            migrated += 1
+        dst.write("\n  ]\n}\n")
+    if rejected:
+        with open(base + ".rejected.json", "w", encoding="utf-8") as f:
+            json.dump(rejected, f, ensure_ascii=False, indent=2)
+    os.replace(path, base + ".v1.bak")
+    os.replace(tmp, path)
+    return migrated, len(rejected) + len(damaged)
+
+
+if __name__ == "__main__":
+    import sys
+    import utils
+
+    target = sys.argv[1] if len(sys.argv) > 1 else utils.TIME_LOG
+    if not is_legacy(target):
+        print("Лог уже в новом формате.")
+    else:
+        n, bad = migrate_time_log(target)
+        print(f"Перенесено записей: {n}, отклонено: {bad}")
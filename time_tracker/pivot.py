@@ -0,0 +1,73 @@
+# time_tracker/pivot.py
+"""
+Group-by engine for reports:
+- rollup(entries) -> {(project, section, task, date): seconds}, one pass over the log rows
+- pivot(rollup, dims) -> nested {key: [seconds, children]} with subtotals on every level
+Any combination of DIMENSIONS is answered from the day-level rollup,
+so changing dimensions never re-scans the log.
+"""
+
+DIMENSIONS = {
+    "project": "Проект",
+    "section": "Раздел",
+    "task": "Задача",
+    "day": "День",
+    "week": "Неделя",
+    "month": "Месяц",
+}
+# chronological dimensions are sorted by key, the rest by time spent
+CHRONO = {"day", "week", "month"}
+
+
+def _key(dim, project, section, task, day):
+    if dim == "project":
+        return project
+    if dim == "section":
+        return section
+    if dim == "task":
+        return task
+    if dim == "day":
+        return day.strftime("%Y-%m-%d (%a)")
+    if dim == "week":
+        year, week, _ = day.isocalendar()
+        return f"{year}-W{week:02d}"
+    if dim == "month":
+        return day.strftime("%Y-%m")
+    raise ValueError(f"unknown dimension: {dim}")
+
+
+def rollup(entries):
+    """
+    entries: normalized rows with project, section, task_text, start (datetime), duration_seconds.
+    """
+    out = {}
+    for e in entries:
+        key = (e.get("project") or "—", e.get("section") or "—", e.get("task_text") or "—", e["start"].date())
+        out[key] = out.get(key, 0) + e["duration_seconds"]
+    return out
+
+
+def pivot(roll, dims):
+    tree = {}
+    for (project, section, task, day), secs in roll.items():
+        node = tree
+        for dim in dims:
+            slot = node.setdefault(_key(dim, project, section, task, day), [0, {}])
+            slot[0] += secs
+            node = slot[1]
+    return tree
+
+
+def flatten(tree, dims, depth=0):
+    """
+    Yield (depth, key, seconds) in display order: parents before children.
+    """
+    if depth >= len(dims):
+        return
+    if dims[depth] in CHRONO:
+        items = sorted(tree.items())
+    else:
+        items = sorted(tree.items(), key=lambda kv: (-kv[1][0], kv[0]))
+    for key, (secs, children) in items:
+        yield depth, key, secs
+        yield from flatten(children, dims, depth + 1)
@@ -0,0 +1,250 @@
+# time_tracker/retention.py
+"""
+Retention / quota sweeper for the screenshots tree:
+- max age (days) for screenshots and monthly archives
+- max total size of the whole tree
+- per-project size limits
+Runs in a background thread, scans directories with os.scandir and keeps a
+size ledger (screenshots/ledger.json) so only directories whose mtime changed
+are re-read. Sleeps between I/O batches so captures are never delayed.
+"""
+
+import os, json, threading, datetime, re, time
+
+LEDGER_FILE = "ledger.json"
+ARCHIVES = "archives"
+MEDIA_EXT = (".jpg", ".jpeg", ".png", ".webp", ".zip")
+
+_DAY_RE = re.compile(r"^(\d{4})-(\d{2})-(\d{2})_")
+_MONTH_RE = re.compile(r"^(\d{4})-(\d{2})\.zip$")
+
+
+def retention_policy(settings):
+    """
+    Policy dict from settings.json keys:
+      retention_max_age_days      - 0 = keep forever
+      retention_max_total_mb      - 0 = no limit
+      retention_project_limits_mb - {"Проект": MB, ...}
+    """
+    mb = 1024 * 1024
+    return {
+        "max_age_days": int(settings.get("retention_max_age_days", 0) or 0),
+        "max_total_bytes": int(float(settings.get("retention_max_total_mb", 0) or 0) * mb),
+        "project_limits": {p: int(float(v) * mb) for p, v in
+                           (settings.get("retention_project_limits_mb") or {}).items() if v},
+    }
+
+
+def file_date(name, mtime):
+    """
+    Date a file belongs to: from YYYY-MM-DD_... screenshot names, the last
+    day of the month for YYYY-MM.zip archives, else the mtime.
+    """
+    m = _DAY_RE.match(name)
+    if m:
+        try:
+            return datetime.date(*map(int, m.groups()))
+        except ValueError:
+            pass
+    m = _MONTH_RE.match(name)
+    if m:
+        y, mo = map(int, m.groups())
+        nxt = datetime.date(y + (mo == 12), mo % 12 + 1, 1)
+        return nxt - datetime.timedelta(days=1)
+    return datetime.date.fromtimestamp(mtime)
+
+
+class RetentionSweeper:
+    def __init__(self, base_dir, policy, interval_seconds=600, batch=200, io_pause=0.05):
+        self.base_dir = os.path.abspath(base_dir)
+        self.policy = policy
+        self.interval_seconds = interval_seconds
+        self.batch = batch          # directory entries / deletions per I/O burst
+        self.io_pause = io_pause    # seconds to sleep between bursts
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.ledger = self._load_ledger()
+
+    # --- ledger ---
+    def _ledger_path(self):
+        return os.path.join(self.base_dir, LEDGER_FILE)
+
+    def _load_ledger(self):
+        try:
+            with open(self._ledger_path(), "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data.get("dirs"), dict):
+                return data
+        except Exception:
+            pass
+        # dirs: {rel_dir: {"mtime": float, "files": {name: [size, mtime]}}}
+        return {"dirs": {}}
+
+    def _save_ledger(self):
+        tmp = self._ledger_path() + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.ledger, f, ensure_ascii=False)
+        os.replace(tmp, self._ledger_path())
+
+    def total_bytes(self, rel_dir=None):
+        with self._lock:
+            dirs = self.ledger["dirs"]
+            items = [dirs.get(rel_dir, {})] if rel_dir else dirs.values()
+            return sum(sz for d in items for sz, _ in d.get("files", {}).values())
+
+    def note_added(self, path, nbytes):
+        """
+        Called by ScreenshotManager after a capture so the directory does not
+        have to be re-read on the next sweep.
+        """
+        folder, name = os.path.split(os.path.abspath(path))
+        rel = os.path.relpath(folder, self.base_dir)
+        with self._lock:
+            d = self.ledger["dirs"].get(rel)
+            if d is None:
+                return  # unknown dir, next sweep will scan it
+            d["files"][name] = [int(nbytes), time.time()]
+            try:
+                d["mtime"] = os.stat(folder).st_mtime
+            except OSError:
+                pass
+
+    # --- thread ---
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        # first sweep a little after startup, then every interval
+        wait = 30
+        while not self._stop.wait(wait):
+            wait = self.interval_seconds
+            try:
+                self.sweep()
+            except Exception as e:
+                print("Retention error:", e)
+
+    def _pause(self, counter):
+        if counter % self.batch == 0:
+            self._stop.wait(self.io_pause)
+
+    # --- work ---
+    def refresh_ledger(self):
+        """
+        Re-read only directories whose mtime differs from the ledger.
+        """
+        if not os.path.isdir(self.base_dir):
+            return
+        seen = set()
+        n = 0
+        with os.scandir(self.base_dir) as it:
+            subdirs = [e for e in it if e.is_dir(follow_symlinks=False)]
+        for d in subdirs:
+            seen.add(d.name)
+            try:
+                mtime = d.stat().st_mtime
+            except OSError:
+                continue
+            with self._lock:
+                known = self.ledger["dirs"].get(d.name)
+            if known and known.get("mtime") == mtime:
+                continue
+            files = {}
+            with os.scandir(d.path) as it:
+                for e in it:
+                    n += 1
+                    self._pause(n)
+                    if not e.name.lower().endswith(MEDIA_EXT) or not e.is_file(follow_symlinks=False):
+                        continue
+                    try:
+                        st = e.stat()
+                    except OSError:
+                        continue
+                    files[e.name] = [st.st_size, st.st_mtime]
+            with self._lock:
+                self.ledger["dirs"][d.name] = {"mtime": mtime, "files": files}
+        with self._lock:
+            for gone in set(self.ledger["dirs"]) - seen:
+                del self.ledger["dirs"][gone]
+
+    def _candidates(self):
+        # [(date, mtime, rel_dir, name, size)] oldest first
+        out = []
+        with self._lock:
+            for rel, d in self.ledger["dirs"].items():
+                for name, (size, mtime) in d["files"].items():
+                    out.append((file_date(name, mtime), mtime, rel, name, size))
+        out.sort()
+        return out
+
+    def plan(self, today=None):
+        """
+        Files that violate the policy, as [(rel_dir, name, size)].
+        Pure ledger computation, no I/O.
+        """
+        today = today or datetime.date.today()
+        pol = self.policy
+        files = self._candidates()
+        doomed = set()
+
+        if pol["max_age_days"] > 0:
+            cutoff = today - datetime.timedelta(days=pol["max_age_days"])
+            for day, _, rel, name, size in files:
+                if day < cutoff:
+                    doomed.add((rel, name))
+
+        for proj, limit in pol["project_limits"].items():
+            own = [f for f in files if f[2] == proj and (f[2], f[3]) not in doomed]
+            used = sum(f[4] for f in own)
+            for _, _, rel, name, size in own:
+                if used <= limit:
+                    break
+                doomed.add((rel, name)); used -= size
+
+        if pol["max_total_bytes"] > 0:
+            left = [f for f in files if (f[2], f[3]) not in doomed]
+            used = sum(f[4] for f in left)
+            for _, _, rel, name, size in left:
+                if used <= pol["max_total_bytes"]:
+                    break
+                doomed.add((rel, name)); used -= size
+
+        return [(f[2], f[3], f[4]) for f in files if (f[2], f[3]) in doomed]
+
+    def sweep(self):
+        """
+        One incremental pass: refresh changed directories, delete what the
+        policy rejects (throttled), persist the ledger. Returns bytes freed.
+        """
+        self.refresh_ledger()
+        freed = 0
+        for n, (rel, name, size) in enumerate(self.plan(), 1):
+            if self._stop.is_set():
+                break
+            folder = os.path.join(self.base_dir, rel)
+            try:
+                os.remove(os.path.join(folder, name))
+                freed += size
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print("Retention delete error:", e)
+                continue
+            with self._lock:
+                d = self.ledger["dirs"].get(rel)
+                if d:
+                    d["files"].pop(name, None)
+                    try:
+                        d["mtime"] = os.stat(folder).st_mtime
+                    except OSError:
+                        pass
+            self._pause(n)
+        self._save_ledger()
+        return freed
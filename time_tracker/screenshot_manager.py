@@ -4,31 +4,113 @@ Screenshot manager:
 - save screenshots as JPEG to reduce size
 - autoscreen thread
 - monthly archive of previous month into ZIP (runs automatically if day >= 10 and archive not exists)
+- per-day byte budget: downscale factor and quality adapt to stay within it;
+  once it is used up automatic captures are skipped until the next day
+  (a manual one is still taken)
+- optional WebP (if Pillow supports it) and active-monitor-only capture
+- bytes per capture / per day are kept in screenshots/usage.json
+- Pillow is imported and the archive check runs on first use, not at startup
 """
 
-import os, threading, datetime, time, zipfile
+import os, threading, datetime, time, zipfile, json, re, subprocess
 from pathlib import Path
 
-try:
-    from PIL import ImageGrab, Image
-    PIL_AVAILABLE = True
-except Exception:
-    PIL_AVAILABLE = False
+_pil = None  # (ImageGrab, Image) once imported, False if Pillow is missing
+
+
+def _load_pil():
+    global _pil
+    if _pil is None:
+        try:
+            from PIL import ImageGrab, Image
+            _pil = (ImageGrab, Image)
+        except Exception:
+            _pil = False
+    return _pil or None
+
+
+def pil_available():
+    return _load_pil() is not None
+
+# quality / downscale steps used by the budget controller, best first
+QUALITY_STEPS = (75, 65, 55, 45, 35)
+SCALE_STEPS = (1.0, 0.85, 0.7, 0.55, 0.4, 0.3)
+USAGE_FILE = "usage.json"
+USAGE_KEEP_DAYS = 62
+POINTER_POLL_MS = 2000  # active-monitor mode: how often the Tk thread caches the pointer
+
+def webp_supported():
+    if not pil_available():
+        return False
+    try:
+        from PIL import features
+        return bool(features.check("webp"))
+    except Exception:
+        return False
+
+def list_monitors():
+    """
+    Monitor geometries [(x, y, w, h), ...] from `xrandr --listmonitors`, [] if unknown.
+    """
+    try:
+        out = subprocess.run(["xrandr", "--listmonitors"], capture_output=True, text=True, timeout=3).stdout
+    except Exception:
+        return []
+    mons = []
+    for m in re.finditer(r"(\d+)/\d+x(\d+)/\d+\+(\d+)\+(\d+)", out):
+        w, h, x, y = map(int, m.groups())
+        mons.append((x, y, w, h))
+    return mons
 
 class ScreenshotManager:
     def __init__(self, base_dir="screenshots", get_project_callback=None, toast_master=None,
-                 autoscreen_enabled=True, interval_minutes=15, jpg_quality=75):
+                 autoscreen_enabled=True, interval_minutes=15, jpg_quality=75,
+                 daily_budget_mb=0, image_format="jpeg", active_monitor_only=False):
         self.base_dir = os.path.abspath(base_dir)
         self.get_project = get_project_callback or (lambda: "Общее")
         self.toast_master = toast_master
         self.autoscreen_enabled = autoscreen_enabled
         self.interval_minutes = int(interval_minutes)
         self.jpg_quality = int(jpg_quality)
+        self.daily_budget_mb = float(daily_budget_mb or 0)
+        self.image_format = image_format
+        self.active_monitor_only = bool(active_monitor_only)
+        # budget controller state: indexes into SCALE_STEPS / QUALITY_STEPS
+        self._scale_idx = 0
+        self._quality_idx = 0
+        self._monitors = None
+        # last pointer position, read on the Tk thread for the capture thread
+        self._pointer = None
+        self._pointer_after = None
+        # optional callback(path, nbytes) after each saved capture (retention ledger)
+        self.on_saved = None
+        self._usage_lock = threading.Lock()
         self._thread = None
         self._stop = threading.Event()
         os.makedirs(self.base_dir, exist_ok=True)
-        # run archive check on init in background thread (non-blocking)
-        threading.Thread(target=self._maybe_archive_previous_month, daemon=True).start()
+        self.usage = self._load_usage()
+        self._archive_checked = False
+        self._budget_noted = None  # day the "budget used up" notice was given
+
+    def set_base_dir(self, base_dir):
+        """
+        Switch to another screenshot root (workspace change): autoscreen is
+        stopped (the caller restarts it with the new settings), the usage ledger
+        and the archive check follow the new root.
+        """
+        self._halt()
+        self.base_dir = os.path.abspath(base_dir)
+        os.makedirs(self.base_dir, exist_ok=True)
+        with self._usage_lock:
+            self.usage = self._load_usage()
+        self._scale_idx = self._quality_idx = 0
+        self._archive_checked = False
+
+    def _archive_check_once(self):
+        # monthly archive check: in a background thread, on the first capture / autoscreen start
+        if not self._archive_checked:
+            self._archive_checked = True
+            threading.Thread(target=self._maybe_archive_previous_month, daemon=True).start()
 
     def _toast(self, text, duration=3000):
         # weak coupling: if toast_master provided, try to show a small popover
@@ -55,9 +137,16 @@ class ScreenshotManager:
         # fallback: print
         print("Toast:", text)
 
-    def update_settings(self, enabled: bool, interval_minutes: int):
+    def update_settings(self, enabled: bool, interval_minutes: int, daily_budget_mb=None,
+                        image_format=None, active_monitor_only=None):
         self.autoscreen_enabled = bool(enabled)
         self.interval_minutes = int(interval_minutes)
+        if daily_budget_mb is not None:
+            self.daily_budget_mb = float(daily_budget_mb or 0)
+        if image_format is not None:
+            self.image_format = image_format
+        if active_monitor_only is not None:
+            self.active_monitor_only = bool(active_monitor_only)
         if self.autoscreen_enabled:
             self.start_autoscreen()
         else:
@@ -68,47 +157,203 @@ class ScreenshotManager:
             self.start_autoscreen()
 
     def start_autoscreen(self):
-        if not PIL_AVAILABLE:
+        if not pil_available():
             self._toast("Pillow не установлен — скриншоты недоступны.", duration=4000)
             return
         if self._thread and self._thread.is_alive():
+            self._watch_pointer()
             return
-        self._stop.clear()
-        self._thread = threading.Thread(target=self._autoscreen_loop, daemon=True)
+        self._archive_check_once()
+        # a fresh event per thread: a stopped loop still finishing a capture keeps its own
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._autoscreen_loop, args=(self._stop,), daemon=True)
         self._thread.start()
+        self._watch_pointer()
         self._toast("Автоскриншоты включены.", duration=1500)
 
     def stop_autoscreen(self):
-        self._stop.set()
+        self._halt()
         self._toast("Автоскриншоты остановлены.", duration=1200)
 
-    def _autoscreen_loop(self):
+    def _halt(self):
+        # forget the thread right away so the next start_autoscreen starts a new one
+        self._stop.set()
+        self._thread = None
+
+    def _autoscreen_loop(self, stop):
         interval = max(1, int(self.interval_minutes)) * 60
-        while not self._stop.wait(interval):
+        while not stop.wait(interval):
             try:
                 self.take_screenshot(auto=True)
             except Exception as e:
                 print("Autoscreen error:", e)
 
     def manual_screenshot(self):
+        self._read_pointer()
         return self.take_screenshot(auto=False)
 
+    # --- pointer cache: Tk may only be called from the thread that runs mainloop ---
+    def _read_pointer(self):
+        try:
+            self._pointer = self.toast_master.winfo_pointerxy() if self.toast_master else None
+        except Exception:
+            self._pointer = None
+
+    def _watch_pointer(self):
+        # called on the Tk thread; re-arms itself while autoscreen runs in active-monitor mode
+        if self._pointer_after is None and self.toast_master and self.active_monitor_only:
+            self._poll_pointer()
+
+    def _poll_pointer(self):
+        self._pointer_after = None
+        if self._stop.is_set() or not self.active_monitor_only:
+            return
+        self._read_pointer()
+        try:
+            self._pointer_after = self.toast_master.after(POINTER_POLL_MS, self._poll_pointer)
+        except Exception:
+            pass
+
+    # --- usage ledger ---
+    def _load_usage(self):
+        try:
+            with open(os.path.join(self.base_dir, USAGE_FILE), "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data, dict):
+                return data
+        except Exception:
+            pass
+        return {}
+
+    def _record_usage(self, nbytes):
+        day = datetime.date.today().isoformat()
+        with self._usage_lock:
+            rec = self.usage.setdefault(day, {"bytes": 0, "count": 0})
+            rec["bytes"] += int(nbytes)
+            rec["count"] += 1
+            for old in sorted(self.usage)[:-USAGE_KEEP_DAYS]:
+                del self.usage[old]
+            try:
+                with open(os.path.join(self.base_dir, USAGE_FILE), "w", encoding="utf-8") as f:
+                    json.dump(self.usage, f, ensure_ascii=False, indent=2)
+            except Exception as e:
+                print("Usage ledger error:", e)
+
+    def usage_stats(self, day=None):
+        """
+        (bytes_today, captures_today, avg_bytes_per_capture) for day (default today).
+        """
+        rec = self.usage.get(day or datetime.date.today().isoformat(), {})
+        b, n = rec.get("bytes", 0), rec.get("count", 0)
+        return b, n, (b // n if n else 0)
+
+    # --- budget controller ---
+    def _target_bytes(self):
+        """
+        Byte target for the next capture: what is left of today's budget
+        spread over the captures still expected today. None if no budget.
+        """
+        if self.daily_budget_mb <= 0:
+            return None
+        used, _, _ = self.usage_stats()
+        left = self.daily_budget_mb * 1024 * 1024 - used
+        now = datetime.datetime.now()
+        minutes_left = (24 * 60) - (now.hour * 60 + now.minute)
+        expected = max(1, minutes_left // max(1, int(self.interval_minutes)))
+        return max(0, left) / expected
+
+    def _budget_exhausted(self):
+        # the cutoff: today's bytes reached the budget (target 0), not merely a small target
+        target = self._target_bytes()
+        return target is not None and target <= 0
+
+    def _note_budget_exhausted(self):
+        day = datetime.date.today()
+        if self._budget_noted == day:
+            return
+        self._budget_noted = day
+        text = f"Дневной лимит скриншотов ({self.daily_budget_mb:g} МБ) исчерпан — автоскриншоты до завтра пропускаются."
+        if threading.current_thread() is threading.main_thread():
+            self._toast(text, duration=4000)
+        else:
+            print(text)  # Tk belongs to the main thread
+
+    def _adapt(self, nbytes, target):
+        # too big: lower quality first, then resolution; plenty of room: step back up
+        if target is None:
+            self._scale_idx = self._quality_idx = 0
+            return
+        if nbytes > target:
+            if self._quality_idx < len(QUALITY_STEPS) - 1:
+                self._quality_idx += 1
+            elif self._scale_idx < len(SCALE_STEPS) - 1:
+                self._scale_idx += 1
+        elif nbytes * 1.6 < target:
+            if self._scale_idx > 0:
+                self._scale_idx -= 1
+            elif self._quality_idx > 0:
+                self._quality_idx -= 1
+
+    def _capture_bbox(self):
+        if not self.active_monitor_only:
+            return None
+        if self._monitors is None:
+            self._monitors = list_monitors()
+        if len(self._monitors) < 2:
+            return None
+        if not self._pointer:
+            return None
+        px, py = self._pointer
+        for x, y, w, h in self._monitors:
+            if x <= px < x + w and y <= py < y + h:
+                return (x, y, x + w, y + h)
+        return None
+
+    def current_format(self):
+        if self.image_format == "webp" and webp_supported():
+            return "WEBP", "webp"
+        return "JPEG", "jpg"
+
     def take_screenshot(self, auto=False):
-        if not PIL_AVAILABLE:
+        """
+        Capture the screen; returns the saved path, None if an automatic capture
+        was skipped because today's budget is used up.
+        """
+        pil = _load_pil()
+        if not pil:
             raise RuntimeError("Pillow не установлен")
-        ts = datetime.datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S") if False else datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        if auto and self._budget_exhausted():
+            self._note_budget_exhausted()
+            return None
+        ImageGrab, Image = pil
+        self._archive_check_once()
+        ts = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
         project = self.get_project() or "Общее"
         folder = os.path.join(self.base_dir, project)
         os.makedirs(folder, exist_ok=True)
-        # save as JPG to reduce size
-        filename = f"{ts}.jpg"
+        fmt, ext = self.current_format()
+        filename = f"{ts}.{ext}"
         path = os.path.join(folder, filename)
+        target = self._target_bytes()
         try:
-            img = ImageGrab.grab()
-            # ensure RGB for JPEG
+            bbox = self._capture_bbox()
+            img = ImageGrab.grab(bbox=bbox) if bbox else ImageGrab.grab()
+            # ensure RGB for JPEG/WebP
             if img.mode != "RGB":
                 img = img.convert("RGB")
-            img.save(path, "JPEG", quality=self.jpg_quality, optimize=True)
+            scale = SCALE_STEPS[self._scale_idx] if target is not None else 1.0
+            quality = QUALITY_STEPS[self._quality_idx] if target is not None else self.jpg_quality
+            if scale < 1.0:
+                img = img.resize((max(1, int(img.width * scale)), max(1, int(img.height * scale))), Image.LANCZOS)
+            if fmt == "WEBP":
+                img.save(path, "WEBP", quality=quality, method=4)
+            else:
+                img.save(path, "JPEG", quality=quality, optimize=True)
+            nbytes = os.path.getsize(path)
+            self._record_usage(nbytes)
+            self._adapt(nbytes, target)
+            if self.on_saved:
+                self.on_saved(path, nbytes)
             if not auto:
                 self._toast(f"Скриншот сохранён: {path}", duration=3000)
             return path
@@ -144,7 +389,7 @@ class ScreenshotManager:
             for fname in os.listdir(proj_path):
                 # expect filenames like YYYY-MM-DD_HH-MM-SS.jpg (saved as jpg)
                 try:
-                    if not fname.lower().endswith((".jpg", ".jpeg", ".png")):
+                    if not fname.lower().endswith((".jpg", ".jpeg", ".png", ".webp")):
                         continue
                     # parse date part
                     date_part = fname.split("_")[0]
@@ -0,0 +1,144 @@
+# time_tracker/search.py
+"""
+Full-text search over tasks with an in-memory inverted index:
+- tokens are casefolded words (Unicode \\w), "ё" folded to "е"
+- token -> set of ids, plus a sorted vocabulary for prefix lookups (bisect)
+- add()/remove() are incremental, add_many() builds in bulk with one sort of
+  the vocabulary; query() ANDs the terms, each term matches
+  as a prefix and optionally fuzzily (one edit or swap for terms of 4+ chars)
+"""
+
+import bisect, re
+
+_WORD = re.compile(r"\w+")
+
+
+def tokenize(text):
+    return _WORD.findall((text or "").casefold().replace("ё", "е"))
+
+
+def _within_one_edit(a, b):
+    # insert / delete / substitute one char, or swap two adjacent ones
+    la, lb = len(a), len(b)
+    if abs(la - lb) > 1:
+        return False
+    if la == lb:
+        diff = [k for k in range(la) if a[k] != b[k]]
+        if len(diff) == 2 and diff[1] == diff[0] + 1 and a[diff[0]] == b[diff[1]] and a[diff[1]] == b[diff[0]]:
+            return True
+    if la > lb:
+        a, b, la, lb = b, a, lb, la
+    i = j = edits = 0
+    while i < la and j < lb:
+        if a[i] == b[j]:
+            i += 1; j += 1
+            continue
+        edits += 1
+        if edits > 1:
+            return False
+        if la == lb:
+            i += 1
+        j += 1
+    return edits + (lb - j) + (la - i) <= 1
+
+
+class SearchIndex:
+    FIELDS = ("text", "note", "project", "section")
+
+    def __init__(self):
+        self._postings = {}   # token -> set(ids)
+        self._doc = {}        # id -> set(tokens)
+        self._vocab = []      # sorted tokens
+
+    def add(self, doc_id, *texts):
+        for tok in self._index(doc_id, texts):
+            bisect.insort(self._vocab, tok)
+
+    def add_many(self, docs):
+        """
+        add() for every (doc_id, texts) in docs; new tokens are sorted into the
+        vocabulary once instead of one insort each.
+        """
+        new = set()
+        for doc_id, texts in docs:
+            new.update(self._index(doc_id, texts))
+        new = [tok for tok in new if tok in self._postings]  # a re-added doc may have dropped some
+        if new:
+            self._vocab.extend(new)
+            self._vocab.sort()
+
+    def _index(self, doc_id, texts):
+        # postings of one document; returns its tokens that are new to the vocabulary
+        tokens = set()
+        for text in texts:
+            tokens.update(tokenize(text))
+        old = self._doc.get(doc_id)
+        if old is not None:
+            if old == tokens:
+                return ()
+            self.remove(doc_id)
+        self._doc[doc_id] = tokens
+        new = []
+        for tok in tokens:
+            ids = self._postings.get(tok)
+            if ids is None:
+                self._postings[tok] = {doc_id}
+                new.append(tok)
+            else:
+                ids.add(doc_id)
+        return new
+
+    def add_task(self, t):
+        self.add(t["id"], *(t.get(f, "") for f in self.FIELDS))
+
+    def add_tasks(self, tasks):
+        self.add_many((t["id"], [t.get(f, "") for f in self.FIELDS]) for t in tasks)
+
+    def extend(self, doc_id, text):
+        """
+        Add more words to an existing document (e.g. task_text from the time log).
+        """
+        old = self._doc.get(doc_id, set())
+        new = set(tokenize(text)) - old
+        if new:
+            self.add(doc_id, " ".join(old | new))
+
+    def remove(self, doc_id):
+        for tok in self._doc.pop(doc_id, ()):
+            ids = self._postings.get(tok)
+            if ids is None:
+                continue
+            ids.discard(doc_id)
+            if not ids:
+                del self._postings[tok]
+                i = bisect.bisect_left(self._vocab, tok)
+                if i < len(self._vocab) and self._vocab[i] == tok:
+                    del self._vocab[i]
+
+    def _term_ids(self, term, fuzzy):
+        out = set()
+        lo = bisect.bisect_left(self._vocab, term)
+        hi = bisect.bisect_left(self._vocab, term + "\U0010ffff")
+        for tok in self._vocab[lo:hi]:
+            out |= self._postings[tok]
+        if fuzzy and len(term) >= 4:
+            for tok in self._vocab:
+                # also accept a near miss of the term, or of a same-length prefix of a longer word
+                if _within_one_edit(term, tok) or (len(tok) > len(term) and _within_one_edit(term, tok[:len(term)])):
+                    out |= self._postings[tok]
+        return out
+
+    def query(self, text, fuzzy=False):
+        """
+        Set of ids matching every term of text; None for an empty query.
+        """
+        terms = tokenize(text)
+        if not terms:
+            return None
+        result = None
+        for term in sorted(set(terms), key=len, reverse=True):
+            ids = self._term_ids(term, fuzzy)
+            result = ids if result is None else result & ids
+            if not result:
+                return set()
+        return result
@@ -0,0 +1,41 @@
+# time_tracker/startup.py
+"""
+Startup phase timer for `python start.py --profile-startup`:
+- mark(name) closes the phase that began at the previous mark (or at import of this module)
+- report() prints every phase and the time to first paint to stderr
+Disabled, mark() / report() cost nothing.
+"""
+
+import sys, time
+
+_T0 = time.perf_counter()
+
+
+class StartupProfile:
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.phases = []    # (name, ms)
+        self._last = _T0
+        self.first_paint_ms = None
+
+    def mark(self, name):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.phases.append((name, (now - self._last) * 1000))
+        self._last = now
+
+    def first_paint(self):
+        if self.enabled and self.first_paint_ms is None:
+            self.mark("first paint")
+            self.first_paint_ms = (time.perf_counter() - _T0) * 1000
+
+    def report(self):
+        if not self.enabled:
+            return
+        width = max(len(n) for n, _ in self.phases) if self.phases else 10
+        lines = [f"{name:<{width}}  {ms:8.1f} ms" for name, ms in self.phases]
+        lines.append(f"{'total':<{width}}  {(self._last - _T0) * 1000:8.1f} ms")
+        if self.first_paint_ms is not None:
+            lines.append(f"{'to first paint':<{width}}  {self.first_paint_ms:8.1f} ms")
+        print("startup profile:\n  " + "\n  ".join(lines), file=sys.stderr)
@@ -0,0 +1,96 @@
+# time_tracker/suggest.py
+"""
+Prefix index for type-ahead (projects, sections, recent task texts):
+- names are kept in a sorted list of casefolded keys; a prefix query is two bisects
+- every word start of a name is indexed too ("кбк" finds "Братья КБК")
+- add()/remove() are incremental; add_many() builds from existing data with one sort
+- results are ranked by use count and recency
+"""
+
+import bisect, datetime
+
+
+def _day(value):
+    try:
+        return datetime.datetime.strptime(value or "", "%d.%m.%Y").date().toordinal()
+    except ValueError:
+        return 0
+
+
+class PrefixIndex:
+    def __init__(self):
+        self._keys = []       # sorted [(key, name)]
+        self._stats = {}      # name -> [count, last_used_ordinal]
+
+    @staticmethod
+    def _key_variants(name):
+        words = name.casefold().split()
+        return {" ".join(words[i:]) for i in range(len(words))} or {name.casefold()}
+
+    def _count(self, name, when):
+        # True if name is new (its keys still have to be indexed)
+        day = when if isinstance(when, int) else (_day(when) if when else datetime.date.today().toordinal())
+        st = self._stats.get(name)
+        if st:
+            st[0] += 1
+            st[1] = max(st[1], day)
+            return False
+        self._stats[name] = [1, day]
+        return True
+
+    def add(self, name, when=None):
+        """
+        Count one use of name. when: 'DD.MM.YYYY' or date ordinal, default today.
+        """
+        if name and self._count(name, when):
+            for k in self._key_variants(name):
+                bisect.insort(self._keys, (k, name))
+
+    def add_many(self, items):
+        """
+        add() for every (name, when) in items; the new keys are sorted in once
+        instead of one insort each.
+        """
+        new = []
+        for name, when in items:
+            if name and self._count(name, when):
+                new.extend((k, name) for k in self._key_variants(name))
+        if new:
+            self._keys.extend(new)
+            self._keys.sort()
+
+    def remove(self, name):
+        st = self._stats.get(name)
+        if not st:
+            return
+        st[0] -= 1
+        if st[0] > 0:
+            return
+        del self._stats[name]
+        for k in self._key_variants(name):
+            i = bisect.bisect_left(self._keys, (k, name))
+            if i < len(self._keys) and self._keys[i] == (k, name):
+                del self._keys[i]
+
+    def _score(self, name, today):
+        count, last = self._stats[name]
+        age = max(0, today - last) if last else 365
+        return count / (1.0 + age / 30.0)
+
+    def complete(self, prefix, limit=20):
+        """
+        Names having a word that starts with prefix, best first.
+        """
+        today = datetime.date.today().toordinal()
+        p = prefix.casefold().strip()
+        if not p:
+            names = self._stats.keys()
+        else:
+            lo = bisect.bisect_left(self._keys, (p,))
+            hi = bisect.bisect_left(self._keys, (p + "\U0010ffff",))
+            names = {name for _, name in self._keys[lo:hi]}
+        ranked = sorted(names, key=lambda n: (-self._score(n, today), n))
+        return ranked[:limit] if limit else ranked
+
+    def __len__(self):
+        return len(self._stats)
@@ -0,0 +1,75 @@
+# time_tracker/totals.py
+"""
+Per-task tracked time, kept in memory:
+- rebuild(log) once, then upsert(entry) on every own write (timer start/autosave/stop,
+  manual activity, import) - no log reads on refresh
+- records are keyed by (task_id, start) so re-saving the running session replaces
+  its previous contribution instead of adding to it
+- total / today / this-week seconds per task_id (time is counted on the start day)
+"""
+
+import datetime, threading
+
+from time_tracker import tracker
+
+
+class TaskTotals:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._records = {}   # (task_id, start) -> (seconds, date)
+        self._by_day = {}    # task_id -> {date: seconds}
+        self._total = {}     # task_id -> seconds
+
+    def rebuild(self, log):
+        with self._lock:
+            self._records.clear(); self._by_day.clear(); self._total.clear()
+            for e in log:
+                self._upsert(e)
+
+    def upsert(self, entry):
+        with self._lock:
+            self._upsert(entry)
+
+    def _upsert(self, e):
+        tid = e.get("task_id") if isinstance(e, dict) else None
+        if not tid:
+            return
+        s, en, _ = tracker.parse_range(e)
+        if not s:
+            return
+        dur = e.get("duration_seconds")
+        if dur is None:
+            dur = (en - s).total_seconds()
+        key = (tid, e.get("start") or e.get("timestamp"))
+        old = self._records.get(key)
+        if old:
+            self._add(tid, old[1], -old[0])
+        self._records[key] = (int(dur), s.date())
+        self._add(tid, s.date(), int(dur))
+
+    def discard(self, task_id, start):
+        """
+        Forget the record keyed (task_id, start), e.g. after its start was moved.
+        """
+        with self._lock:
+            old = self._records.pop((task_id, start), None)
+            if old:
+                self._add(task_id, old[1], -old[0])
+
+    def _add(self, tid, day, secs):
+        days = self._by_day.setdefault(tid, {})
+        days[day] = days.get(day, 0) + secs
+        self._total[tid] = self._total.get(tid, 0) + secs
+
+    def get(self, task_id, today=None):
+        """
+        (total, today, this_week) seconds for task_id.
+        """
+        today = today or datetime.date.today()
+        with self._lock:
+            days = self._by_day.get(task_id)
+            if not days:
+                return 0, 0, 0
+            monday = today - datetime.timedelta(days=today.weekday())
+            week = sum(days.get(monday + datetime.timedelta(days=i), 0) for i in range(7))
+            return self._total.get(task_id, 0), days.get(today, 0), week
@@ -1,67 +1,164 @@
 # time_tracker/tracker.py
 """
 Utilities for time log management:
+- read_time_log / write_time_log (versioned file format, migrates legacy logs once,
+  salvages a damaged file instead of losing it)
+- iter_time_log (streamed, one entry at a time)
+- scan_time_log (streamed and read-only, for logs owned by another workspace)
 - load_time_log
-- append_time_log
+- append_time_log / save_time_log / update_time_log_entry (one record, not the whole log)
+- log_version() -> token that changes on every write
 - parse_range (for overlap detection)
 - check_overlaps(existing_list, start_dt, end_dt) -> list of overlaps
+- sweep_overlaps(intervals) -> overlapping pairs in O(n log n + k)
+- merge_batch(existing_list, batch) -> (accepted, conflicts) for bulk import
+- find_log_overlaps(entries) -> every overlapping pair of the whole log
+- repair_overlaps(entries, pairs, action) -> trim / merge / delete in memory
+- union_seconds(intervals) -> total without double counting, removed idle time excluded
+- removed_seconds(entry, start, end) -> time already taken off the entry's duration
 """
 
-import json, os, datetime
+import json, os, datetime, heapq
 
-TIME_LOG = os.path.join(os.path.dirname(__file__), "..", "time_log.json")
-# normalize path
-TIME_LOG = os.path.normpath(TIME_LOG)
+import utils
+from time_tracker.client import rpc_or_local
+from time_tracker.migrate import LOG_SCHEMA, is_legacy, migrate_time_log
+from time_tracker.jsonstream import iter_log_entries, load_salvaged
 
-def load_time_log():
-    if os.path.exists(TIME_LOG):
-        with open(TIME_LOG, "r", encoding="utf-8") as f:
-            try:
-                return json.load(f)
-            except Exception:
-                return []
-    return []
+ENTRY_KEYS = ("start", "end", "duration_seconds")  # a salvaged entry without them is dropped
+
+
+def read_time_log(path=None):
+    """
+    Entries of the log. A legacy (schema 1, bare array) file is migrated once
+    in place; after that every entry has start/end/duration_seconds.
+    A damaged file (e.g. cut short by a crash) is salvaged: complete entries are
+    kept, the unreadable part goes to <name>.corrupt-<time> and the file is
+    rewritten from what was read. Raises on an unreadable file / unknown schema.
+    """
+    path = path or utils.TIME_LOG
+    if not os.path.exists(path):
+        return []
+    if is_legacy(path):
+        migrate_time_log(path)
+    return load_salvaged(path, lambda f, on_damage: iter_log_entries(f, on_damage=on_damage, schema=LOG_SCHEMA,
+                                                                      required=ENTRY_KEYS),
+                         lambda entries: write_time_log(entries, path))
+
+def iter_time_log(path=None):
+    """
+    Entries one at a time, without holding the whole file in memory.
+    If the file turns out damaged it is salvaged as in read_time_log once the
+    stream ends.
+    """
+    path = path or utils.TIME_LOG
+    if not os.path.exists(path):
+        return
+    if is_legacy(path):
+        migrate_time_log(path)
+    damage = []
+    with open(path, "r", encoding="utf-8") as f:
+        yield from iter_log_entries(f, on_damage=damage.append, schema=LOG_SCHEMA, required=ENTRY_KEYS)
+    if damage:
+        read_time_log(path)
+
+def scan_time_log(path, on_damage):
+    """
+    Entries of a log this process does not own (another workspace's), streamed
+    and never written: a legacy file yields nothing, a damaged one what is
+    readable; both are reported to on_damage instead of migrated / salvaged.
+    """
+    if not os.path.exists(path):
+        return
+    if is_legacy(path):
+        on_damage(None)
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        yield from iter_log_entries(f, on_damage=on_damage, schema=LOG_SCHEMA, required=ENTRY_KEYS)
+
+def write_time_log(data, path=None):
+    # write a temp file and swap it in: a crash mid-dump leaves the old log intact
+    path = path or utils.TIME_LOG
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"schema": LOG_SCHEMA, "entries": data}, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+def load_time_log(strict=False):
+    """
+    Entries of the log, [] if it cannot be read. Callers that write the result
+    back pass strict=True so a read error propagates instead of becoming an
+    empty log that overwrites the file.
+    """
+    try:
+        return rpc_or_local("log.list", read_time_log)
+    except Exception:
+        if strict:
+            raise
+        return []
 
 def append_time_log(entry):
-    data = []
-    if os.path.exists(TIME_LOG):
+    def local():
+        data = read_time_log()  # salvages a damaged file; other errors must not become []
+        data.append(entry)
+        write_time_log(data)
+    rpc_or_local("log.append", local, entry=entry)
+
+def find_entry(entries, task_id, start):
+    # newest first: the record being updated is almost always at the end
+    return next((r for r in reversed(entries) if r.get("task_id") == task_id and r.get("start") == start), None)
+
+def update_time_log_entry(task_id, start, fields, defaults=None):
+    """
+    Set fields on the entry identified by (task_id, start); "start" may be among
+    them. With defaults, a missing entry is appended as {task_id, start, **defaults,
+    **fields}. Returns the stored entry, None if there was nothing to update.
+    Through the daemon only this one record travels.
+    """
+    def local():
+        data = read_time_log()
+        rec = find_entry(data, task_id, start)
+        if rec is None:
+            if defaults is None:
+                return None
+            rec = {"task_id": task_id, "start": start, **defaults}
+            data.append(rec)
+        rec.update(fields)
+        write_time_log(data)
+        return rec
+    return rpc_or_local("log.update", local, task_id=task_id, start=start, fields=fields, defaults=defaults)
+
+def log_version(path=None):
+    """
+    Cheap token that changes on every write of the log: the daemon's write
+    counter when it runs, else (mtime_ns, size) of the file.
+    """
+    def local():
         try:
-            with open(TIME_LOG, "r", encoding="utf-8") as f:
-                data = json.load(f)
-        except:
-            data = []
-    data.append(entry)
-    with open(TIME_LOG, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+            st = os.stat(path or utils.TIME_LOG)
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+    if path:
+        return local()
+    version = rpc_or_local("log.version", local)
+    return tuple(version) if isinstance(version, list) else version
+
+def save_time_log(data):
+    rpc_or_local("log.replace", lambda: write_time_log(data), entries=data)
 
 def parse_range(e):
     """
-    Return (start_dt, end_dt, label) where possible, else (None, None, None).
-    Handles different historical formats:
-      - {'start': iso, 'end': iso, ...}
-      - {'timestamp': 'YYYY-MM-DD HH:MM:SS', 'seconds': N}
+    Return (start_dt, end_dt, label) where possible, else (None, None, label).
+    Entries are schema 2 (see time_tracker/migrate.py): ISO 'start' and 'end'.
     """
     if not isinstance(e, dict):
         return (None, None, None)
     label = e.get("task_text") or e.get("task_id") or "?"
-    if e.get("start") and e.get("end"):
-        try:
-            s = datetime.datetime.fromisoformat(e["start"])
-            en = datetime.datetime.fromisoformat(e["end"])
-            return (s, en, label)
-        except:
-            pass
-    if e.get("timestamp") and e.get("seconds") is not None:
-        try:
-            ts = datetime.datetime.strptime(e["timestamp"], "%Y-%m-%d %H:%M:%S")
-            sec = int(e.get("seconds", 0))
-            # assume timestamp is end time
-            en = ts
-            s = ts - datetime.timedelta(seconds=sec)
-            return (s, en, label)
-        except:
-            pass
-    return (None, None, label)
+    try:
+        return (datetime.datetime.fromisoformat(e["start"]), datetime.datetime.fromisoformat(e["end"]), label)
+    except (KeyError, TypeError, ValueError):
+        return (None, None, label)
 
 def check_overlaps(existing_entries, start_dt, end_dt):
     """
@@ -79,3 +176,166 @@ def check_overlaps(existing_entries, start_dt, end_dt):
             out.append((s_ex, e_ex, label))
     return out
 
+
+def sweep_overlaps(intervals):
+    """
+    intervals: iterable of (start_dt, end_dt, key)
+    Yields ((s1, e1, key1), (s2, e2, key2)) for every pair of intersecting intervals,
+    the first item of the pair being the one that started earlier.
+    Sweep line over interval starts with a min-heap of active ends: O(n log n + k).
+    """
+    items = sorted((iv for iv in intervals if iv[0] and iv[1]), key=lambda iv: (iv[0], iv[1]))
+    active = []  # heap of (end_dt, seq, interval)
+    for seq, iv in enumerate(items):
+        s, en, _ = iv
+        while active and active[0][0] <= s:
+            heapq.heappop(active)
+        for _, _, other in active:
+            yield (other, iv)
+        heapq.heappush(active, (en, seq, iv))
+
+def merge_batch(existing_entries, batch):
+    """
+    Check a batch of new entries (already normalized, with ISO 'start'/'end')
+    against the existing log and against each other in one sweep.
+    Returns (accepted, conflicts):
+      accepted  - list of batch entries that can be written
+      conflicts - list of (entry, [(s_ex, e_ex, label), ...]) for rejected ones
+    Earlier batch entries win over later ones that overlap them.
+    """
+    intervals = []
+    for e in existing_entries:
+        s, en, label = parse_range(e)
+        if s and en:
+            intervals.append((s, en, ("log", label)))
+    for i, e in enumerate(batch):
+        s, en, _ = parse_range(e)
+        intervals.append((s, en, ("new", i)))
+
+    # pass 1: batch vs log
+    clashes = {}
+    for a, b in sweep_overlaps(intervals):
+        if a[2][0] == b[2][0]:
+            continue
+        new, old = (a, b) if a[2][0] == "new" else (b, a)
+        clashes.setdefault(new[2][1], []).append((old[0], old[1], old[2][1]))
+
+    # pass 2: inside the batch, greedy by start time
+    accepted, conflicts = [], []
+    last = None
+    ordered = sorted(((s, en, i) for s, en, (src, i) in intervals if src == "new"), key=lambda iv: (iv[0], iv[1]))
+    for s, en, i in ordered:
+        entry = batch[i]
+        if i in clashes:
+            conflicts.append((entry, clashes[i]))
+            continue
+        if last and s < last[1]:
+            label = last[2].get("task_text") or last[2].get("task_id") or "?"
+            conflicts.append((entry, [(last[0], last[1], label)]))
+            continue
+        accepted.append(entry)
+        last = (s, en, entry)
+    return accepted, conflicts
+
+def find_log_overlaps(entries):
+    """
+    Audit the whole log. Returns list of (i, j, ov_start, ov_end) where i and j are
+    indexes in entries, entry i starts first, and [ov_start, ov_end) is the shared time.
+    Sorted by overlap start.
+    """
+    intervals = []
+    for idx, e in enumerate(entries):
+        s, en, _ = parse_range(e)
+        if s and en and en > s:
+            intervals.append((s, en, idx))
+    out = []
+    for a, b in sweep_overlaps(intervals):
+        out.append((a[2], b[2], max(a[0], b[0]), min(a[1], b[1])))
+    out.sort(key=lambda p: (p[2], p[0], p[1]))
+    return out
+
+def removed_seconds(e, s, en):
+    """
+    Wall time of s..en already taken off the entry's duration (e.g. trimmed idle time).
+    """
+    dur = e.get("duration_seconds")
+    if dur is None:
+        return 0
+    return max(0, int((en - s).total_seconds()) - int(dur))
+
+def _set_range(e, s, en, gap=None):
+    if gap is None:
+        # where the removed time lay is unknown: the new span keeps its share of it
+        s0, en0, _ = parse_range(e)
+        span = (en0 - s0).total_seconds()
+        gap = removed_seconds(e, s0, en0)
+        gap = int(round(gap * (en - s).total_seconds() / span)) if span > 0 else 0
+    e["start"] = s.isoformat()
+    e["end"] = en.isoformat()
+    e["duration_seconds"] = max(0, int((en - s).total_seconds()) - gap)
+
+def repair_overlaps(entries, pairs, action):
+    """
+    Fix overlapping pairs (i, j, ...) as returned by find_log_overlaps, in place.
+    action:
+      'trim'   - the later entry starts where the earlier one ends (dropped if fully covered)
+      'merge'  - the earlier entry is extended to cover both, the later one is dropped
+      'delete' - the later entry is dropped
+    Pairs are re-checked against current values, so chains are handled correctly;
+    a merged entry that now reaches further entries is merged with them too.
+    Time already taken off an entry's duration (end - start > duration) stays off;
+    a trimmed entry keeps the share of it that falls on its remaining span.
+    Returns a new list without the dropped entries (caller writes it once).
+    """
+    dropped, grown = set(), set()
+    for i, j, *_ in sorted(pairs, key=lambda p: (p[2], p[0], p[1])):
+        if i in dropped or j in dropped:
+            continue
+        s1, e1, _ = parse_range(entries[i])
+        s2, e2, _ = parse_range(entries[j])
+        if not (s1 and s2 and e1 and e2) or not (s1 < e2 and s2 < e1):
+            continue
+        if (s2, e2) < (s1, e1):
+            i, j, s1, e1, s2, e2 = j, i, s2, e2, s1, e1
+        if action == "delete":
+            dropped.add(j)
+        elif action == "merge":
+            gap = removed_seconds(entries[i], s1, e1) + removed_seconds(entries[j], s2, e2)
+            _set_range(entries[i], s1, max(e1, e2), gap)
+            dropped.add(j)
+            grown.add(i)
+        elif action == "trim":
+            if e2 <= e1:
+                dropped.add(j)
+            else:
+                _set_range(entries[j], e1, e2)
+        else:
+            raise ValueError(f"unknown action: {action}")
+    out = [e for idx, e in enumerate(entries) if idx not in dropped]
+    if grown:
+        grown_ids = {id(entries[i]) for i in grown if i not in dropped}
+        more = [p for p in find_log_overlaps(out) if id(out[p[0]]) in grown_ids or id(out[p[1]]) in grown_ids]
+        if more:
+            return repair_overlaps(out, more, action)  # each round drops an entry: terminates
+    return out
+
+def union_seconds(intervals):
+    """
+    intervals: iterable of (start_dt, end_dt) or (start_dt, end_dt, removed_seconds).
+    Returns total seconds covered, overlapping time counted once, minus the time
+    removed from each interval (trimmed idle time is not worked time, so the
+    result never exceeds the sum of durations).
+    """
+    intervals = sorted(iv for iv in intervals if iv[0] and iv[1])
+    total = -sum(iv[2] for iv in intervals if len(iv) > 2)
+    cur_s = cur_e = None
+    for s, en, *_ in intervals:
+        if cur_e is None or s > cur_e:
+            if cur_e is not None:
+                total += (cur_e - cur_s).total_seconds()
+            cur_s, cur_e = s, en
+        elif en > cur_e:
+            cur_e = en
+    if cur_e is not None:
+        total += (cur_e - cur_s).total_seconds()
+    return max(0, int(total))
@@ -0,0 +1,86 @@
+# time_tracker/watchdog.py
+"""
+Tk main-loop stall watchdog (opt-in diagnostics: "stall_watchdog" in settings.json):
+- the main thread re-arms a root.after() heartbeat every interval
+- a background thread measures how late the heartbeat is; past the threshold it
+  grabs the main thread's stack with sys._current_frames()
+- when the heartbeat comes back the stall (duration + stack) goes to a rotating log
+- summary() groups stalls by the innermost app frame for the debug menu
+"""
+
+import os, sys, threading, time, traceback, logging
+from logging.handlers import RotatingFileHandler
+
+from utils import APP_DIR
+
+
+class StallWatchdog:
+    def __init__(self, root, log_path="stalls.log", interval_ms=100, threshold_ms=250):
+        self.root = root
+        # relative to the app directory, not to wherever the app was started from
+        self.log_path = os.path.join(APP_DIR, log_path)
+        self.interval = interval_ms / 1000.0
+        self.threshold = threshold_ms / 1000.0
+        self.main_ident = threading.main_thread().ident
+        self.events = []          # (when, duration_s, stack_lines)
+        self._last_beat = time.monotonic()
+        self._pending_stack = None
+        self._stop = threading.Event()
+        self.log = logging.getLogger("todo.stalls")
+        self.log.propagate = False
+        if not self.log.handlers:
+            handler = RotatingFileHandler(self.log_path, maxBytes=512 * 1024, backupCount=3, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+            self.log.addHandler(handler)
+            self.log.setLevel(logging.INFO)
+
+    def start(self):
+        self.root.after(int(self.interval * 1000), self._beat)
+        threading.Thread(target=self._monitor, daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _beat(self):
+        now = time.monotonic()
+        lag = now - self._last_beat - self.interval
+        stack, self._pending_stack = self._pending_stack, None
+        if lag > self.threshold:
+            self._record(lag, stack or ["<stack not captured>\n"])
+        self._last_beat = now
+        if not self._stop.is_set():
+            self.root.after(int(self.interval * 1000), self._beat)
+
+    def _monitor(self):
+        while not self._stop.wait(self.interval / 2):
+            lag = time.monotonic() - self._last_beat - self.interval
+            if lag > self.threshold and self._pending_stack is None:
+                frame = sys._current_frames().get(self.main_ident)
+                if frame is not None:
+                    self._pending_stack = traceback.format_stack(frame)
+
+    def _record(self, duration, stack):
+        self.events.append((time.time(), duration, stack))
+        del self.events[:-500]
+        self.log.info("stall %.0f ms\n%s", duration * 1000, "".join(stack).rstrip())
+
+    @staticmethod
+    def _culprit(stack):
+        # innermost frame that belongs to the app, else the innermost frame
+        for line in reversed(stack):
+            if APP_DIR in line and "watchdog.py" not in line:
+                return line.strip().splitlines()[0]
+        return stack[-1].strip().splitlines()[0] if stack else "?"
+
+    def summary(self):
+        """
+        [(culprit, count, total_ms, max_ms)] sorted by total stall time.
+        """
+        groups = {}
+        for _, dur, stack in self.events:
+            key = self._culprit(stack)
+            cnt, total, mx = groups.get(key, (0, 0.0, 0.0))
+            groups[key] = (cnt + 1, total + dur, max(mx, dur))
+        rows = [(k, c, t * 1000, m * 1000) for k, (c, t, m) in groups.items()]
+        rows.sort(key=lambda r: -r[2])
+        return rows
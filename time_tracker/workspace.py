@@ -0,0 +1,180 @@
+# time_tracker/workspace.py
+"""
+Workspaces: separate data sets (tasks, time log, settings, archive, screenshots).
+- "default" is the app directory itself (the files that predate workspaces),
+  others live in workspaces/<name>/ with the same file names
+- activate(name) repoints utils.FILE / TIME_LOG / SETTINGS_FILE / ARCHIVE_FILE /
+  SCREENSHOT_BASE and the daemon socket; nothing of other workspaces is read
+- the active name is kept in workspaces.json, $TODO_PLUS_WORKSPACE overrides it
+- rollup(name) -> ({"YYYY-MM-DD": {project: seconds}}, damaged), cached in
+  <workspace>/rollup.json and rebuilt only when that workspace's log changed;
+  cross_totals() sums rollups, so reports over all workspaces never load their
+  raw logs. Other workspaces' logs are only read: a legacy or damaged one is
+  reported, its repair is left to the app that owns it
+"""
+
+import os, re, json, datetime
+
+import utils
+from time_tracker import client, tracker
+from time_tracker.daytotals import day_shares
+
+DEFAULT = "default"
+ROOT = os.path.join(utils.APP_DIR, "workspaces")
+STATE_FILE = os.path.join(utils.APP_DIR, "workspaces.json")
+ROLLUP_FILE = "rollup.json"
+ROLLUP_VERSION = 2  # 2: sessions crossing midnight are split between days
+_NAME = re.compile(r"^[\w][\w .-]{0,63}$")
+_DEFAULT_SOCKET = client.SOCKET_PATH
+
+current = DEFAULT
+
+
+def workspace_dir(name):
+    return utils.APP_DIR if name == DEFAULT else os.path.join(ROOT, name)
+
+
+def paths(name):
+    return paths_in(workspace_dir(name))
+
+
+def paths_in(d):
+    return {
+        "tasks": os.path.join(d, "tasks.json"),
+        "log": os.path.join(d, "time_log.json"),
+        "settings": os.path.join(d, "settings.json"),
+        "archive": os.path.join(d, "tasks_archive.jsonl"),
+        "screenshots": os.path.join(d, "screenshots"),
+        "rollup": os.path.join(d, ROLLUP_FILE),
+    }
+
+
+def list_workspaces():
+    names = [DEFAULT]
+    if os.path.isdir(ROOT):
+        names += sorted(n for n in os.listdir(ROOT) if os.path.isdir(os.path.join(ROOT, n)) and n != DEFAULT)
+    return names
+
+
+def create(name):
+    name = (name or "").strip()
+    if not _NAME.match(name) or name == DEFAULT:
+        raise ValueError(f"недопустимое имя: {name!r}")
+    os.makedirs(workspace_dir(name), exist_ok=True)
+    return name
+
+
+def socket_for(name):
+    if name == DEFAULT:
+        return _DEFAULT_SOCKET
+    base, ext = os.path.splitext(_DEFAULT_SOCKET)
+    return f"{base}-{name}{ext}"
+
+
+def active_name():
+    name = os.environ.get("TODO_PLUS_WORKSPACE")
+    if not name:
+        try:
+            with open(STATE_FILE, "r", encoding="utf-8") as f:
+                name = json.load(f).get("active")
+        except (OSError, ValueError, AttributeError):
+            name = None
+    return name if name in list_workspaces() else DEFAULT
+
+
+def point_to(p):
+    """
+    Repoint the data file globals of utils to the paths dict p.
+    """
+    utils.FILE, utils.TIME_LOG, utils.SETTINGS_FILE = p["tasks"], p["log"], p["settings"]
+    utils.ARCHIVE_FILE, utils.SCREENSHOT_BASE = p["archive"], p["screenshots"]
+    utils._archive_cache.clear()
+
+
+def activate(name, remember=False):
+    """
+    Make name the active workspace of this process (and the default for the
+    next start if remember).
+    """
+    global current
+    if name not in list_workspaces():
+        raise ValueError(f"нет рабочего пространства {name!r}")
+    point_to(paths(name))
+    client.set_socket_path(socket_for(name))
+    current = name
+    if remember:
+        tmp = STATE_FILE + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"active": name}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, STATE_FILE)
+    return name
+
+
+def _log_sig(path):
+    try:
+        st = os.stat(path)
+        return [st.st_mtime_ns, st.st_size]
+    except OSError:
+        return None
+
+
+def rollup(name):
+    """
+    (days, damaged): seconds per day and project of a workspace, from its rollup
+    cache when the log has not changed since, else from one streamed, read-only
+    pass over the log. damaged is True if (part of) the log could not be read.
+    """
+    p = paths(name)
+    sig = _log_sig(p["log"])
+    if sig is None:
+        return {}, False
+    try:
+        with open(p["rollup"], "r", encoding="utf-8") as f:
+            cached = json.load(f)
+        if cached.get("v") == ROLLUP_VERSION and cached.get("sig") == sig:
+            return cached["days"], bool(cached.get("damaged"))
+    except (OSError, ValueError, KeyError, AttributeError):
+        pass
+    days, damage = {}, []
+    try:
+        for e in tracker.scan_time_log(p["log"], damage.append):
+            s, en, _ = tracker.parse_range(e)
+            if not s:
+                continue
+            project = e.get("project") or "—"
+            for day, secs in day_shares(s, en, int(e.get("duration_seconds") or 0)):
+                per = days.setdefault(datetime.date.fromordinal(day).isoformat(), {})
+                per[project] = per.get(project, 0) + secs
+    except (OSError, ValueError):  # unknown schema, broken header, undecodable bytes
+        damage.append(None)
+    try:
+        tmp = p["rollup"] + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"v": ROLLUP_VERSION, "sig": sig, "damaged": bool(damage), "days": days}, f,
+                      ensure_ascii=False)
+        os.replace(tmp, p["rollup"])
+    except OSError:
+        pass
+    return days, bool(damage)
+
+
+def cross_totals(first=None, last=None, damaged=None):
+    """
+    {workspace: {project: seconds}} for days first..last (dates, inclusive, None = open).
+    Names of workspaces whose log could not be fully read are appended to damaged.
+    """
+    lo = first.isoformat() if first else ""
+    hi = last.isoformat() if last else "9999"
+    out = {}
+    for name in list_workspaces():
+        per = {}
+        days, bad = rollup(name)
+        if bad and damaged is not None:
+            damaged.append(name)
+        for day, projects in days.items():
+            if lo <= day <= hi:
+                for project, secs in projects.items():
+                    per[project] = per.get(project, 0) + secs
+        if per:
+            out[name] = per
+    return out
@@ -1,26 +1,147 @@
-import os, json, tkinter as tk
+import os, json, datetime, tkinter as tk
+
+from time_tracker.client import rpc_or_local, DaemonUnavailable
+from time_tracker.jsonstream import iter_json_array, load_salvaged
 
 DEFAULT_SETTINGS = {
     "autoscreen_enabled": True,
-    "autoscreen_interval": 15  # минут
+    "autoscreen_interval": 15,  # минут
+    "screenshot_budget_mb": 0,  # МБ в день, 0 = без ограничения
+    "screenshot_format": "jpeg",  # "jpeg" или "webp"
+    "screenshot_active_monitor": False,
+    "retention_max_age_days": 0,  # 0 = хранить всегда
+    "retention_max_total_mb": 0,  # 0 = без ограничения
+    "retention_project_limits_mb": {},  # {"Проект": МБ}
+    "deadline_reminder_hours": 0,  # напоминание за N часов до конца дня дедлайна, 0 = выкл.
+    "archive_done_after_days": 30,  # готовые задачи старше N дней уходят в архив, 0 = выкл.
+    "stall_watchdog": False,  # журнал зависаний интерфейса (stalls.log), диагностика
+    "stall_threshold_ms": 250,
+    "idle_trim": False,  # при остановке таймера вычитать простои (нет ввода с клавиатуры/мыши, сон)
+    "idle_trim_minutes": 10  # ... длиннее N минут
 }
 
-FILE = "tasks.json"
-SETTINGS_FILE = "settings.json"
-TIME_LOG = "time_log.json"
-SCREENSHOT_BASE = "screenshots"
+# data files of the active workspace (time_tracker.workspace.activate() repoints them);
+# the "default" workspace is the app directory itself
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+FILE = os.path.join(APP_DIR, "tasks.json")
+SETTINGS_FILE = os.path.join(APP_DIR, "settings.json")
+TIME_LOG = os.path.join(APP_DIR, "time_log.json")
+SCREENSHOT_BASE = os.path.join(APP_DIR, "screenshots")
+ARCHIVE_FILE = os.path.join(APP_DIR, "tasks_archive.jsonl")  # completed tasks, one JSON per line, append-only
 
 
 def load_tasks():
-    if os.path.exists(FILE):
-        with open(FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return []
+    return rpc_or_local("tasks.list", lambda: read_tasks_file(FILE))
 
 
-def save_tasks(tasks):
-    with open(FILE, "w", encoding="utf-8") as f:
+def read_tasks_file(path):
+    """
+    Tasks of a tasks.json, streamed; a damaged file is salvaged (see
+    time_tracker.jsonstream.load_salvaged) instead of failing or coming back empty.
+    """
+    if not os.path.exists(path):
+        return []
+    return load_salvaged(path, lambda f, on_damage: iter_json_array(f, on_damage=on_damage, required=("id", "text")),
+                         lambda tasks: write_tasks_file(tasks, path))
+
+
+def write_tasks_file(tasks, path):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
         json.dump(tasks, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+def save_tasks(tasks):
+    rpc_or_local("tasks.replace", lambda: write_tasks_file(tasks, FILE), tasks=tasks)
+
+
+def _done_date(t):
+    try:
+        return datetime.datetime.strptime(t.get("done_at", ""), "%d.%m.%Y").date()
+    except (TypeError, ValueError):
+        return None
+
+
+def archive_done_tasks(tasks, older_than_days):
+    """
+    Append done tasks completed more than N days ago to ARCHIVE_FILE.
+    Only the completion stamp 'done_at' counts: a done task without one (marked
+    done before it existed) is stamped today and ages from now, never by its
+    creation date.
+    Returns (hot_tasks, changed_count: moved + stamped); the caller saves hot_tasks.
+    """
+    if not older_than_days:
+        return tasks, 0
+    today = datetime.date.today()
+    cutoff = today - datetime.timedelta(days=int(older_than_days))
+    hot, cold, stamped = [], [], 0
+    for t in tasks:
+        d = None
+        if t.get("done"):
+            d = _done_date(t)
+            if d is None:
+                t["done_at"] = today.strftime("%d.%m.%Y")
+                stamped += 1
+        (cold if d and d < cutoff else hot).append(t)
+    if cold:
+        with open(ARCHIVE_FILE, "a", encoding="utf-8") as f:
+            for t in cold:
+                f.write(json.dumps(t, ensure_ascii=False) + "\n")
+        _archive_cache.clear()
+    return hot, len(cold) + stamped
+
+
+_archive_cache = {}
+
+
+def load_archived_tasks():
+    """
+    Archived tasks, read on first use and cached until the file changes.
+    """
+    try:
+        st = os.stat(ARCHIVE_FILE)
+    except OSError:
+        return []
+    sig = (ARCHIVE_FILE, st.st_mtime_ns, st.st_size)
+    if _archive_cache.get("sig") != sig:
+        out = []
+        with open(ARCHIVE_FILE, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    try:
+                        out.append(json.loads(line))
+                    except ValueError:
+                        continue
+        _archive_cache.update(sig=sig, tasks=out, by_id={t.get("id"): t for t in out})
+    return _archive_cache["tasks"]
+
+
+def restore_archived_tasks(ids):
+    """
+    Remove tasks from the archive and return them (to be put back into tasks.json).
+    """
+    ids = set(ids)
+    archived = load_archived_tasks()
+    back = [t for t in archived if t.get("id") in ids]
+    keep = [t for t in archived if t.get("id") not in ids]
+    with open(ARCHIVE_FILE, "w", encoding="utf-8") as f:
+        for t in keep:
+            f.write(json.dumps(t, ensure_ascii=False) + "\n")
+    _archive_cache.clear()
+    return back
+
+
+def tasks_by_id(tasks=None):
+    """
+    {id: task} of the archive overlaid with tasks (the hot list): a snapshot for
+    lookups on a worker thread, which must not touch the archive cache itself.
+    """
+    load_archived_tasks()
+    out = dict(_archive_cache.get("by_id", {}))
+    out.update((t.get("id"), t) for t in tasks or ())
+    return out
 
 
 def mask_date_entry(entry: tk.Entry):
@@ -38,6 +159,29 @@ def mask_date_entry(entry: tk.Entry):
     entry.config(validate="key", validatecommand=vcmd)
 
 
+def attach_autocomplete(combo, index, limit=20, inline=True):
+    """
+    Type-ahead for a ttk.Combobox backed by a PrefixIndex: the dropdown lists the
+    best matches for the typed text; with inline=True the top match is completed
+    in place and the added part is selected.
+    """
+    def on_key(event):
+        if event.keysym in ("Up", "Down", "Return", "Escape", "Tab", "Left", "Right", "Home", "End",
+                            "Shift_L", "Shift_R", "Control_L", "Control_R"):
+            return
+        typed = combo.get()
+        matches = index.complete(typed, limit)
+        combo["values"] = matches
+        if inline and typed and event.keysym not in ("BackSpace", "Delete"):
+            best = next((m for m in matches if m.casefold().startswith(typed.casefold())), None)
+            if best and len(best) > len(typed):
+                combo.set(best)
+                combo.icursor(len(typed))
+                combo.selection_range(len(typed), tk.END)
+    combo.bind("<KeyRelease>", on_key, add="+")
+    combo.configure(postcommand=lambda: combo.configure(values=index.complete(combo.get(), limit)))
+
+
 def mask_time_entry(entry: tk.Entry):
     def on_validate(P):
         if len(P) > 5:
@@ -57,22 +201,44 @@ def mask_time_entry(entry: tk.Entry):
     entry.config(validate="key", validatecommand=vcmd)
 
 
-def load_settings():
+def _read_settings_file():
     if os.path.exists(SETTINGS_FILE):
         try:
             with open(SETTINGS_FILE, "r", encoding="utf-8") as f:
-                from utils import DEFAULT_SETTINGS
-                return {**DEFAULT_SETTINGS, **json.load(f)}
+                return json.load(f)
         except Exception:
             pass
-    return DEFAULT_SETTINGS.copy()
+    return {}
 
 
-def save_settings(data):
+def load_settings():
+    return {**DEFAULT_SETTINGS, **rpc_or_local("settings.get", _read_settings_file)}
+
+
+def _write_settings_file(data):
     with open(SETTINGS_FILE, "w", encoding="utf-8") as f:
         json.dump(data, f, ensure_ascii=False, indent=2)
 
 
+def save_settings(data):
+    rpc_or_local("settings.set", lambda: _write_settings_file(data), values=data)
+
+
+def install_error_handler(root):
+    """
+    Show DaemonUnavailable raised from a Tk callback in a dialog, not only on stderr.
+    """
+    from tkinter import messagebox
+    default = root.report_callback_exception
+
+    def handler(exc, val, tb):
+        if isinstance(val, DaemonUnavailable):
+            messagebox.showerror("Демон данных", f"{val}\nИзменение не сохранено.")
+        else:
+            default(exc, val, tb)
+    root.report_callback_exception = handler
+
+
 def seconds_to_hms(sec):
     h, rem = divmod(int(sec), 3600)
     m, s = divmod(rem, 60)